@@ -1,4 +1,3 @@
-from langchain_anthropic import ChatAnthropic
 import os
 from dotenv import load_dotenv
 
@@ -10,12 +9,7 @@ from langgraph.graph import START, END, StateGraph
 from langgraph.checkpoint.memory import MemorySaver
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
 
-os.environ["LANGCHAIN_PROJECT"] = "German_Teacher_Tests.V0"
-load_dotenv()
-llm = ChatAnthropic(
-    model="claude-3-sonnet-20240229",
-    temperature=0
-)
+from graph_factories import lazy_graph
 
 
 #Defining States
@@ -29,16 +23,30 @@ def test_node(state):
     return {"state" : state["state"] + " the test was successful!"}
 
 
-#'Nodes'
-builder = StateGraph(State)
-builder.add_node("test_node", test_node)
+def build_graph():
+    """Graph factory for langgraph.json, compiles the graph on demand"""
+    #'Nodes'
+    builder = StateGraph(State)
+    builder.add_node("test_node", test_node)
 
-#Edges
-#Edges alwas refer to the "naming" of the node, not the node itself*
-builder.add_edge(START, "test_node")
-builder.add_edge("test_node", END)
-graph = builder.compile()
+    #Edges
+    #Edges alwas refer to the "naming" of the node, not the node itself*
+    builder.add_edge(START, "test_node")
+    builder.add_edge("test_node", END)
+    return builder.compile()
 
-#We invoke the graph with an initial state
-final_output = graph.invoke({"state" : "Running Test! and..."})
-print(final_output)
\ No newline at end of file
+# `graph` is built on first access, so importing this module has no side effects
+__getattr__ = lazy_graph(build_graph, globals())
+
+
+def main():
+    os.environ["LANGCHAIN_PROJECT"] = "German_Teacher_Tests.V0"
+    load_dotenv()
+
+    #We invoke the graph with an initial state
+    final_output = build_graph().invoke({"state" : "Running Test! and..."})
+    print(final_output)
+
+
+if __name__ == "__main__":
+    main()
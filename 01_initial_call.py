@@ -1,20 +1,17 @@
-from langchain_anthropic import ChatAnthropic
 import os
+import sys
 from dotenv import load_dotenv
 
 from typing_extensions import TypedDict
 
-from langgraph.graph import START, END, StateGraph, MessagesState
+from langgraph.graph import START, END
 from langgraph.checkpoint.memory import MemorySaver
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, AnyMessage
-
-
-os.environ["LANGCHAIN_PROJECT"] = "German_Teacher_Chatbot_V1"
-load_dotenv()
-llm = ChatAnthropic(
-    model="claude-3-sonnet-20240229",
-    temperature=0
-)
+from langchain_core.runnables import RunnableLambda
+from message_log import MessageLogGraph, MessageLogState
+from model_router import route_model
+from graph_factories import lazy_graph
+from session_manager import SessionManager
 
 
 #Memory Class
@@ -25,25 +22,45 @@ class MessageState(TypedDict):
     pass
 
 #Defining Nodes
-def agent_answers(state: MessagesState):
+def agent_answers(state: MessageLogState):
+    messages = state["messages"]
+    llm_answer = route_model("agent_answers").invoke(messages)
+    # Return the changes to be applied to the state, the reducer appends them
+    return {"messages": [AIMessage(content=llm_answer.content)]}
+
+async def aagent_answers(state: MessageLogState):
     messages = state["messages"]
-    llm_answer = llm.invoke(messages)
-    # Return the changes to be applied to the state
-    return {"messages": messages + [AIMessage(content=llm_answer.content)]}
+    llm_answer = await route_model("agent_answers").ainvoke(messages)
+    return {"messages": [AIMessage(content=llm_answer.content)]}
 
 
-#'Nodes'
-builder = StateGraph(MessagesState)
-builder.add_node("agent_answers", agent_answers)
-#Edges
-#Edges alwas refer to the "naming" of the node, not the node itself*
-builder.add_edge(START, "agent_answers")
-builder.add_edge("agent_answers", END)
-graph = builder.compile()
+def build_graph():
+    """Graph factory for langgraph.json, compiles the graph on demand"""
+    #'Nodes'
+    builder = MessageLogGraph(MessageLogState)
+    builder.add_node("agent_answers", RunnableLambda(agent_answers, afunc=aagent_answers))
+    #Edges
+    #Edges alwas refer to the "naming" of the node, not the node itself*
+    builder.add_edge(START, "agent_answers")
+    builder.add_edge("agent_answers", END)
+    return builder.compile()
+
+# `graph` is built on first access, so importing this module has no side effects
+__getattr__ = lazy_graph(build_graph, globals())
 
 #Better open Studio to wor on this, use   langgraph dev    in terminal
 
-final_output = graph.invoke(
-    {"messages": [HumanMessage(content="X")]},
-    {"configurable": {"thread_id": "Test_1"}}  # or any unique identifier
-)
+def main():
+    os.environ["LANGCHAIN_PROJECT"] = "German_Teacher_Chatbot_V1"
+    load_dotenv()
+
+    # One thread per student (a new guest without an ID), checkpointed on disk
+    sessions = SessionManager(build_graph(), "initial_call")
+    final_output = sessions.invoke(
+        sys.argv[1] if len(sys.argv) > 1 else None,
+        {"messages": [HumanMessage(content="X")]}
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,53 @@
-from langchain_anthropic import ChatAnthropic
 import os
+import sys
 from dotenv import load_dotenv
 
 from typing_extensions import TypedDict
 
-from langgraph.graph import START, END, StateGraph, MessagesState
-from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import START, END
+from checkpointer import get_checkpointer
+from session_manager import SessionManager
+from history import CompactedMessagesState, make_compaction_node, with_summary
+from message_log import MessageLogGraph
+from model_router import route_model
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, AnyMessage
 
 
 os.environ["LANGCHAIN_PROJECT"] = "German_Teacher_Chatbot_V1"
 load_dotenv()
-llm = ChatAnthropic(
-    model="claude-3-sonnet-20240229",
-    temperature=0
-)
 
 
-#Memory Class
-memory = MemorySaver()
+#Memory Class (on disk, keeps the last checkpoints of each thread)
+memory = get_checkpointer()
 
 #Defining States
 class MessageState(TypedDict):
     pass
 
 #Defining Nodes
-def agent_answers(state: MessagesState):
+def agent_answers(state: CompactedMessagesState):
     messages = state["messages"]
-    llm_answer = llm.invoke(messages)
-    # Return the changes to be applied to the state
-    return {"messages": messages + [AIMessage(content=llm_answer.content)]}
+    llm_answer = route_model("agent_answers").invoke(with_summary(messages, state.get("summary")))
+    # Return the changes to be applied to the state, the reducer appends them
+    return {"messages": [AIMessage(content=llm_answer.content)]}
 
 
 #'Nodes'
-builder = StateGraph(MessagesState)
+builder = MessageLogGraph(CompactedMessagesState)
+builder.add_node("compact_history", make_compaction_node())
 builder.add_node("agent_answers", agent_answers)
 #Edges
 #Edges alwas refer to the "naming" of the node, not the node itself*
-builder.add_edge(START, "agent_answers")
+builder.add_edge(START, "compact_history")
+builder.add_edge("compact_history", "agent_answers")
 builder.add_edge("agent_answers", END)
 graph = builder.compile(checkpointer=memory)
 
+# One thread per student: pass a student ID to continue that conversation, none starts a new guest
+sessions = SessionManager(graph, "initial_call_local")
+session = sessions.open(sys.argv[1] if len(sys.argv) > 1 else None)
+print(f"Session: {session.student_id}")
+
 
 #Start the ocnversation
 chatting = True
@@ -52,9 +59,9 @@ while chatting:
         chatting = False
 
     else:
-        final_output = graph.invoke(
-    {"messages": [HumanMessage(content=user_input)]},
-    {"configurable": {"thread_id": "Test_1"}}  # or any unique identifier
+        final_output = sessions.invoke(
+    session.student_id,
+    {"messages": [HumanMessage(content=user_input)]}
 )
         # Extract and print just the AI's response
         ai_message = final_output["messages"][-1]  # Get the last message in the conversation
@@ -1,11 +1,17 @@
-from langchain_anthropic import ChatAnthropic
 import os
+import sys
 from dotenv import load_dotenv
 
 from typing_extensions import TypedDict
 
-from langgraph.graph import START, END, StateGraph, MessagesState
-from langgraph.checkpoint.memory import MemorySaver
+from langgraph.graph import START, END
+from checkpointer import get_checkpointer
+from session_manager import SessionManager
+from history import CompactedMessagesState, make_compaction_node, with_summary
+from message_log import MessageLogGraph
+from message_builder import invoke_model
+from model_router import route_model
+from greetings import make_greeting_node, route_greeting
 from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, AnyMessage
 
 
@@ -14,43 +20,50 @@ from system_prompts import info_taker_Agent_sys_prompt
 
 os.environ["LANGCHAIN_PROJECT"] = "German_Teacher_Chatbot_V1"
 load_dotenv()
-llm = ChatAnthropic(
-    model="claude-3-sonnet-20240229",
-    temperature=0
-)
 
 
 
-#Memory Class
-memory = MemorySaver()
+#Memory Class (on disk, keeps the last checkpoints of each thread)
+memory = get_checkpointer()
 
 #Defining States
 class MessageState(TypedDict):
     pass
 
 #Defining Nodes
-def agent_answers(state: MessagesState):
+def agent_answers(state: CompactedMessagesState):
     messages = state["messages"]
-    llm_answer = llm.invoke(messages)
-    # Return the changes to be applied to the state
-    return {"messages": messages + [AIMessage(content=llm_answer.content)]}
+    llm_answer = invoke_model("agent_answers", route_model("agent_answers"), with_summary(messages, state.get("summary")))
+    # Return the changes to be applied to the state, the reducer appends them
+    return {"messages": [AIMessage(content=llm_answer.content)]}
 
 
 #'Nodes'
-builder = StateGraph(MessagesState)
+builder = MessageLogGraph(CompactedMessagesState)
+builder.add_node("greeting", make_greeting_node())
+builder.add_node("compact_history", make_compaction_node())
 builder.add_node("agent_answers", agent_answers)
 
 #Edges
-builder.add_edge(START, "agent_answers")
+# The scripted greeting is rendered locally, the model starts at the first answer
+builder.add_conditional_edges(START, route_greeting("compact_history"), ["greeting", "compact_history"])
+builder.add_edge("greeting", END)
+builder.add_edge("compact_history", "agent_answers")
 builder.add_edge("agent_answers", END)
 graph = builder.compile(checkpointer=memory)
 
-first_answer = graph.invoke(
-    {"messages": [
-        SystemMessage(content=info_taker_Agent_sys_prompt), 
-        HumanMessage(content="Start the conversation.")
-    ]},
-    {"configurable": {"thread_id": "Test_1"}}
+# One thread per student: pass a student ID to continue that conversation, none starts a new guest
+sessions = SessionManager(graph, "personality_local")
+session = sessions.open(sys.argv[1] if len(sys.argv) > 1 else None)
+print(f"Session: {session.student_id}")
+
+# A returning student continues their thread, which already starts with the system prompt
+opening = [HumanMessage(content="Start the conversation.")]
+if not sessions.get_state(session.student_id).values.get("messages"):
+    opening.insert(0, SystemMessage(content=info_taker_Agent_sys_prompt))
+first_answer = sessions.invoke(
+    session.student_id,
+    {"messages": opening}
 )
 
 # Display AI's first message (greeting/introduction)
@@ -68,9 +81,9 @@ while chatting:
         chatting = False
 
     else:
-        final_output = graph.invoke(
-    {"messages": [HumanMessage(content=user_input)]},
-    {"configurable": {"thread_id": "Test_1"}}  # or any unique identifier
+        final_output = sessions.invoke(
+    session.student_id,
+    {"messages": [HumanMessage(content=user_input)]}
 )
         # Extract and print just the AI's response
         ai_message = final_output["messages"][-1]  
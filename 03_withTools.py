@@ -1,127 +1,139 @@
-from langchain_anthropic import ChatAnthropic
 import os
+import sys
 from dotenv import load_dotenv
 
-from langgraph.graph import START, END, StateGraph, MessagesState
+from langgraph.graph import START, END
 from langchain_core.messages import HumanMessage
+from langchain_core.runnables import RunnableLambda
 
 #For the database / Tools
 from langgraph.prebuilt import ToolNode, tools_condition
-from tools import save_initial_profile
-
-
-os.environ["LANGCHAIN_PROJECT"] = "Data_Gatherer_Prompt_Tools"
-load_dotenv()
-llm = ChatAnthropic(
-    model="claude-3-sonnet-20240229",
-    temperature=0
-)
+from tools import profile_tool
+from greetings import make_greeting_node, route_greeting
+from message_log import MessageLogGraph, MessageLogState
+from message_builder import ainvoke_model, invoke_model
+from model_router import route_model
+from graph_factories import lazy_graph
+from session_manager import SessionManager
 
 
 #TOOL
 #import os
-import csv
 import datetime
-import random
-import string
+from id_allocator import get_id_allocator
+from profile_index import StudentProfile
+from student_store import get_student_store
 
 def save_initial_profile(name, language_level, hobbies, student_id=None, db_path="./student_data"):
     """
-    Save a student profile to a CSV file with filename format: dateofcreation_name_ID.csv
+    Save a student profile to the consolidated student store (student_data/students.db)
     
     Parameters:
     - name: Student's name (string)
     - language_level: Student's language level (string, e.g., "Beginner A1")
     - hobbies: List of up to 3 hobbies (list of strings)
-    - student_id: Pre-existing student ID (optional, will generate random alphanumeric if None)
-    - db_path: Base directory path where to save the CSV files (default: "./student_data")
+    - student_id: ID of a returning student to update (optional, a new unique ID is generated if None)
+    - db_path: Directory of the student store (default: "./student_data")
     
     Returns:
     - student_id: ID of the student
-    - filename: Path to the saved CSV file
+    - status: "created" for a new student, "updated" if the profile of student_id was replaced
     """
     # Create directory if needed
     os.makedirs(db_path, exist_ok=True)
     
-    # Get current timestamp for both the filename and data
-    current_date = datetime.datetime.now().strftime("%Y%m%d")
+    # Get current timestamp for the registration date
     current_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
     # Generate student_id if not provided
+    # The allocator's persisted index guarantees uniqueness without listing the directory
+    allocator = get_id_allocator(db_path)
+    store = get_student_store(db_path)
+    existing = None
     if student_id is None:
-        # Generate a random 8-character alphanumeric ID
-        chars = string.ascii_uppercase + string.digits
-        student_id = ''.join(random.choice(chars) for _ in range(8))
-        
-        # Ensure the ID is unique by checking existing files
-        existing_ids = set()
-        if os.path.exists(db_path):
-            for filename in os.listdir(db_path):
-                if filename.endswith('.csv'):
-                    try:
-                        file_id = filename.split('_')[-1].split('.')[0]
-                        existing_ids.add(file_id)
-                    except (ValueError, IndexError):
-                        pass
-        
-        # Regenerate if there's a collision (unlikely but possible)
-        while student_id in existing_ids:
-            student_id = ''.join(random.choice(chars) for _ in range(8))
+        student_id = allocator.allocate()
+    else:
+        allocator.reserve(student_id)
+        existing = store.get(student_id)
+    status = "updated" if existing is not None else "created"
     
-    # Create filename using the required format: dateofcreation_name_ID.csv
-    # Replace spaces in name with underscores for the filename
-    safe_name = name.replace(' ', '_')
-    filename = f"{current_date}_{safe_name}_{student_id}.csv"
-    full_path = os.path.join(db_path, filename)
+    # Format hobbies as a list (up to 3)
+    hobby_list = [h.strip() for h in hobbies[:3] if h.strip()]
     
-    # Format hobbies as a pipe-separated string (up to 3)
-    hobby_str = "|".join([h.strip() for h in hobbies[:3] if h.strip()])
+    # Write into the consolidated store instead of one CSV file per student. A returning
+    # student's name, level and hobbies replace the stored ones, the registration date is kept
+    store.add(StudentProfile(
+        id=student_id,
+        name=name,
+        language_level=language_level,
+        registration_date=existing['registration_date'] if existing else current_time,
+        hobbies=hobby_list,
+    ), replace=True)
     
-    # Write to CSV file
-    with open(full_path, 'w', newline='') as csvfile:
-        writer = csv.writer(csvfile)
-        
-        # Write header
-        writer.writerow(['id', 'name', 'language_level', 'registration_date', 'hobbies'])
-        
-        # Write student data
-        writer.writerow([student_id, name, language_level, current_time, hobby_str])
-    
-    return student_id, full_path
+    return student_id, status
 
-llm_with_tools = llm.bind_tools([save_initial_profile])
+# Sync + async tool so ToolNode does not block the event loop under ainvoke
+save_initial_profile_tool = profile_tool(save_initial_profile)
 
 #Defining Nodes
-def gathering_agent(state: MessagesState):
-    return {"messages" : [llm_with_tools.invoke(state["messages"])]}
+FAREWELL_INSTRUCTION = "The student profile has been saved successfully. Please provide a friendly farewell message to the user, summarizing what was done and ending the conversation."
+
+def gathering_agent(state: MessageLogState):
+    return {"messages" : [invoke_model("gathering_agent", route_model("gathering_agent", tools=[save_initial_profile_tool]), state["messages"])]}
 
-def farewell_node(state: MessagesState):
+async def agathering_agent(state: MessageLogState):
+    return {"messages" : [await ainvoke_model("gathering_agent", route_model("gathering_agent", tools=[save_initial_profile_tool]), state["messages"])]}
+
+def farewell_node(state: MessageLogState):
     # Add a system message to guide the LLM to provide a farewell
-    farewell_message = HumanMessage(content="The student profile has been created successfully. Please provide a friendly farewell message to the user, summarizing what was done and ending the conversation.")
-    # Add this instruction to the existing messages
+    farewell_message = HumanMessage(content=FAREWELL_INSTRUCTION)
+    # Add this instruction to the existing messages (a one-off list for the model, the log is unchanged)
     updated_messages = state["messages"] + [farewell_message]
     # Invoke the LLM with the updated messages
-    return {"messages": state["messages"] + [llm.invoke(updated_messages)]}
-
-
-#'Nodes'
-builder = StateGraph(MessagesState)
-builder.add_node("gathering_agent", gathering_agent)
-builder.add_node("tools", ToolNode([save_initial_profile]))
-builder.add_node("farewell_node", farewell_node)
-
-#Edges
-builder.add_edge(START, "gathering_agent")
-builder.add_conditional_edges(
-    "gathering_agent", 
-    tools_condition,
-    )  #This should direct to the tools in case it is needed.
-builder.add_edge("tools", "farewell_node")
-builder.add_edge("farewell_node", END)
-graph = builder.compile()
-
-
-final_output = graph.invoke(
-    {"messages": [HumanMessage(content="Hi")]},
-    {"configurable": {"thread_id": "Test_2"}}  # or any unique identifier
-)
\ No newline at end of file
+    return {"messages": [invoke_model("farewell_node", route_model("farewell_node"), updated_messages)]}
+
+async def afarewell_node(state: MessageLogState):
+    farewell_message = HumanMessage(content=FAREWELL_INSTRUCTION)
+    updated_messages = state["messages"] + [farewell_message]
+    return {"messages": [await ainvoke_model("farewell_node", route_model("farewell_node"), updated_messages)]}
+
+
+def build_graph():
+    """Graph factory for langgraph.json, compiles the graph on demand"""
+    #'Nodes'
+    builder = MessageLogGraph(MessageLogState)
+    builder.add_node("greeting", make_greeting_node())
+    builder.add_node("gathering_agent", RunnableLambda(gathering_agent, afunc=agathering_agent))
+    builder.add_node("tools", ToolNode([save_initial_profile_tool]))
+    builder.add_node("farewell_node", RunnableLambda(farewell_node, afunc=afarewell_node))
+
+    #Edges
+    # The scripted greeting is rendered locally, the model starts at the first answer
+    builder.add_conditional_edges(START, route_greeting("gathering_agent"), ["greeting", "gathering_agent"])
+    builder.add_edge("greeting", END)
+    builder.add_conditional_edges(
+        "gathering_agent", 
+        tools_condition,
+        )  #This should direct to the tools in case it is needed.
+    builder.add_edge("tools", "farewell_node")
+    builder.add_edge("farewell_node", END)
+    return builder.compile()
+
+# `graph` is built on first access, so importing this module has no side effects
+__getattr__ = lazy_graph(build_graph, globals())
+
+
+def main():
+    os.environ["LANGCHAIN_PROJECT"] = "Data_Gatherer_Prompt_Tools"
+    load_dotenv()
+
+    # One thread per student (a new guest without an ID), checkpointed on disk
+    sessions = SessionManager(build_graph(), "info_gathering")
+    sessions.invoke(
+        sys.argv[1] if len(sys.argv) > 1 else None,
+        {"messages": [HumanMessage(content="Hi")]}
+    )
+
+
+if __name__ == "__main__":
+    main()
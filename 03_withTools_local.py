@@ -1,32 +1,31 @@
-from langchain_anthropic import ChatAnthropic
 import os
+import sys
 from dotenv import load_dotenv
 
 from typing_extensions import TypedDict
 
-from langgraph.graph import START, END, StateGraph, MessagesState
-from langgraph.checkpoint.memory import MemorySaver
-from langchain_core.messages import AIMessage, HumanMessage, SystemMessage, AnyMessage
+from langgraph.graph import START, END
+from checkpointer import get_checkpointer
+from session_manager import SessionManager
+from history import CompactedMessagesState, make_compaction_node, with_summary
+from message_log import MessageLogGraph
+from model_router import route_model
+from streaming import ConsoleConsumer, stream_model
+from greetings import make_greeting_node, route_greeting
+from langchain_core.messages import HumanMessage, SystemMessage, AnyMessage
 
 #For the database / Tools
 from langgraph.prebuilt import ToolNode, tools_condition
-from tools import save_initial_profile
+from tools import save_initial_profile_tool
 
 from system_prompts import info_taker_Agent_sys_prompt
 
 
 os.environ["LANGCHAIN_PROJECT"] = "German_Teacher_Chatbot_V1"
 load_dotenv()
-llm = ChatAnthropic(
-    model="claude-3-sonnet-20240229",
-    temperature=0
-)
-
-#NOTE TOOL ADD to agent
-llm_with_tools = llm.bind_tools([save_initial_profile])
 
-#Memory Class
-memory = MemorySaver()
+#Memory Class (on disk, keeps the last checkpoints of each thread)
+memory = get_checkpointer()
 
 
 #Defining States
@@ -35,41 +34,51 @@ class MessageState(TypedDict):
 
 
 #Defining Nodes
-def gathering_agent(state: MessagesState):
+def gathering_agent(state: CompactedMessagesState):
     messages = state["messages"]
-    llm_answer = llm_with_tools.invoke(messages)
-    # Return the changes to be applied to the state
-    return {"messages": messages + [AIMessage(content=llm_answer.content)]}
+    # Tokens are printed as they arrive, the full answer (with tool calls) goes to the state
+    llm_answer = stream_model("gathering_agent", route_model("gathering_agent", tools=[save_initial_profile_tool]), with_summary(messages, state.get("summary")), [ConsoleConsumer()])
+    # Return the changes to be applied to the state, the reducer appends them
+    return {"messages": [llm_answer]}
 
 
 
 #'Nodes'
-builder = StateGraph(MessagesState)
+builder = MessageLogGraph(CompactedMessagesState)
+builder.add_node("greeting", make_greeting_node(consumers=[ConsoleConsumer()]))
+builder.add_node("compact_history", make_compaction_node())
 builder.add_node("gathering_agent", gathering_agent)
-builder.add_node("tools", ToolNode([save_initial_profile]))
+builder.add_node("tools", ToolNode([save_initial_profile_tool]))
 
 #Edges
-builder.add_edge(START, "gathering_agent")
+# The scripted greeting is rendered locally, the model starts at the first answer
+builder.add_conditional_edges(START, route_greeting("compact_history"), ["greeting", "compact_history"])
+builder.add_edge("greeting", END)
+builder.add_edge("compact_history", "gathering_agent")
 builder.add_conditional_edges(
     "gathering_agent", 
     tools_condition)  #This should direct to the tools in case it is needed.
 builder.add_edge("tools", "gathering_agent")
 graph = builder.compile(checkpointer=memory)
 
+# One thread per student: pass a student ID to continue that conversation, none starts a new guest
+sessions = SessionManager(graph, "info_gathering_local")
+session = sessions.open(sys.argv[1] if len(sys.argv) > 1 else None)
+print(f"Session: {session.student_id}")
+
 
 
 #InitialAnswer
-first_answer = graph.invoke(
-    {"messages": [
-        SystemMessage(content=info_taker_Agent_sys_prompt), 
-        HumanMessage(content="Start the conversation.")
-    ]},
-    {"configurable": {"thread_id": "Test_1"}}
+# A returning student continues their thread, which already starts with the system prompt
+opening = [HumanMessage(content="Start the conversation.")]
+if not sessions.get_state(session.student_id).values.get("messages"):
+    opening.insert(0, SystemMessage(content=info_taker_Agent_sys_prompt))
+first_answer = sessions.invoke(
+    session.student_id,
+    {"messages": opening}
 )
 
-# Display AI's first message (greeting/introduction)
-ai_message = first_answer["messages"][-1]
-print(f"\nAI:\n{ai_message.content}")
+# AI's first message (greeting/introduction) was streamed to the console by the node
 
 
 
@@ -84,12 +93,8 @@ while chatting:
         chatting = False
 
     else:
-        final_output = graph.invoke(
-    {"messages": first_answer["messages"] + [HumanMessage(content=user_input)]},
-    {"configurable": {"thread_id": "Test_1"}}  # or any unique identifier
+        final_output = sessions.invoke(
+    session.student_id,
+    {"messages": [HumanMessage(content=user_input)]}  # The checkpointer already holds the history
 )
-        first_answer = final_output
-
-        # Extract and print just the AI's response
-        ai_message = final_output["messages"][-1]  
-        print(f"\nAI:\n{ai_message.content}")
\ No newline at end of file
+        first_answer = final_output
\ No newline at end of file
@@ -1,110 +1,78 @@
-from langchain_anthropic import ChatAnthropic
 import os
+import sys
 from dotenv import load_dotenv
 
-from langgraph.graph import START, END, StateGraph, MessagesState
-from langchain_core.messages import HumanMessage
+from langgraph.graph import START, END
+from history import CompactedMessagesState, make_compaction_node, with_summary
+from message_log import MessageLogGraph
+from message_builder import ainvoke_model, invoke_model
+from model_router import route_model
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableLambda
+from system_prompts import conversation_class_agent_sys_prompt_V1_batch_grading
 
 #For the database / Tools
 from langgraph.prebuilt import ToolNode, tools_condition
+from tools import finish_lesson_tool, retrieve_student_profile, retrieve_student_profile_tool
+from greetings import make_conversation_greeting_node, route_greeting
+from graph_factories import lazy_graph
+from session_manager import SessionManager
 
 
-
-os.environ["LANGCHAIN_PROJECT"] = "Conversation_Agent"
-load_dotenv()
-llm = ChatAnthropic(
-    model="claude-3-sonnet-20240229",
-    temperature=0
-)
-
-
-#TOOL
-import os
-import csv
-import glob
-
-import os
-import csv
-import glob
-
-def retrieve_student_profile(db_path="./student_data"):
-    """
-    Read and display all student profiles from CSV files in the specified directory.
-    
-    Parameters:
-    - db_path: Directory path where CSV files are stored (default: "./student_data")
-    
-    Returns:
-    - student_count: Number of students found
-    """
-    # Check if directory exists
-    if not os.path.exists(db_path):
-        print(f"Directory not found: {db_path}")
-        return 0
-    
-    # Get all CSV files in the directory
-    csv_files = glob.glob(os.path.join(db_path, "*.csv"))
-    
-    if not csv_files:
-        print(f"No student data files found in {db_path}")
-        return 0
-    
-    student_count = 0
-    
-    # Process each file
-    for file_path in csv_files:
-        filename = os.path.basename(file_path)
-        print(f"\n===== Student File: {filename} =====")
-        
-        try:
-            with open(file_path, 'r', newline='') as csvfile:
-                reader = csv.DictReader(csvfile)
-                for row in reader:
-                    student_count += 1
-                    name = {row['name']}
-                    language_level = {row['language_level']}
-                    print(f"\nStudent ID: {row['id']}")
-                    print(f"Name: {row['name']}")
-                    print(f"Language Level: {row['language_level']}")
-                    print(f"Registration Date: {row['registration_date']}")
-                    
-                    # Handle hobbies - convert from pipe-separated to list
-                    hobbies = row['hobbies'].split('|') if row['hobbies'] else []
-                    if hobbies:
-                        print(f"Hobbies: {', '.join(hobbies)}")
-                    else:
-                        print("Hobbies: None")
-        except Exception as e:
-            print(f"Error reading file {filename}: {e}")
-        
-        return name, language_level, hobbies
-
-
-llm_with_tools = llm.bind_tools([retrieve_student_profile])
+conversation_tools = [retrieve_student_profile_tool, finish_lesson_tool]
 
 #Defining Nodes
-def conversation_agent(state: MessagesState):
-    return {"messages" : [llm_with_tools.invoke(state["messages"])]}
-
-
-#'Nodes'
-builder = StateGraph(MessagesState)
-builder.add_node("conversation_agent", conversation_agent)
-builder.add_node("tools", ToolNode([retrieve_student_profile]))
-
-#Edges
-builder.add_edge(START, "conversation_agent")
-builder.add_conditional_edges(
-    "conversation_agent",
-    tools_condition
-)
-builder.add_edge("tools", "conversation_agent")
-builder.add_edge("conversation_agent", END)
-graph = builder.compile()
-
-
-final_output = graph.invoke(
-    {"messages": [HumanMessage(content="Hi")]},
-    {"configurable": {"thread_id": "conversation_agent_Test"}}  # or any unique identifier
-)
-
+def conversation_agent(state: CompactedMessagesState):
+    messages = with_summary(state["messages"], state.get("summary"))
+    return {"messages" : [invoke_model("conversation_agent", route_model("conversation_agent", tools=conversation_tools), messages)]}
+
+async def aconversation_agent(state: CompactedMessagesState):
+    messages = with_summary(state["messages"], state.get("summary"))
+    return {"messages" : [await ainvoke_model("conversation_agent", route_model("conversation_agent", tools=conversation_tools), messages)]}
+
+
+def build_graph():
+    """Graph factory for langgraph.json, compiles the graph on demand"""
+    #'Nodes'
+    builder = MessageLogGraph(CompactedMessagesState)
+    builder.add_node("greeting", make_conversation_greeting_node())
+    builder.add_node("compact_history", make_compaction_node())
+    builder.add_node("conversation_agent", RunnableLambda(conversation_agent, afunc=aconversation_agent))
+    builder.add_node("tools", ToolNode(conversation_tools))
+
+    #Edges
+    # New lessons get the profile lookup and the greeting locally, the model starts at the hobby paragraph
+    builder.add_conditional_edges(START, route_greeting("compact_history"), ["greeting", "compact_history"])
+    builder.add_edge("greeting", "conversation_agent")
+    builder.add_edge("compact_history", "conversation_agent")
+    builder.add_conditional_edges(
+        "conversation_agent",
+        tools_condition
+    )
+    builder.add_edge("tools", "conversation_agent")
+    builder.add_edge("conversation_agent", END)
+    return builder.compile()
+
+# `graph` is built on first access, so importing this module has no side effects
+__getattr__ = lazy_graph(build_graph, globals())
+
+
+def main():
+    os.environ["LANGCHAIN_PROJECT"] = "Conversation_Agent"
+    load_dotenv()
+
+    # Each student has their own lesson thread; without an ID the most recently registered student is taught
+    student_id = sys.argv[1] if len(sys.argv) > 1 else (retrieve_student_profile() or {}).get("id")
+    sessions = SessionManager(build_graph(), "conversation")
+    # Resolved once: without any student a guest ID is made up, and the turn must run in that same thread
+    session = sessions.open(student_id)
+    # A returning student continues their thread, which already starts with the system prompt
+    messages = [HumanMessage(content="Hi")]
+    if not sessions.get_state(session.student_id).values.get("messages"):
+        # The 3 mistakes are graded offline (batch_grading.py), the lesson ends with finish_lesson
+        messages.insert(0, SystemMessage(content=conversation_class_agent_sys_prompt_V1_batch_grading))
+    sessions.invoke(session.student_id, {"messages": messages})
+
+
+if __name__ == "__main__":
+    main()
@@ -1,27 +1,45 @@
-from langchain_anthropic import ChatAnthropic
+import asyncio
 import os
-import csv
+import sys
+import threading
 import datetime
-import random
-import string
 from dotenv import load_dotenv
 import json
 
-from langgraph.graph import START, END, StateGraph, MessagesState
-from langchain_core.messages import HumanMessage, SystemMessage
+from langgraph.graph import START, END
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+from langchain_core.runnables import RunnableLambda
 
-from langgraph.checkpoint.memory import MemorySaver
-from agent_stt_module import SpeechToText
+# The shared storage and client modules live in the project root
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from greetings import VOICE_GATHERING_GREETING, has_assistant_turn
+from checkpointer import get_checkpointer
+from id_allocator import get_id_allocator
+from message_log import MessageLogGraph, MessageLogState
+from model_router import route_model
+from response_cache import acached_invoke, cached_invoke
+from streaming import ConsoleConsumer, astream_model, stream_model
+from profile_index import StudentProfile
+from student_store import get_student_store
+from graph_factories import lazy_graph
+from session_manager import SessionManager
 
-# Initialize components
-stt = SpeechToText()
-os.environ["LANGCHAIN_PROJECT"] = "info_gathering_voice"
-load_dotenv()
-llm = ChatAnthropic(
-    model="claude-3-5-haiku-20241022",
-    temperature=0
-)
-memory = MemorySaver()
+# Checkpoints live on disk with a retention policy, so a restart resumes the conversation
+CHECKPOINT_DB = "./05_initial_agent_Voice/.checkpoints/checkpoints.db"
+
+# The recorder is created on first use: it loads numpy/sounddevice and opens a temp directory,
+# which importing this module (e.g. by the langgraph server) must not do
+_stt = None
+_stt_lock = threading.Lock()
+
+def get_stt():
+    """Return the shared SpeechToText, created on first use"""
+    global _stt
+    with _stt_lock:
+        if _stt is None:
+            from agent_stt_module import SpeechToText
+            _stt = SpeechToText()
+    return _stt
 
 sys_prompt = """You are an AI Assistant designed to gather information about an user. You do not have the capacity nor will help in any other way.
 You are concrete and use only the most needed words to ask the questions to get the information.
@@ -45,165 +63,186 @@ Do not propose hobbies until the student has difficulties coming up with them.
 Hobbies cannot be too personal, for example, you do not accept sex, drug or harmful related topics.
 
 You have access to the following tool:
-Tool Name: save_initial_profile, Description: Creates a unique file with the base data of the student, Arguments: name: str, level: str, Hobbies: list
+Tool Name: save_initial_profile, Description: Saves the base data of the student in the student store and returns the student's unique ID, Arguments: name: str, language_level: str, hobbies: list, student_id: str (only to update a returning student)
 
 Only when you have all the information at hand, call the tool so we can save that information in our database.
 """
 
 def save_initial_profile(name, language_level, hobbies, student_id=None, db_path="./05_initial_agent_Voice/student_data"):
     """
-    Save a student profile to a CSV file with filename format: dateofcreation_name_ID.csv
+    Save a student profile to the consolidated student store (student_data/students.db).
+    Pass student_id only to update a returning student, a new unique ID is generated otherwise.
+    Returns the student's ID and "created" or "updated".
     """
     # Create directory if needed
     os.makedirs(db_path, exist_ok=True)
     
-    # Get current timestamp for both the filename and data
-    current_date = datetime.datetime.now().strftime("%Y%m%d")
+    # Get current timestamp for the registration date
     current_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
     
     # Generate student_id if not provided
+    # The allocator's persisted index guarantees uniqueness without listing the directory
+    allocator = get_id_allocator(db_path)
+    store = get_student_store(db_path)
+    existing = None
     if student_id is None:
-        # Generate a random 8-character alphanumeric ID
-        chars = string.ascii_uppercase + string.digits
-        student_id = ''.join(random.choice(chars) for _ in range(8))
-        
-        # Ensure the ID is unique by checking existing files
-        existing_ids = set()
-        if os.path.exists(db_path):
-            for filename in os.listdir(db_path):
-                if filename.endswith('.csv'):
-                    try:
-                        file_id = filename.split('_')[-1].split('.')[0]
-                        existing_ids.add(file_id)
-                    except (ValueError, IndexError):
-                        pass
-        
-        # Regenerate if there's a collision (unlikely but possible)
-        while student_id in existing_ids:
-            student_id = ''.join(random.choice(chars) for _ in range(8))
-    
-    # Create filename using the required format: dateofcreation_name_ID.csv
-    # Replace spaces in name with underscores for the filename
-    safe_name = name.replace(' ', '_')
-    filename = f"{current_date}_{safe_name}_{student_id}.csv"
-    full_path = os.path.join(db_path, filename)
+        student_id = allocator.allocate()
+    else:
+        allocator.reserve(student_id)
+        existing = store.get(student_id)
+    status = "updated" if existing is not None else "created"
     
-    # Format hobbies as a pipe-separated string (up to 3)
-    hobby_str = "|".join([h.strip() for h in hobbies[:3] if h.strip()])
+    # Format hobbies as a list (up to 3)
+    hobby_list = [h.strip() for h in hobbies[:3] if h.strip()]
     
-    # Write to CSV file
-    with open(full_path, 'w', newline='') as csvfile:
-        writer = csv.writer(csvfile)
-        writer.writerow(['id', 'name', 'language_level', 'registration_date', 'hobbies'])
-        writer.writerow([student_id, name, language_level, current_time, hobby_str])
+    # Write into the consolidated store instead of one CSV file per student. A returning
+    # student's name, level and hobbies replace the stored ones, the registration date is kept
+    store.add(StudentProfile(
+        id=student_id,
+        name=name,
+        language_level=language_level,
+        registration_date=existing['registration_date'] if existing else current_time,
+        hobbies=hobby_list,
+    ), replace=True)
     
-    return student_id, full_path
+    return student_id, status
 
-def listen_and_gathering_agent(state: MessagesState):
-    print("\n🎤 Listening... (speak to start)")
-    
-    # Record and transcribe using VAD
-    transcribed_text = stt.capture_and_transcribe()
-    
+def _greeting_if_new(messages):
+    # The opening greeting is fixed by the prompt, so it is printed locally instead of asking Claude
+    if has_assistant_turn(messages):
+        return []
+    print(f"\n🤖 Claude:\n {VOICE_GATHERING_GREETING}")
+    return [AIMessage(content=VOICE_GATHERING_GREETING)]
+
+def _user_message(transcribed_text):
     if not transcribed_text:
         transcribed_text = "I couldn't understand what you said. Could you please repeat?"
     
     print(f"🔊 You:\n \"{transcribed_text}\"")
-    
-    # Get existing messages and add user message
-    messages = state.get("messages", [])
-    user_message = {"role": "user", "content": transcribed_text}
-    messages.append(user_message)
-    
-    # Check if there's a pending tool call in previous messages
-    contains_tool_call = False
+    return HumanMessage(content=transcribed_text)
+
+def _pending_tool_use(messages):
+    """Return the first tool_use block left in previous messages, or None"""
     for msg in messages:
         content = msg.get("content") if isinstance(msg, dict) else getattr(msg, "content", None)
         if isinstance(content, list):
             for item in content:
                 if isinstance(item, dict) and item.get("type") == "tool_use":
-                    contains_tool_call = True
-                    tool_id = item.get("id")
-                    tool_name = item.get("name")
-                    tool_args = item.get("input", {})
-                    
-                    # Execute the tool
-                    print(f"Executing tool: {tool_name} with args: {tool_args}")
-                    result = save_initial_profile(**tool_args)
-                    print(f"Profile saved! ID: {result[0]}, File: {result[1]}")
-                    
-                    # Generate farewell separately
-                    farewell_prompt = f"""
-                    The student profile for Luis has been successfully created with ID {result[0]}. 
+                    return item
+    return None
+
+def _run_tool(tool_name, tool_args):
+    print(f"Executing tool: {tool_name} with args: {tool_args}")
+    result = save_initial_profile(**tool_args)
+    print(f"Profile {result[1]}! ID: {result[0]}")
+    return result
+
+def _pending_farewell_prompt(result):
+    return f"""
+                    The student profile for Luis has been successfully {result[1]} with ID {result[0]}. 
                     The profile includes their German level (beginner) and hobbies.
                     Please provide a friendly farewell message to the user, thanking them and wishing them
                     well on their German learning journey.
                     """
-                    
-                    farewell = llm.invoke(farewell_prompt)
-                    print(f"\n🤖 Claude (Farewell):\n \"{farewell.content}\"")
-                    
-                    # Save state and end conversation
-                    save_conversation(messages)
-                    return {"messages": messages, "next": "__end__"}
+
+def _farewell_prompt(result):
+    return f"""
+        Tell the student that his or her profile has been successfully {result[1]} with ID {result[0]}. 
+        You have to say goodbye to the student and wish him or her luck in his or her German adventure in a fun and polite way!
+        Directly start this message, do not tell me "here is the message" before.
+        """
+
+def listen_and_gathering_agent(state: MessageLogState):
+    # Only the new messages are returned, the reducer appends them to the log
+    new_messages = _greeting_if_new(state["messages"])
+    print("\n🎤 Listening... (speak to start)")
     
-    # If no pending tool call, get next AI response
-    ai_response = llm_with_tools.invoke(messages)
+    # Record and transcribe using VAD
+    new_messages.append(_user_message(get_stt().capture_and_transcribe()))
+    # History + new messages for the model, shares the log instead of copying it
+    messages = state["messages"].extend(new_messages)
     
-    # Format for display
-    if isinstance(ai_response.content, list):
-        text_parts = []
-        for item in ai_response.content:
-            if isinstance(item, dict) and item.get('type') == 'text':
-                text_parts.append(item.get('text', ''))
-        display_text = '\n'.join(text_parts)
-    else:
-        display_text = ai_response.content
+    # Check if there's a pending tool call in previous messages
+    item = _pending_tool_use(messages)
+    if item is not None:
+        result = _run_tool(item.get("name"), item.get("input", {}))
         
-    print(f"\n🤖 Claude:\n \"{display_text}\"")
+        # Only the student ID differs between farewells, so it is a slot of the cached answer
+        farewell = cached_invoke(route_model("farewell_node"), _pending_farewell_prompt(result), slots={"student_id": result[0]})
+        print(f"\n🤖 Claude (Farewell):\n \"{farewell.content}\"")
+        
+        # Save state and end conversation
+        save_conversation(messages)
+        return {"messages": new_messages, "next": "__end__"}
+    
+    # If no pending tool call, stream the next AI response to the console as it is generated
+    ai_response = stream_model(
+        "listen_and_gathering_agent", route_model("listen_and_gathering_agent", tools=[save_initial_profile]), messages,
+        [ConsoleConsumer(prefix="\n🤖 Claude:\n ")]
+    )
+    new_messages.append(ai_response)
+    messages = messages.append(ai_response)
     
     # Check if this new response contains a tool call
-    if isinstance(ai_response.content, list):
-        for item in ai_response.content:
-            if isinstance(item, dict) and item.get("type") == "tool_use":
-                tool_name = item.get("name")
-                tool_args = item.get("input", {})
-                
-                print(f"Executing tool: {tool_name} with args: {tool_args}")
-                result = save_initial_profile(**tool_args)
-                print(f"Profile saved! ID: {result[0]}, File: {result[1]}")
-                
-                # Generate farewell separately
-                farewell_prompt = f"""
-                Tell the student that his or her profile has been successfully created with ID {result[0]}. 
-                You have to say goodbye to the student and wish him or her luck in his or her German adventure in a fun and polite way!
-                Directly start this message, do not tell me "here is the message" before.
-                """
-                
-                farewell = llm.invoke(farewell_prompt)
-                print(f"\n🤖 Claude (Farewell):\n \"{farewell.content}\"")
-                
-                # Add AI response to messages and save
-                messages.append(ai_response)
-                save_conversation(messages)
-                
-                # End the conversation
-                return {"messages": messages, "next": "__end__"}
+    for tool_call in ai_response.tool_calls:
+        result = _run_tool(tool_call["name"], tool_call["args"])
+        farewell = cached_invoke(route_model("farewell_node"), _farewell_prompt(result), slots={"student_id": result[0]})
+        print(f"\n🤖 Claude (Farewell):\n \"{farewell.content}\"")
+        
+        # Save and end the conversation
+        save_conversation(messages)
+        return {"messages": new_messages, "next": "__end__"}
     
     # If no tool call, continue normally
-    messages.append(ai_response)
     save_conversation(messages)
-    return {"messages": messages}
+    return {"messages": new_messages}
 
-# Set up LLM with tools
-llm_with_tools = llm.bind_tools([save_initial_profile])
+async def alisten_and_gathering_agent(state: MessageLogState):
+    # Same turn as listen_and_gathering_agent, but recording, saving and the
+    # model calls are awaited so one process can serve many sessions
+    new_messages = _greeting_if_new(state["messages"])
+    print("\n🎤 Listening... (speak to start)")
+    
+    new_messages.append(_user_message(await asyncio.to_thread(lambda: get_stt().capture_and_transcribe())))
+    messages = state["messages"].extend(new_messages)
+    
+    item = _pending_tool_use(messages)
+    if item is not None:
+        result = await asyncio.to_thread(_run_tool, item.get("name"), item.get("input", {}))
+        farewell = await acached_invoke(route_model("farewell_node"), _pending_farewell_prompt(result), slots={"student_id": result[0]})
+        print(f"\n🤖 Claude (Farewell):\n \"{farewell.content}\"")
+        await asyncio.to_thread(save_conversation, messages)
+        return {"messages": new_messages, "next": "__end__"}
+    
+    ai_response = await astream_model(
+        "listen_and_gathering_agent", route_model("listen_and_gathering_agent", tools=[save_initial_profile]), messages,
+        [ConsoleConsumer(prefix="\n🤖 Claude:\n ")]
+    )
+    new_messages.append(ai_response)
+    messages = messages.append(ai_response)
+    
+    for tool_call in ai_response.tool_calls:
+        result = await asyncio.to_thread(_run_tool, tool_call["name"], tool_call["args"])
+        farewell = await acached_invoke(route_model("farewell_node"), _farewell_prompt(result), slots={"student_id": result[0]})
+        print(f"\n🤖 Claude (Farewell):\n \"{farewell.content}\"")
+        await asyncio.to_thread(save_conversation, messages)
+        return {"messages": new_messages, "next": "__end__"}
+    
+    await asyncio.to_thread(save_conversation, messages)
+    return {"messages": new_messages}
 
 # Build the graph
-builder = StateGraph(MessagesState)
-builder.add_node("listen_and_gathering_agent", listen_and_gathering_agent)
-builder.add_edge(START, "listen_and_gathering_agent")
-builder.add_edge("listen_and_gathering_agent", END)
-graph = builder.compile(checkpointer=memory)
+def build_graph():
+    """Graph factory for langgraph.json, compiles the graph on demand"""
+    builder = MessageLogGraph(MessageLogState)
+    builder.add_node("listen_and_gathering_agent", RunnableLambda(listen_and_gathering_agent, afunc=alisten_and_gathering_agent))
+    builder.add_edge(START, "listen_and_gathering_agent")
+    builder.add_edge("listen_and_gathering_agent", END)
+    # No checkpointer here: the langgraph server brings its own, main() attaches the SQLite one
+    return builder.compile()
+
+# `graph` is built on first access, so importing this module has no side effects
+__getattr__ = lazy_graph(build_graph, globals())
 
 # File management functions
 def save_conversation(messages, file_path="./05_initial_agent_Voice/conversation_state.json"):
@@ -266,15 +305,30 @@ def load_conversation(file_path="./05_initial_agent_Voice/conversation_state.jso
     return messages
 
 # Main execution
-initial_messages = load_conversation()
+def main():
+    os.environ["LANGCHAIN_PROJECT"] = "info_gathering_voice"
+    load_dotenv()
 
-if initial_messages:
-    final_output = graph.invoke(
-        {"messages": initial_messages},
-        {"configurable": {"thread_id": "voice_memory_test"}}
-    )
-else:
-    final_output = graph.invoke(
-        {"messages": [SystemMessage(content=sys_prompt)]},
-        {"configurable": {"thread_id": "voice_memory_test"}}
-    )
\ No newline at end of file
+    # One thread per student: pass the session ID printed below to continue that conversation
+    sessions = SessionManager(build_graph(), "info_gathering_voice", checkpointer=get_checkpointer(CHECKPOINT_DB))
+    resuming = len(sys.argv) > 1
+    session = sessions.open(sys.argv[1] if resuming else None)
+    print(f"Session: {session.student_id}")
+    # The JSON copy is a fallback for a resumed session whose checkpoints are gone, never for a new student
+    initial_messages = load_conversation() if resuming else None
+
+    try:
+        if sessions.get_state(session.student_id).values:
+            # The checkpointer already holds this thread, continue where it stopped
+            final_output = sessions.invoke(session.student_id, {"messages": []})
+        elif initial_messages:
+            final_output = sessions.invoke(session.student_id, {"messages": initial_messages})
+        else:
+            final_output = sessions.invoke(session.student_id, {"messages": [SystemMessage(content=sys_prompt)]})
+    finally:
+        if _stt is not None:
+            _stt.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+"""
+Offline grading of finished lessons.
+
+The conversation agent no longer picks the student's 3 mistakes live: at the
+end of a lesson it calls finish_lesson, which queues the transcript in the
+student store and lets the session end right away. `python batch_grading.py run`
+later submits all queued transcripts in large batches to a batch backend and
+writes each grading back next to the student's profile.
+"""
+import argparse
+import datetime
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import HumanMessage
+
+from llm_clients import get_chat_model
+from model_router import select_model
+from streaming import message_text
+from student_store import get_student_store
+from system_prompts import grading_prompt
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS lesson_transcripts (
+    id INTEGER PRIMARY KEY,
+    student_id TEXT NOT NULL,
+    finished_at TEXT NOT NULL,
+    language_level TEXT NOT NULL,
+    answers TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    batch_id TEXT,
+    grading TEXT,
+    graded_at TEXT
+);
+
+CREATE INDEX IF NOT EXISTS lesson_transcripts_by_status ON lesson_transcripts (status, batch_id);
+CREATE INDEX IF NOT EXISTS lesson_transcripts_by_student ON lesson_transcripts (student_id, finished_at);
+'''
+
+
+def student_answers(messages):
+    """Return the text of every student message of a lesson."""
+    answers = []
+    for message in messages:
+        if isinstance(message, HumanMessage):
+            text = message_text(message)
+        elif isinstance(message, dict) and message.get("role") == "user":
+            text = message.get("content", "")
+        else:
+            continue
+        if text.strip():
+            answers.append(text.strip())
+    return answers
+
+
+class LocalBatchBackend:
+    """
+    Grades a batch in-process with llm.batch on a background thread. Stand-in
+    for the Anthropic batch API in tests and for small local runs.
+    """
+
+    def __init__(self, llm):
+        self.llm = llm
+        self._batches = {}  # batch ID -> Future of {custom_id: grading text or Exception}
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="local-batch")
+
+    def submit(self, requests):
+        """Queue requests ({"custom_id", "prompt"}) for grading and return the batch ID."""
+        batch_id = f"local_{uuid.uuid4().hex[:12]}"
+        self._batches[batch_id] = self._executor.submit(self._grade, list(requests))
+        return batch_id
+
+    def _grade(self, requests):
+        responses = self.llm.batch([r["prompt"] for r in requests], return_exceptions=True)
+        return {
+            r["custom_id"]: response if isinstance(response, Exception) else message_text(response)
+            for r, response in zip(requests, responses)
+        }
+
+    def results(self, batch_id):
+        """
+        Return {custom_id: grading text or Exception}, or None while the batch is running.
+
+        A batch ID this backend never saw (submitted by an earlier process) has
+        ended without results, so collect puts its lessons back in the queue.
+        """
+        future = self._batches.get(batch_id)
+        if future is None:
+            return {}
+        if not future.done():
+            return None
+        return future.result()
+
+
+class AnthropicBatchBackend:
+    """
+    Grades through the Anthropic Message Batches API (half the price of live
+    calls, results within 24 hours).
+
+    Parameters:
+    - model: Model that grades the lessons
+    - max_tokens: Maximum tokens of one grading
+    - client: anthropic.Anthropic client (default: one built from ANTHROPIC_API_KEY)
+    """
+
+    def __init__(self, model="claude-3-5-haiku-20241022", max_tokens=1024, client=None):
+        self.model = model
+        self.max_tokens = max_tokens
+        if client is None:
+            # Only the batch runner needs the anthropic SDK, importing it is slow
+            import anthropic
+            client = anthropic.Anthropic()
+        self.client = client
+
+    def submit(self, requests):
+        batch = self.client.messages.batches.create(requests=[
+            {
+                "custom_id": r["custom_id"],
+                "params": {
+                    "model": self.model,
+                    "max_tokens": self.max_tokens,
+                    "temperature": 0,
+                    "messages": [{"role": "user", "content": r["prompt"]}],
+                },
+            }
+            for r in requests
+        ])
+        return batch.id
+
+    def results(self, batch_id):
+        if self.client.messages.batches.retrieve(batch_id).processing_status != "ended":
+            return None
+
+        results = {}
+        for entry in self.client.messages.batches.results(batch_id):
+            if entry.result.type == "succeeded":
+                results[entry.custom_id] = "".join(
+                    block.text for block in entry.result.message.content if block.type == "text"
+                )
+            else:
+                results[entry.custom_id] = RuntimeError(f"Batch request {entry.result.type}")
+        return results
+
+
+class GradingQueue:
+    """
+    Finished lesson transcripts waiting for grading, stored in the student store.
+
+    Parameters:
+    - db_path: Directory of the student store (default: "./student_data")
+    """
+
+    def __init__(self, db_path="./student_data"):
+        self.store = get_student_store(db_path)
+        with self.store.pool.connection() as conn:
+            conn.executescript(SCHEMA)
+
+    def enqueue(self, student_id, messages):
+        """
+        Queue the transcript of a finished lesson for grading.
+
+        Parameters:
+        - student_id: ID of the student who took the lesson
+        - messages: Messages of the lesson (only the student's answers are kept)
+
+        Returns:
+        - transcript_id: ID of the queued transcript
+        """
+        profile = self.store.get(student_id)
+        level = profile['language_level'] if profile else "unknown"
+        finished_at = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+        with self.store.pool.transaction(durable=True) as conn:
+            cursor = conn.execute(
+                "INSERT INTO lesson_transcripts (student_id, finished_at, language_level, answers) VALUES (?, ?, ?, ?)",
+                (student_id, finished_at, level, json.dumps(student_answers(messages), ensure_ascii=False))
+            )
+        return cursor.lastrowid
+
+    def submit_pending(self, backend, batch_size=10000):
+        """
+        Send every pending transcript to the backend, batch_size per batch.
+
+        Returns:
+        - batch_ids: IDs of the submitted batches
+        """
+        batch_ids = []
+        while True:
+            with self.store.pool.connection() as conn:
+                rows = conn.execute(
+                    "SELECT id, language_level, answers FROM lesson_transcripts WHERE status = 'pending' ORDER BY id LIMIT ?",
+                    (batch_size,)
+                ).fetchall()
+            if not rows:
+                return batch_ids
+
+            requests = [
+                {
+                    "custom_id": str(transcript_id),
+                    "prompt": grading_prompt.format(
+                        level=level,
+                        answers="\n\n".join(f"{i}. {a}" for i, a in enumerate(json.loads(answers), 1)),
+                    ),
+                }
+                for transcript_id, level, answers in rows
+            ]
+            batch_id = backend.submit(requests)
+            with self.store.pool.transaction() as conn:
+                conn.executemany(
+                    "UPDATE lesson_transcripts SET status = 'submitted', batch_id = ? WHERE id = ?",
+                    [(batch_id, row[0]) for row in rows]
+                )
+            batch_ids.append(batch_id)
+
+    def collect(self, backend):
+        """
+        Write the results of every finished batch back to the transcripts.
+
+        Returns:
+        - collected: Number of transcripts that got a result (graded or failed)
+        """
+        with self.store.pool.connection() as conn:
+            batch_ids = [row[0] for row in conn.execute(
+                "SELECT DISTINCT batch_id FROM lesson_transcripts WHERE status = 'submitted'"
+            )]
+
+        collected = 0
+        for batch_id in batch_ids:
+            results = backend.results(batch_id)
+            if results is None:
+                continue
+
+            graded_at = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            updates = []
+            for custom_id, result in results.items():
+                if isinstance(result, Exception):
+                    updates.append(("failed", str(result), graded_at, int(custom_id)))
+                else:
+                    updates.append(("graded", result, graded_at, int(custom_id)))
+            with self.store.pool.transaction(durable=True) as conn:
+                conn.executemany(
+                    "UPDATE lesson_transcripts SET status = ?, grading = ?, graded_at = ? WHERE id = ?",
+                    updates
+                )
+                # Requests missing from the results go back to the queue
+                conn.execute(
+                    "UPDATE lesson_transcripts SET status = 'pending', batch_id = NULL "
+                    "WHERE batch_id = ? AND status = 'submitted'",
+                    (batch_id,)
+                )
+            collected += len(updates)
+        return collected
+
+    def run(self, backend, batch_size=10000, poll_interval=60):
+        """Submit everything pending and wait until all submitted batches have results."""
+        self.submit_pending(backend, batch_size)
+        collected = self.collect(backend)
+        while self.count("submitted"):
+            time.sleep(poll_interval)
+            collected += self.collect(backend)
+        return collected
+
+    def count(self, status):
+        with self.store.pool.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM lesson_transcripts WHERE status = ?", (status,)).fetchone()[0]
+
+    def gradings_for(self, student_id):
+        """Return the lessons of a student, most recent first, with their status and grading."""
+        with self.store.pool.connection() as conn:
+            rows = conn.execute(
+                "SELECT finished_at, status, grading, graded_at FROM lesson_transcripts "
+                "WHERE student_id = ? ORDER BY finished_at DESC",
+                (student_id,)
+            ).fetchall()
+        return [
+            {"finished_at": finished_at, "status": status, "grading": grading, "graded_at": graded_at}
+            for finished_at, status, grading, graded_at in rows
+        ]
+
+
+_queues = {}
+_queues_lock = threading.Lock()
+
+
+def get_grading_queue(db_path="./student_data"):
+    """
+    Return the shared GradingQueue for db_path, creating it on first use.
+    """
+    key = os.path.abspath(db_path)
+    with _queues_lock:
+        queue = _queues.get(key)
+        if queue is None:
+            queue = GradingQueue(db_path)
+            _queues[key] = queue
+    return queue
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Grade finished lessons in batches")
+    parser.add_argument("--db-path", default="./student_data", help="Directory of the student store")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    run = subcommands.add_parser("run", help="Submit queued lessons and write back the gradings")
+    run.add_argument("--backend", choices=["local", "anthropic"], default="anthropic")
+    run.add_argument("--model", help="Grading model (default: the model routed to batch_grading)")
+    run.add_argument("--batch-size", type=int, default=10000)
+    run.add_argument("--poll-interval", type=float, help="Seconds between result polls (default: 60, 1 with the local backend)")
+
+    show = subcommands.add_parser("show", help="Print the gradings of a student")
+    show.add_argument("student_id")
+
+    args = parser.parse_args(argv)
+    queue = get_grading_queue(args.db_path)
+
+    if args.command == "run":
+        model = args.model or select_model("batch_grading")
+        if args.backend == "local":
+            backend = LocalBatchBackend(get_chat_model(model, temperature=0))
+            poll_interval = 1 if args.poll_interval is None else args.poll_interval
+        else:
+            backend = AnthropicBatchBackend(model)
+            poll_interval = 60 if args.poll_interval is None else args.poll_interval
+        pending = queue.count("pending")
+        start = time.perf_counter()
+        collected = queue.run(backend, batch_size=args.batch_size, poll_interval=poll_interval)
+        print(
+            f"Submitted {pending} lessons, collected {collected} results in {time.perf_counter() - start:.1f}s "
+            f"({queue.count('failed')} failed in total)"
+        )
+    elif args.command == "show":
+        for lesson in queue.gradings_for(args.student_id):
+            print(f"Lesson of {lesson['finished_at']} [{lesson['status']}]")
+            if lesson['grading']:
+                print(lesson['grading'])
+            print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,408 @@
+"""
+Disk-backed, bounded checkpointer for the chat graphs.
+
+MemorySaver keeps every checkpoint of every thread in process memory until
+the process dies, and then they are all gone. BoundedSqliteSaver stores
+them in SQLite (langgraph-checkpoint-sqlite) and applies a retention policy:
+only the last keep_last checkpoints of each thread are kept, and threads
+that were idle longer than thread_ttl_s are deleted. Memory stays flat,
+and resuming a thread after a restart is one indexed lookup.
+
+Checkpoints are also delta encoded: instead of the whole message list, a
+checkpoint stores only the messages appended since its parent, with a full
+snapshot every snapshot_every checkpoints, and blobs are zlib compressed.
+A checkpoint costs O(new messages) on disk and rebuilding one reads at most
+snapshot_every rows. For MessageLog channels the prefix is not compared
+message by message: the checkpoints remember the log they were taken from
+(LogSnapshot), and logs sharing a history extend each other. Trimming never cuts a delta chain: older checkpoints
+are only deleted up to the snapshot the oldest kept checkpoint builds on, so
+a thread keeps at most keep_last + snapshot_every - 1 checkpoints and no
+checkpoint is ever rewritten.
+"""
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from langgraph.checkpoint.base import get_checkpoint_metadata
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+from message_log import LogSnapshot
+
+
+CHECKPOINT_PATH = os.getenv("CHECKPOINT_PATH", "./.checkpoints/checkpoints.db")
+CHECKPOINT_KEEP_LAST = int(os.getenv("CHECKPOINT_KEEP_LAST", "10"))
+CHECKPOINT_THREAD_TTL_S = float(os.getenv("CHECKPOINT_THREAD_TTL_S", str(7 * 24 * 3600)))
+CHECKPOINT_SNAPSHOT_EVERY = int(os.getenv("CHECKPOINT_SNAPSHOT_EVERY", "20"))
+
+ACTIVITY_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS thread_activity (
+    thread_id TEXT PRIMARY KEY,
+    last_used REAL NOT NULL
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS thread_activity_by_use ON thread_activity (last_used);
+
+-- Which checkpoint a delta checkpoint builds on (base_id NULL for full snapshots)
+CREATE TABLE IF NOT EXISTS checkpoint_chain (
+    thread_id TEXT NOT NULL,
+    checkpoint_ns TEXT NOT NULL DEFAULT '',
+    checkpoint_id TEXT NOT NULL,
+    base_id TEXT,
+    depth INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (thread_id, checkpoint_ns, checkpoint_id)
+) WITHOUT ROWID;
+'''
+
+# Marker replacing the message list of a delta checkpoint
+DELTA_KEY = "__delta_base__"
+
+
+class CompressedSerializer:
+    """
+    Wraps a checkpoint serializer and zlib-compresses blobs of min_size bytes or more.
+
+    Compressed blobs get a "z:" type prefix, so uncompressed blobs written
+    before still load.
+    """
+
+    def __init__(self, inner=None, level=6, min_size=256):
+        self.inner = inner or JsonPlusSerializer()
+        self.level = level
+        self.min_size = min_size
+
+    def dumps_typed(self, obj):
+        type_, data = self.inner.dumps_typed(obj)
+        if len(data) >= self.min_size:
+            return "z:" + type_, zlib.compress(data, self.level)
+        return type_, data
+
+    def loads_typed(self, data):
+        type_, blob = data
+        if type_.startswith("z:"):
+            return self.inner.loads_typed((type_[2:], zlib.decompress(blob)))
+        return self.inner.loads_typed(data)
+
+
+def _is_delta(messages):
+    return isinstance(messages, dict) and DELTA_KEY in messages
+
+
+def _same_message(a, b):
+    return a is b or (getattr(a, "id", None) == getattr(b, "id", None) and a == b)
+
+
+def _appended(previous, messages):
+    """Return the messages appended to previous, or None if messages does not extend it."""
+    if isinstance(previous, LogSnapshot) and isinstance(messages, LogSnapshot) and messages.log.extends(previous.log):
+        # Same MessageLog history, the prefix cannot have changed
+        return messages[len(previous):]
+    if not isinstance(messages, list) or len(messages) < len(previous):
+        return None
+    if not all(_same_message(a, b) for a, b in zip(previous, messages)):
+        # Messages were removed or replaced (e.g. history compaction)
+        return None
+    return messages[len(previous):]
+
+
+class BoundedSqliteSaver(SqliteSaver):
+    """
+    SqliteSaver with a retention policy, delta encoded messages and async methods.
+
+    Parameters:
+    - path: SQLite file holding the checkpoints (default: CHECKPOINT_PATH)
+    - keep_last: Checkpoints kept per thread and namespace, older ones are deleted on write
+      (together with their delta chain, so up to snapshot_every - 1 more are kept)
+    - thread_ttl_s: Threads without a new checkpoint for this long are deleted
+    - expire_every: Run the idle thread expiry after this many checkpoint writes
+    - snapshot_every: Store the full message list at least every this many checkpoints
+      (1 turns delta encoding off)
+    - clock: Function returning the current time in seconds (for tests)
+    - serde: Checkpoint serializer (default: JsonPlusSerializer with compression)
+    """
+
+    def __init__(self, path=CHECKPOINT_PATH, keep_last=CHECKPOINT_KEEP_LAST,
+                 thread_ttl_s=CHECKPOINT_THREAD_TTL_S, expire_every=100,
+                 snapshot_every=CHECKPOINT_SNAPSHOT_EVERY, clock=time.time, serde=None):
+        if snapshot_every < 1:
+            raise ValueError(f"snapshot_every must be at least 1, got {snapshot_every}")
+
+        # Create directory if needed
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        super().__init__(sqlite3.connect(path, check_same_thread=False), serde=serde or CompressedSerializer())
+        self.path = path
+        self.keep_last = keep_last
+        self.thread_ttl_s = thread_ttl_s
+        self.expire_every = expire_every
+        self.snapshot_every = snapshot_every
+        self.clock = clock
+        self._puts = 0
+        # (thread_id, checkpoint_ns) -> (checkpoint_id, messages, depth) of the newest
+        # checkpoint seen, the parent the next delta is computed against
+        self._heads = OrderedDict()
+        self._max_heads = 1024
+        self._heads_lock = threading.Lock()
+
+    def setup(self):
+        if self.is_setup:
+            return
+        super().setup()
+        self.conn.executescript(ACTIVITY_SCHEMA)
+        # Checkpoints are rewritten every turn; WAL + NORMAL keeps that to one fsync per checkpoint
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+
+    def _remember_head(self, thread_id, checkpoint_ns, checkpoint_id, messages, depth):
+        if not isinstance(messages, list):
+            return
+        if not isinstance(messages, LogSnapshot):
+            # Copy: the list must not change under us if the graph mutates it later
+            messages = list(messages)
+        key = (thread_id, checkpoint_ns)
+        head = (checkpoint_id, messages, depth)
+        with self._heads_lock:
+            self._heads[key] = head
+            self._heads.move_to_end(key)
+            while len(self._heads) > self._max_heads:
+                self._heads.popitem(last=False)
+
+    def _encode(self, thread_id, checkpoint_ns, parent_id, checkpoint):
+        """Return (checkpoint to store, base checkpoint ID or None, depth)."""
+        messages = checkpoint["channel_values"].get("messages")
+        with self._heads_lock:
+            head = self._heads.get((thread_id, checkpoint_ns))
+
+        appended = None
+        if head is not None and head[0] == parent_id and head[2] + 1 < self.snapshot_every:
+            appended = _appended(head[1], messages)
+        if appended is None:
+            return checkpoint, None, 0
+
+        delta = {DELTA_KEY: parent_id, "messages": appended}
+        stored = {**checkpoint, "channel_values": {**checkpoint["channel_values"], "messages": delta}}
+        return stored, parent_id, head[2] + 1
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = str(config["configurable"]["thread_id"])
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+        parent_id = config["configurable"].get("checkpoint_id")
+
+        stored, base_id, depth = self._encode(thread_id, checkpoint_ns, parent_id, checkpoint)
+        type_, serialized_checkpoint = self.serde.dumps_typed(stored)
+        serialized_metadata = json.dumps(
+            get_checkpoint_metadata(config, metadata), ensure_ascii=False
+        ).encode("utf-8", "ignore")
+
+        # Checkpoint, chain link, activity and trimming commit together
+        with self.cursor() as cur:
+            cur.execute(
+                "INSERT OR REPLACE INTO checkpoints (thread_id, checkpoint_ns, checkpoint_id, parent_checkpoint_id, type, checkpoint, metadata) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint["id"], parent_id, type_, serialized_checkpoint, serialized_metadata)
+            )
+            cur.execute(
+                "INSERT OR REPLACE INTO checkpoint_chain (thread_id, checkpoint_ns, checkpoint_id, base_id, depth) VALUES (?, ?, ?, ?, ?)",
+                (thread_id, checkpoint_ns, checkpoint["id"], base_id, depth)
+            )
+            cur.execute(
+                "INSERT OR REPLACE INTO thread_activity (thread_id, last_used) VALUES (?, ?)",
+                (thread_id, self.clock())
+            )
+            if self.keep_last:
+                self._trim(cur, thread_id, checkpoint_ns)
+
+        self._remember_head(thread_id, checkpoint_ns, checkpoint["id"], checkpoint["channel_values"].get("messages"), depth)
+
+        self._puts += 1
+        if self.expire_every and self._puts % self.expire_every == 0:
+            self.expire_idle_threads()
+
+        return {
+            "configurable": {
+                "thread_id": config["configurable"]["thread_id"],
+                "checkpoint_ns": checkpoint_ns,
+                "checkpoint_id": checkpoint["id"],
+            }
+        }
+
+    def _trim(self, cur, thread_id, checkpoint_ns):
+        # Checkpoint IDs are time-ordered (uuid6), so the newest sort last
+        kept = [row[0] for row in cur.execute(
+            "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+            "ORDER BY checkpoint_id DESC LIMIT ?",
+            (thread_id, checkpoint_ns, self.keep_last)
+        ).fetchall()]
+        if len(kept) < self.keep_last:
+            return
+
+        # Cut at the snapshot the oldest kept delta chain starts from, so no kept
+        # checkpoint loses its base and nothing has to be rewritten
+        bases = dict(cur.execute(
+            "SELECT checkpoint_id, base_id FROM checkpoint_chain WHERE thread_id = ? AND checkpoint_ns = ?",
+            (thread_id, checkpoint_ns)
+        ).fetchall())
+        cut = kept[-1]
+        for checkpoint_id in kept:
+            while bases.get(checkpoint_id) is not None:
+                checkpoint_id = bases[checkpoint_id]
+            cut = min(cut, checkpoint_id)
+
+        cur.execute(
+            "DELETE FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+            (thread_id, checkpoint_ns, cut)
+        )
+        if cur.rowcount:
+            for table in ("writes", "checkpoint_chain"):
+                cur.execute(
+                    f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+                    (thread_id, checkpoint_ns, cut)
+                )
+
+    def _load(self, cur, thread_id, checkpoint_ns, checkpoint_id):
+        row = cur.execute(
+            "SELECT type, checkpoint FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+            (thread_id, checkpoint_ns, checkpoint_id)
+        ).fetchone()
+        if row is None:
+            raise KeyError(f"Checkpoint {checkpoint_id} of thread {thread_id} is missing from the delta chain")
+        return self.serde.loads_typed(row)
+
+    def _materialize(self, cur, thread_id, checkpoint_ns, checkpoint):
+        """Return checkpoint with its full message list, following the delta chain."""
+        messages = checkpoint["channel_values"].get("messages")
+        if not _is_delta(messages):
+            return checkpoint
+
+        deltas = []
+        while _is_delta(messages):
+            deltas.append(messages["messages"])
+            messages = self._load(cur, thread_id, checkpoint_ns, messages[DELTA_KEY])["channel_values"].get("messages")
+
+        full = list(messages or [])
+        for delta in reversed(deltas):
+            full.extend(delta)
+        return {**checkpoint, "channel_values": {**checkpoint["channel_values"], "messages": full}}
+
+    def _full(self, saved):
+        configurable = saved.config["configurable"]
+        thread_id = str(configurable["thread_id"])
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        with self.cursor(transaction=False) as cur:
+            checkpoint = self._materialize(cur, thread_id, checkpoint_ns, saved.checkpoint)
+        return saved._replace(checkpoint=checkpoint)
+
+    def get_tuple(self, config):
+        saved = super().get_tuple(config)
+        if saved is None:
+            return None
+        saved = self._full(saved)
+
+        # A resumed thread continues its delta chain from the loaded checkpoint
+        configurable = saved.config["configurable"]
+        with self.cursor(transaction=False) as cur:
+            row = cur.execute(
+                "SELECT depth FROM checkpoint_chain WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id = ?",
+                (str(configurable["thread_id"]), configurable.get("checkpoint_ns", ""), configurable["checkpoint_id"])
+            ).fetchone()
+        self._remember_head(
+            str(configurable["thread_id"]), configurable.get("checkpoint_ns", ""), configurable["checkpoint_id"],
+            saved.checkpoint["channel_values"].get("messages"), row[0] if row else 0
+        )
+        return saved
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        # SqliteSaver.list holds the connection lock while it yields, collect first
+        for saved in list(super().list(config, filter=filter, before=before, limit=limit)):
+            yield self._full(saved)
+
+    def expire_idle_threads(self, now=None):
+        """
+        Delete every thread that had no new checkpoint for thread_ttl_s.
+
+        Returns:
+        - expired: Number of deleted threads
+        """
+        if not self.thread_ttl_s:
+            return 0
+        cutoff = (now if now is not None else self.clock()) - self.thread_ttl_s
+        with self.cursor() as cur:
+            idle = [row[0] for row in cur.execute(
+                "SELECT thread_id FROM thread_activity WHERE last_used < ?", (cutoff,)
+            ).fetchall()]
+            for thread_id in idle:
+                for table in ("checkpoints", "writes", "checkpoint_chain", "thread_activity"):
+                    cur.execute(f"DELETE FROM {table} WHERE thread_id = ?", (thread_id,))
+        for thread_id in idle:
+            self.release(thread_id)
+        return len(idle)
+
+    def delete_thread(self, thread_id):
+        super().delete_thread(thread_id)
+        with self.cursor() as cur:
+            cur.execute("DELETE FROM checkpoint_chain WHERE thread_id = ?", (str(thread_id),))
+            cur.execute("DELETE FROM thread_activity WHERE thread_id = ?", (str(thread_id),))
+        self.release(thread_id)
+
+    def release(self, thread_id):
+        """
+        Drop the cached newest messages of thread_id from memory.
+
+        Call it when a thread goes idle; the next get_tuple of the thread loads them again.
+        """
+        thread_id = str(thread_id)
+        with self._heads_lock:
+            for key in [key for key in self._heads if key[0] == thread_id]:
+                del self._heads[key]
+
+    def has_thread(self, thread_id):
+        """True if thread_id has checkpoints (and was not expired)."""
+        with self.cursor(transaction=False) as cur:
+            return cur.execute(
+                "SELECT 1 FROM thread_activity WHERE thread_id = ?", (str(thread_id),)
+            ).fetchone() is not None
+
+    def thread_count(self):
+        with self.cursor(transaction=False) as cur:
+            return cur.execute("SELECT COUNT(*) FROM thread_activity").fetchone()[0]
+
+    # SqliteSaver is sync only; the async graph path runs the same SQLite work on a thread
+
+    async def aget_tuple(self, config):
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        checkpoints = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for checkpoint in checkpoints:
+            yield checkpoint
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id):
+        return await asyncio.to_thread(self.delete_thread, thread_id)
+
+
+_savers = {}
+_savers_lock = threading.Lock()
+
+
+def get_checkpointer(path=CHECKPOINT_PATH):
+    """
+    Return the shared BoundedSqliteSaver for path, creating it on first use.
+    """
+    key = os.path.abspath(path)
+    with _savers_lock:
+        saver = _savers.get(key)
+        if saver is None:
+            saver = BoundedSqliteSaver(path)
+            _savers[key] = saver
+    return saver
@@ -2,11 +2,12 @@
 Voice-enabled AI agent using LangGraph with ElevenLabs for speech-to-text and Anthropic's Claude.
 Uses Voice Activity Detection for more natural conversations and Text-to-Speech for responses.
 """
+import asyncio
 import os
 from typing import TypedDict, List, Dict, Any, Optional
 from dotenv import load_dotenv
 from langchain_core.messages import HumanMessage, AIMessage
-from langchain_anthropic import ChatAnthropic
+from langchain_core.runnables import RunnableLambda
 from langgraph.graph import StateGraph
 
 # Import our speech-to-text module with VAD
@@ -15,6 +16,12 @@ from vad_stt_module import SpeechToText
 from tts_module import TTSModule
 import sounddevice as sd
 
+# The shared client registry lives in the project root
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from model_router import route_model
+from streaming import ConsoleConsumer, TTSConsumer, astream_model, stream_model
+
 # Load environment variables
 load_dotenv()
 
@@ -30,6 +37,7 @@ class AgentState(TypedDict):
 # Initialize speech modules
 stt = SpeechToText()
 tts = TTSModule()  # Initialize our new TTS module
+tts_consumer = TTSConsumer(tts)  # Speaks streamed responses sentence by sentence
 
 # Define nodes
 def listen_node(state: AgentState) -> AgentState:
@@ -52,6 +60,12 @@ def listen_node(state: AgentState) -> AgentState:
         "input_text": transcribed_text
     }
 
+async def alisten_node(state: AgentState) -> AgentState:
+    """
+    Async listen_node: recording and transcription run on a worker thread
+    """
+    return await asyncio.to_thread(listen_node, state)
+
 def process_input(state: AgentState) -> AgentState:
     """
     Process the transcribed text and add it to messages
@@ -71,23 +85,39 @@ def agent_node(state: AgentState) -> AgentState:
     """
     print("🤖 Claude thinking...")
     
-    # Initialize Claude with the correct model name
-    claude = ChatAnthropic(
-        api_key=ANTHROPIC_API_KEY,
-        model="claude-3-5-haiku-20241022"  # Using the correct model name
-    )
+    # Shared Claude client picked by the "agent" route, its connections stay open between turns
+    claude = route_model("agent", api_key=ANTHROPIC_API_KEY)
     
+    # Stream the response: print tokens and speak each sentence as soon as it is complete
+    response = stream_model(
+        "agent", claude, _to_lc_messages(state["messages"]),
+        [ConsoleConsumer(prefix="🤖 Claude response: "), tts_consumer]
+    )
+    return _with_response(state, response)
+
+async def aagent_node(state: AgentState) -> AgentState:
+    """
+    Async agent_node: streams with astream, so the event loop stays free while Claude answers
+    """
+    print("🤖 Claude thinking...")
+    claude = route_model("agent", api_key=ANTHROPIC_API_KEY)
+    response = await astream_model(
+        "agent", claude, _to_lc_messages(state["messages"]),
+        [ConsoleConsumer(prefix="🤖 Claude response: "), tts_consumer]
+    )
+    return _with_response(state, response)
+
+def _to_lc_messages(messages):
     # Convert to LangChain message format
     lc_messages = []
-    for msg in state["messages"]:
+    for msg in messages:
         if msg["role"] == "user":
             lc_messages.append(HumanMessage(content=msg["content"]))
         elif msg["role"] == "assistant":
             lc_messages.append(AIMessage(content=msg["content"]))
-    
-    # Get response from Claude
-    response = claude.invoke(lc_messages)
-    
+    return lc_messages
+
+def _with_response(state, response):
     # Convert response back to our format
     assistant_message = {"role": "assistant", "content": response.content}
     
@@ -95,12 +125,10 @@ def agent_node(state: AgentState) -> AgentState:
     messages = state["messages"].copy()
     messages.append(assistant_message)
     
-    print(f"🤖 Claude response: \"{response.content}\"")
-    
-    # Return updated state with response text for TTS
+    # The response was already spoken while streaming, so speak_node has nothing left to say
     return {
         "messages": messages,
-        "response_text": response.content
+        "response_text": None
     }
 
 def speak_node(state: AgentState) -> AgentState:
@@ -115,16 +143,23 @@ def speak_node(state: AgentState) -> AgentState:
     # Return state unchanged
     return {}
 
+async def aspeak_node(state: AgentState) -> AgentState:
+    """
+    Async speak_node: playback runs on a worker thread
+    """
+    return await asyncio.to_thread(speak_node, state)
+
 # Build the graph
 def build_agent_graph():
     """Build and return the agent graph"""
     workflow = StateGraph(AgentState)
     
     # Add nodes
-    workflow.add_node("listen", listen_node)
+    # Sync and async implementations: invoke/stream use the first, ainvoke/astream the second
+    workflow.add_node("listen", RunnableLambda(listen_node, afunc=alisten_node))
     workflow.add_node("process_input", process_input)
-    workflow.add_node("agent", agent_node)
-    workflow.add_node("speak", speak_node)  # Add new TTS node
+    workflow.add_node("agent", RunnableLambda(agent_node, afunc=aagent_node))
+    workflow.add_node("speak", RunnableLambda(speak_node, afunc=aspeak_node))  # Add new TTS node
     
     # Add edges
     workflow.add_edge("listen", "process_input")
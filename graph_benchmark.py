@@ -0,0 +1,263 @@
+"""
+Benchmark of the graph runtime: message history, checkpoints and sessions.
+
+Reproduces the figures quoted for that work:
+- reducer: time per step of append_messages against add_messages, at growing history sizes
+- checkpoints: bytes BoundedSqliteSaver serializes per turn, delta encoded and with full snapshots
+- sessions: many students through one SessionManager, then revisits of evicted students
+- concurrency: concurrent async turns of 01_initial_call against mock_llm_server.py
+
+Everything runs locally, no API key needed. The concurrency run starts the mock
+server in a fresh interpreter, because llm_clients reads MOCK_LLM_URL on import.
+
+    python graph_benchmark.py --json graph_benchmark.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.graph import END, START
+from langgraph.graph.message import add_messages
+
+from checkpointer import CHECKPOINT_SNAPSHOT_EVERY, BoundedSqliteSaver, CompressedSerializer
+from message_log import MessageLog, MessageLogGraph, MessageLogState, append_messages
+from session_manager import SessionManager
+
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+WORDS = [
+    "ich", "du", "wir", "gerne", "spiele", "Fußball", "am", "Wochenende", "mit", "meinen", "Freunden",
+    "und", "danach", "gehen", "ins", "Kino", "oder", "kochen", "zusammen", "weil", "es", "Spaß", "macht",
+]
+
+
+def _sentence(rng, length=200):
+    """German-looking text of about length characters, so compression behaves like on real turns."""
+    words = []
+    while sum(len(w) + 1 for w in words) < length:
+        words.append(rng.choice(WORDS))
+    return " ".join(words) + "."
+
+
+class _CountingSerializer(CompressedSerializer):
+    """CompressedSerializer that counts the bytes it produced."""
+
+    def __init__(self):
+        super().__init__()
+        self.written = 0
+
+    def dumps_typed(self, obj):
+        type_, data = super().dumps_typed(obj)
+        self.written += len(data)
+        return type_, data
+
+
+def _echo_graph(seed=0):
+    """One node answering every turn with a fixed-length reply, no model involved."""
+    rng = random.Random(seed)
+
+    def answer(state: MessageLogState):
+        return {"messages": [AIMessage(content=_sentence(rng))]}
+
+    builder = MessageLogGraph(MessageLogState)
+    builder.add_node("answer", answer)
+    builder.add_edge(START, "answer")
+    builder.add_edge("answer", END)
+    return builder.compile()
+
+
+def bench_reducer(sizes=(100, 1000, 10000), steps=100):
+    """
+    Time one appended message per step on a history of each size.
+
+    Returns:
+    - results: {size: {"append_messages_us": ..., "add_messages_us": ...}}, microseconds per step
+    """
+    results = {}
+    for size in sizes:
+        history = [HumanMessage(content=f"Nachricht {i}", id=f"m{i}") for i in range(size)]
+        updates = [[AIMessage(content="Antwort", id=f"a{i}")] for i in range(steps)]
+
+        log = MessageLog(history)
+        start = time.perf_counter()
+        for update in updates:
+            log = append_messages(log, update)
+        append_us = (time.perf_counter() - start) / steps * 1e6
+
+        messages = list(history)
+        start = time.perf_counter()
+        for update in updates:
+            messages = add_messages(messages, update)
+        add_us = (time.perf_counter() - start) / steps * 1e6
+
+        results[size] = {"append_messages_us": append_us, "add_messages_us": add_us}
+    return results
+
+
+def bench_checkpoints(workdir, turns=50, snapshot_every=CHECKPOINT_SNAPSHOT_EVERY):
+    """
+    Serialize a conversation of turns turns, delta encoded and with a full snapshot every checkpoint.
+
+    Returns:
+    - results: {"delta"|"full": {"bytes_per_turn", "last_turn_bytes"}}
+    """
+    results = {}
+    for label, every in (("delta", snapshot_every), ("full", 1)):
+        serde = _CountingSerializer()
+        saver = BoundedSqliteSaver(os.path.join(workdir, f"checkpoints_{label}.db"), snapshot_every=every, serde=serde)
+        graph = _echo_graph().copy(update={"checkpointer": saver})
+        config = {"configurable": {"thread_id": "benchmark"}}
+        rng = random.Random(1)
+        before = 0
+        for _ in range(turns):
+            before = serde.written
+            graph.invoke({"messages": [HumanMessage(content=_sentence(rng))]}, config)
+        results[label] = {"bytes_per_turn": serde.written / turns, "last_turn_bytes": serde.written - before}
+        saver.conn.close()
+    return results
+
+
+def bench_sessions(workdir, students=3000, max_active=50, revisits=200):
+    """
+    Run one turn for each of students students, then a second turn for revisits evicted ones.
+
+    Returns:
+    - results: Dictionary with seconds, turns_per_second, active, cached_heads and revisits_correct
+    """
+    saver = BoundedSqliteSaver(os.path.join(workdir, "sessions.db"))
+    sessions = SessionManager(_echo_graph(), "benchmark", checkpointer=saver, max_active=max_active)
+    rng = random.Random(2)
+
+    start = time.perf_counter()
+    for i in range(students):
+        sessions.invoke(f"student-{i}", {"messages": [HumanMessage(content=_sentence(rng))]})
+    # The first students were evicted long ago, their turns rehydrate from the checkpointer
+    revisited = rng.sample(range(max(1, students - max_active)), min(revisits, max(1, students - max_active)))
+    correct = 0
+    for i in revisited:
+        output = sessions.invoke(f"student-{i}", {"messages": [HumanMessage(content=_sentence(rng))]})
+        correct += len(output["messages"]) == 4
+    seconds = time.perf_counter() - start
+
+    results = {
+        "seconds": seconds,
+        "turns_per_second": (students + len(revisited)) / seconds,
+        "active": sessions.active_count(),
+        "cached_heads": len(saver._heads),
+        "revisits": len(revisited),
+        "revisits_correct": correct,
+    }
+    saver.conn.close()
+    return results
+
+
+def _concurrency_child(count, latency_ms):
+    """Run count concurrent turns of 01_initial_call against an in-process mock server and print JSON."""
+    from mock_llm_server import MockAnthropic, Recordings, start_in_thread
+
+    mock = MockAnthropic(Recordings(), latency_ms=latency_ms)
+    server = start_in_thread(mock)
+    os.environ["MOCK_LLM_URL"] = f"http://127.0.0.1:{server.server_port}"
+
+    from graph_factories import graph_specs, load_module
+
+    _, build_graph = load_module(graph_specs()["01_initial_call"])
+    with tempfile.TemporaryDirectory() as workdir:
+        saver = BoundedSqliteSaver(os.path.join(workdir, "concurrency.db"))
+        sessions = SessionManager(build_graph(), "benchmark", checkpointer=saver, max_active=count + 10)
+
+        async def run(prefix, n):
+            return await asyncio.gather(*(
+                sessions.ainvoke(f"{prefix}-{i}", {"messages": [HumanMessage(content="Hallo!")]})
+                for i in range(n)
+            ))
+
+        async def measure():
+            # Warm up: the first turns create the model client and its connections. Both runs
+            # share one event loop, the async client's connections belong to the loop that opened them
+            await run("warmup", 10)
+            mock.stats["requests"] = 0
+            start = time.perf_counter()
+            outputs = await run("student", count)
+            return outputs, time.perf_counter() - start
+
+        outputs, seconds = asyncio.run(measure())
+        saver.conn.close()
+    server.shutdown()
+
+    print(json.dumps({
+        "sessions": count,
+        "latency_ms": latency_ms,
+        "seconds": seconds,
+        "answered": sum(1 for output in outputs if len(output["messages"]) == 2),
+        "model_requests": mock.stats["requests"],
+    }))
+
+
+def bench_concurrency(count=300, latency_ms=300):
+    """
+    Time count concurrent async turns against the mock server, in a fresh interpreter.
+
+    Returns:
+    - results: Dictionary with sessions, latency_ms, seconds, answered and model_requests
+    """
+    command = [sys.executable, os.path.abspath(__file__), "--concurrency-child", str(count), str(latency_ms)]
+    # Every turn has to reach the mock server, not the local response cache
+    env = {**{k: v for k, v in os.environ.items() if k != "MOCK_LLM_URL"}, "RESPONSE_CACHE": "0"}
+    output = subprocess.run(command, cwd=PROJECT_DIR, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the message history, checkpoints and sessions")
+    parser.add_argument("--sizes", default="100,1000,10000", help="Comma-separated history sizes for the reducer")
+    parser.add_argument("--turns", type=int, default=50, help="Turns of the checkpoint size conversation")
+    parser.add_argument("--students", type=int, default=3000, help="Students run through the session manager")
+    parser.add_argument("--max-active", type=int, default=50, help="Resident sessions of the session run")
+    parser.add_argument("--concurrent", type=int, default=300, help="Concurrent async turns against the mock server")
+    parser.add_argument("--latency-ms", type=float, default=300, help="Mock model latency of the concurrent turns")
+    parser.add_argument("--json", help="Also write the report to this file")
+    parser.add_argument("--concurrency-child", nargs=2, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.concurrency_child:
+        _concurrency_child(int(args.concurrency_child[0]), float(args.concurrency_child[1]))
+        return 0
+
+    report = {}
+    report["reducer"] = bench_reducer(int(size) for size in args.sizes.split(","))
+    print(f"{'history':>8} {'append_messages (us)':>22} {'add_messages (us)':>20}")
+    for size, entry in report["reducer"].items():
+        print(f"{size:>8} {entry['append_messages_us']:>22.1f} {entry['add_messages_us']:>20.1f}")
+
+    with tempfile.TemporaryDirectory() as workdir:
+        report["checkpoints"] = bench_checkpoints(workdir, turns=args.turns)
+        for label, entry in report["checkpoints"].items():
+            print(f"checkpoints ({label}): {entry['bytes_per_turn']:.0f} B per turn, "
+                  f"{entry['last_turn_bytes']} B for turn {args.turns}")
+
+        report["sessions"] = sessions = bench_sessions(workdir, students=args.students, max_active=args.max_active)
+        print(f"sessions: {args.students} students + {sessions['revisits']} revisits in {sessions['seconds']:.1f}s "
+              f"({sessions['turns_per_second']:.0f} turns/s), {sessions['active']} resident, "
+              f"{sessions['cached_heads']} cached heads, {sessions['revisits_correct']} revisits continued")
+
+    report["concurrency"] = concurrency = bench_concurrency(args.concurrent, args.latency_ms)
+    print(f"concurrency: {concurrency['sessions']} async turns at {concurrency['latency_ms']:.0f} ms model latency "
+          f"in {concurrency['seconds']:.2f}s, {concurrency['answered']} answered")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
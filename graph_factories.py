@@ -0,0 +1,69 @@
+"""
+Helpers for the graph modules served by `langgraph dev` (see langgraph.json).
+
+Each graph module exposes build_graph(), a factory that compiles the graph on
+demand, and runs its demo conversation only from main(). Importing a graph
+module therefore does no I/O: no model client, checkpointer, microphone or
+.env file is touched until a graph is actually built or run.
+"""
+import importlib.util
+import json
+import os
+import sys
+import threading
+
+
+LANGGRAPH_CONFIG = os.path.join(os.path.dirname(os.path.abspath(__file__)), "langgraph.json")
+
+
+def lazy_graph(factory, namespace, name="graph"):
+    """
+    Return a module __getattr__ that builds namespace[name] with factory on first access.
+
+    Keeps `from module import graph` working for code written before the factories:
+
+        __getattr__ = lazy_graph(build_graph, globals())
+    """
+    lock = threading.Lock()
+
+    def __getattr__(attribute):
+        if attribute != name:
+            raise AttributeError(f"module {namespace['__name__']!r} has no attribute {attribute!r}")
+        with lock:
+            if name not in namespace:
+                namespace[name] = factory()
+        return namespace[name]
+
+    return __getattr__
+
+
+def graph_specs(config_path=LANGGRAPH_CONFIG):
+    """Return {graph_id: "./path.py:attribute"} from langgraph.json."""
+    with open(config_path, 'r') as f:
+        return json.load(f)["graphs"]
+
+
+def load_module(spec, config_path=LANGGRAPH_CONFIG):
+    """
+    Import the module of a langgraph.json graph spec ("./path.py:attribute").
+
+    The module names start with digits, so they are loaded from their path
+    like the langgraph server does.
+
+    Returns:
+    - module: The imported module
+    - attribute: The attribute named by the spec (the graph factory)
+    """
+    path, attribute = spec.rsplit(":", 1)
+    path = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(config_path)), path))
+    module_name = os.path.splitext(os.path.basename(path))[0]
+
+    module_spec = importlib.util.spec_from_file_location(module_name, path)
+    module = importlib.util.module_from_spec(module_spec)
+    sys.modules[module_name] = module
+    # Graph modules import their siblings by plain name
+    for directory in (os.path.dirname(path), os.path.dirname(os.path.abspath(config_path))):
+        if directory not in sys.path:
+            sys.path.insert(0, directory)
+    module_spec.loader.exec_module(module)
+    return module, getattr(module, attribute)
@@ -0,0 +1,132 @@
+"""
+Scripted opening turns, rendered locally instead of by the model.
+
+The system prompts dictate the opening greeting word for word, so asking the
+model for it costs a full round trip for a fixed text. The greeting nodes
+below write those turns from templates (picking the level-dependent wording
+and a random hobby like the prompt asks) and the model only enters at the
+first open-ended turn.
+"""
+import json
+import random
+import uuid
+
+from langchain_core.messages import AIMessage, ToolMessage
+from langchain_core.runnables import RunnableConfig, RunnableLambda
+
+from levels import parse_level
+from tools import retrieve_student_profile, run_blocking
+
+
+INFO_GATHERING_GREETING = (
+    "Hi and welcome to Luis's AI powered German course!, before we begin, I need to gather some "
+    "information about yourself so we can personalize your learning experience.\n\nWhat is your name?"
+)
+
+VOICE_GATHERING_GREETING = (
+    "Hi and welcome your AI powered German course!, before we begin, I need to gather some "
+    "information about yourself so we can personalize your learning experience. What is your name?"
+)
+
+CONVERSATION_GREETINGS = {
+    "beginner": "Hi {name} and willkommen! lets practice some German, we will talk about {hobby}!",
+    "intermediate": "Hallo {name} und willkommen! Lass uns ein bisschen Deutsch üben, wir werden über {hobby} sprechen!",
+    "advanced": "Hallo {name} und willkommen! Lass uns ein bisschen Deutsch üben, wir werden über {hobby} sprechen!",
+}
+
+
+def level_category(language_level):
+    """Map a saved level ("Beginner A1", "B2", "advanced", ...) to beginner, intermediate or advanced."""
+    # Unknown levels get the simplest greeting
+    return parse_level(language_level) or "beginner"
+
+
+def has_assistant_turn(messages):
+    """True once the conversation holds an assistant message (greeting included)."""
+    return any(
+        (isinstance(m, dict) and m.get("role") == "assistant") or getattr(m, "type", None) == "ai"
+        for m in messages
+    )
+
+
+def emit(node, message, consumers=()):
+    """Send a locally rendered message to token consumers, as if it was streamed."""
+    for consumer in consumers:
+        consumer.on_start(node)
+        consumer.on_token(message.content)
+        consumer.on_end(message)
+
+
+def conversation_greeting(profile, rng=random):
+    """
+    Render the opening line of a lesson for a student profile.
+
+    Returns:
+    - greeting: The level-dependent greeting naming the selected hobby
+    - hobby: The hobby selected for the lesson
+    """
+    hobby = rng.choice(profile['hobbies']) if profile['hobbies'] else "deine Hobbys"
+    template = CONVERSATION_GREETINGS[level_category(profile['language_level'])]
+    return template.format(name=profile['name'], hobby=hobby), hobby
+
+
+def make_greeting_node(greeting=INFO_GATHERING_GREETING, consumers=()):
+    """
+    Build a node that answers the opening turn of the info gathering agent with a fixed text.
+
+    Route to it (see route_greeting) while the conversation has no assistant message yet.
+    """
+    def greeting_node(state):
+        message = AIMessage(content=greeting)
+        emit("greeting", message, consumers)
+        return {"messages": [message]}
+
+    return greeting_node
+
+
+def make_conversation_greeting_node(db_path="./student_data", consumers=(), rng=random):
+    """
+    Build the greeting node of the conversation agent.
+
+    The node looks the student up itself (config["configurable"]["student_id"],
+    or the most recently registered student) and writes the lookup into the
+    history as a retrieve_student_profile call and result, followed by the
+    scripted greeting. The greeting is the last message, so the model's next
+    call continues it (assistant prefill) with the hobby paragraph and the
+    first question, already knowing the profile.
+    """
+    def messages_for(profile):
+        if profile is None:
+            # Nothing to script, the model greets after looking the student up
+            return {}
+        greeting, hobby = conversation_greeting(profile, rng)
+        call_id = f"toolu_{uuid.uuid4().hex[:24]}"
+        lookup = AIMessage(content="", tool_calls=[{
+            "name": "retrieve_student_profile",
+            "args": {"student_id": profile['id']},
+            "id": call_id,
+        }])
+        result = ToolMessage(content=json.dumps(profile, ensure_ascii=False), tool_call_id=call_id)
+        message = AIMessage(content=greeting)
+        emit("greeting", message, consumers)
+        return {"messages": [lookup, result, message]}
+
+    def conversation_greeting_node(state, config: RunnableConfig):
+        student_id = (config.get("configurable") or {}).get("student_id")
+        return messages_for(retrieve_student_profile(student_id=student_id, db_path=db_path))
+
+    async def aconversation_greeting_node(state, config: RunnableConfig):
+        student_id = (config.get("configurable") or {}).get("student_id")
+        return messages_for(await run_blocking(retrieve_student_profile, student_id=student_id, db_path=db_path))
+
+    return RunnableLambda(conversation_greeting_node, afunc=aconversation_greeting_node, name="greeting")
+
+
+def route_greeting(next_node):
+    """
+    Return a START router: "greeting" for a new conversation, next_node once it has started.
+    """
+    def route(state):
+        return next_node if has_assistant_turn(state["messages"]) else "greeting"
+
+    return route
@@ -0,0 +1,82 @@
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+GROUP_COMMIT_WINDOW_MS = float(os.getenv("GROUP_COMMIT_WINDOW_MS", "2"))
+
+
+class GroupCommitWriter:
+    """
+    Collects concurrent writes and flushes them together in one transaction.
+
+    Callers block in write() until the transaction holding their item has
+    been committed, so one fsync is shared by everybody who arrived within
+    the same window instead of each caller paying for their own.
+
+    Parameters:
+    - flush_batch: Function taking a list of items, writing them in one durable
+      transaction and returning one result per item (in the same order)
+    - window_ms: How long to keep collecting after the first item of a batch arrives
+    - max_batch: Flush early once this many items are waiting
+    """
+
+    def __init__(self, flush_batch, window_ms=GROUP_COMMIT_WINDOW_MS, max_batch=500, name="group-commit"):
+        self.flush_batch = flush_batch
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self._pending = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+        self.batches = 0
+        self.items = 0
+
+    def submit(self, item):
+        """Queue an item and return a Future that resolves once it is committed."""
+        future = Future()
+        self._pending.put((item, future))
+        return future
+
+    def write(self, item, timeout=None):
+        """Queue an item and wait until it is durable. Returns the flush result for it."""
+        return self.submit(item).result(timeout)
+
+    def _collect(self):
+        # Block for the first item, then gather more until the window closes
+        batch = [self._pending.get()]
+        deadline = time.monotonic() + self.window
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._pending.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            items = [item for item, _ in batch]
+            try:
+                results = self.flush_batch(items)
+            except BaseException as e:
+                if len(batch) == 1:
+                    batch[0][1].set_exception(e)
+                    continue
+                # The transaction rolled back for everybody, retry one by one
+                # so only the bad item fails
+                for item, future in batch:
+                    try:
+                        future.set_result(self.flush_batch([item])[0])
+                    except BaseException as item_error:
+                        future.set_exception(item_error)
+                continue
+
+            self.batches += 1
+            self.items += len(batch)
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
@@ -0,0 +1,142 @@
+"""
+History compaction for the chat graphs.
+
+Without it every turn sends the whole message history to the model, so the
+tokens per call keep growing. The compaction node keeps the system prompt
+and the last few turns verbatim and folds everything older into a running
+summary stored next to the messages. The summary costs a model call in front
+of the turn, so it is only rewritten every few turns: compaction waits until
+compact_every turns beyond keep_turns have piled up (or the token budget is
+exceeded) and then folds them all in one call.
+"""
+import os
+
+from langchain_core.messages import HumanMessage, RemoveMessage, SystemMessage
+from langchain_core.runnables import RunnableLambda
+from message_builder import ainvoke_model, dynamic_system_message, invoke_model
+from message_log import MessageLogState
+from model_router import route_model
+from streaming import message_text
+
+try:
+    from langchain_core.messages.utils import count_tokens_approximately
+except ImportError:  # Older langchain-core
+    def count_tokens_approximately(messages):
+        return sum(len(str(getattr(m, "content", m))) for m in messages) // 4 + 3 * len(messages)
+
+
+HISTORY_KEEP_TURNS = int(os.getenv("HISTORY_KEEP_TURNS", "6"))
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "8000"))
+HISTORY_COMPACT_EVERY = int(os.getenv("HISTORY_COMPACT_EVERY", "4"))
+
+SUMMARY_PROMPT = """You keep a running summary of a conversation between a German teaching assistant and a student.
+Update the summary below with the new messages. Keep every fact about the student (name, level, interests, ID),
+what has already been asked and answered, and any German mistakes the student made. Answer only with the summary.
+
+Current summary:
+{summary}
+
+New messages:
+{messages}"""
+
+
+class CompactedMessagesState(MessageLogState):
+    # Running summary of the turns that were removed from messages
+    summary: str
+
+
+def _split_turns(messages):
+    """Split into (leading system messages, [turn, ...]); a turn starts at each human message."""
+    start = 0
+    while start < len(messages) and isinstance(messages[start], SystemMessage):
+        start += 1
+
+    turns = []
+    for message in messages[start:]:
+        if isinstance(message, HumanMessage) or not turns:
+            turns.append([message])
+        else:
+            turns[-1].append(message)
+    return messages[:start], turns
+
+
+def _render(messages):
+    return "\n".join(f"{m.type}: {m.content}" for m in messages)
+
+
+def with_summary(messages, summary):
+    """
+    Return the messages to send to the model: the system prompts, the running
+    summary (if any) as an extra system message, then the verbatim turns.
+
+    The summary changes with every compaction, so it is a dynamic system
+    message: it follows the cached system prompt without a breakpoint of its own.
+    """
+    if not summary:
+        return messages
+    system, turns = _split_turns(messages)
+    summary_message = dynamic_system_message(f"Summary of the earlier conversation:\n{summary}")
+    return list(system) + [summary_message] + [m for turn in turns for m in turn]
+
+
+def make_compaction_node(llm=None, keep_turns=HISTORY_KEEP_TURNS, token_budget=HISTORY_TOKEN_BUDGET,
+                         compact_every=HISTORY_COMPACT_EVERY):
+    """
+    Build a graph node that keeps the message history bounded.
+
+    Parameters:
+    - llm: Chat model used to write the summary (default: the model routed to "compact_history")
+    - keep_turns: Number of most recent turns that are always kept verbatim (if the budget allows)
+    - token_budget: Maximum approximate tokens of system prompt + summary + kept turns per call
+    - compact_every: Compact once this many turns beyond keep_turns have piled up, folding
+      them in one summary call (1 compacts on every turn)
+
+    Returns:
+    - compact_history: Node for a graph using CompactedMessagesState, with a sync
+      and an async implementation (used by invoke and ainvoke respectively)
+    """
+    def plan(state):
+        # Returns (summary prompt, messages to fold) or None when nothing has to go
+        messages = state["messages"]
+        summary = state.get("summary", "")
+        system, turns = _split_turns(messages)
+
+        fixed_tokens = count_tokens_approximately(list(system)) + len(summary) // 4
+        total_tokens = fixed_tokens + count_tokens_approximately([m for t in turns for m in t])
+        if len(turns) - keep_turns < compact_every and total_tokens <= token_budget:
+            return None
+
+        # Keep at most keep_turns, then drop more of the oldest until a quarter of the budget
+        # is free, so the next turns do not trigger another compaction right away.
+        # The newest turn is always kept, the model has to see what it answers.
+        kept = turns[-keep_turns:] if keep_turns else []
+        while len(kept) > 1 and fixed_tokens + count_tokens_approximately([m for t in kept for m in t]) > token_budget * 3 // 4:
+            kept = kept[1:]
+
+        folded = [m for turn in turns[:len(turns) - len(kept)] for m in turn]
+        if not folded:
+            return None
+        prompt = SUMMARY_PROMPT.format(summary=summary or "(empty)", messages=_render(folded))
+        return [HumanMessage(content=prompt)], folded
+
+    def update(new_summary, folded):
+        return {
+            "summary": message_text(new_summary),
+            "messages": [RemoveMessage(id=m.id) for m in folded],
+        }
+
+    def compact_history(state: CompactedMessagesState):
+        planned = plan(state)
+        if planned is None:
+            return {}
+        prompt, folded = planned
+        return update(invoke_model("compact_history", llm or route_model("compact_history"), prompt), folded)
+
+    async def acompact_history(state: CompactedMessagesState):
+        planned = plan(state)
+        if planned is None:
+            return {}
+        prompt, folded = planned
+        return update(await ainvoke_model("compact_history", llm or route_model("compact_history"), prompt), folded)
+
+    return RunnableLambda(compact_history, afunc=acompact_history, name="compact_history")
@@ -0,0 +1,61 @@
+import re
+
+
+# Spellings and phrasings that mean the same topic, all keys already normalized
+SYNONYMS = {
+    "techno": "techno music",
+    "techno musik": "techno music",
+    "bike riding": "cycling",
+    "biking": "cycling",
+    "riding bikes": "cycling",
+    "bicycling": "cycling",
+    "travelling": "traveling",
+    "travel": "traveling",
+    "traveling the world": "traveling",
+    "reading books": "reading",
+    "books": "reading",
+    "playing video games": "video games",
+    "gaming": "video games",
+    "videogames": "video games",
+    "cooking food": "cooking",
+    "going to restaurants": "restaurants",
+    "eating out": "restaurants",
+    "meeting with friends": "friends",
+    "meeting friends": "friends",
+    "hanging out with friends": "friends",
+    "playing soccer": "football",
+    "soccer": "football",
+    "playing football": "football",
+    "movies": "films",
+    "watching movies": "films",
+    "cinema": "films",
+    "running": "jogging",
+    "working out": "fitness",
+    "gym": "fitness",
+    "riding horses": "horse riding",
+    "horseback riding": "horse riding",
+}
+
+_PUNCTUATION = re.compile(r"[^\w\s&+-]")
+
+
+def normalize_hobby(hobby):
+    """
+    Map a free-text hobby to its canonical form.
+
+    Lowercases, drops punctuation, collapses whitespace and resolves known
+    synonyms, so "Techno", " techno  music!" and "TECHNO MUSIC" are one hobby.
+    """
+    text = _PUNCTUATION.sub(" ", hobby.casefold())
+    text = " ".join(text.split())
+    return SYNONYMS.get(text, text)
+
+
+def normalize_hobbies(hobbies):
+    """Normalize a list of hobbies, dropping empty and duplicate entries (order kept)."""
+    seen = []
+    for hobby in hobbies:
+        canonical = normalize_hobby(hobby)
+        if canonical and canonical not in seen:
+            seen.append(canonical)
+    return seen
@@ -0,0 +1,147 @@
+import os
+import random
+import sqlite3
+import string
+import threading
+
+from profile_repository import ConnectionPool
+
+
+ID_CHARS = string.ascii_uppercase + string.digits
+ID_LENGTH = 8
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS student_ids (
+    id TEXT PRIMARY KEY,
+    issued_at DATETIME DEFAULT CURRENT_TIMESTAMP
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS allocator_meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+'''
+
+
+class StudentIdAllocator:
+    """
+    Issues random 8-character student IDs that are never handed out twice.
+
+    Every issued ID is recorded in a small SQLite index next to the student
+    files. The primary key on that table is what guarantees uniqueness, so
+    several workers (threads or processes) can allocate at the same time
+    without scanning the data directory.
+    """
+
+    def __init__(self, db_path="./student_data", index_name="student_ids.db", max_attempts=20):
+        # Create directory if needed
+        os.makedirs(db_path, exist_ok=True)
+
+        self.db_path = db_path
+        self.max_attempts = max_attempts
+        self.pool = ConnectionPool(os.path.join(db_path, index_name), size=2)
+
+        with self.pool.connection() as conn:
+            conn.executescript(SCHEMA)
+        self._seed_from_directory()
+
+    def _seed_from_directory(self):
+        """
+        Record the IDs of CSV files written before the index existed.
+
+        This is the only directory scan the allocator ever does and it runs
+        once per data directory, guarded by a flag in the index itself.
+        """
+        with self.pool.transaction() as conn:
+            seeded = conn.execute(
+                "SELECT value FROM allocator_meta WHERE key = 'seeded'"
+            ).fetchone()
+            if seeded:
+                return
+
+            existing_ids = []
+            with os.scandir(self.db_path) as entries:
+                for entry in entries:
+                    if entry.name.endswith('.csv'):
+                        # Filenames look like dateofcreation_name_ID.csv
+                        existing_ids.append((entry.name.split('_')[-1].split('.')[0],))
+
+            conn.executemany("INSERT OR IGNORE INTO student_ids (id) VALUES (?)", existing_ids)
+            conn.execute("INSERT INTO allocator_meta (key, value) VALUES ('seeded', '1')")
+
+    def allocate(self):
+        """
+        Issue a new student ID.
+
+        Returns:
+        - student_id: Random alphanumeric ID that no other caller has received
+        """
+        for _ in range(self.max_attempts):
+            student_id = ''.join(random.choices(ID_CHARS, k=ID_LENGTH))
+            try:
+                with self.pool.transaction() as conn:
+                    conn.execute("INSERT INTO student_ids (id) VALUES (?)", (student_id,))
+                return student_id
+            except sqlite3.IntegrityError:
+                # Collision (unlikely but possible), draw again
+                continue
+
+        raise RuntimeError(f"Could not allocate a unique student ID after {self.max_attempts} attempts")
+
+    def allocate_many(self, count):
+        """
+        Issue count new student IDs in a single transaction (used by bulk imports).
+
+        Returns:
+        - student_ids: List of count unique IDs
+        """
+        student_ids = []
+        with self.pool.transaction() as conn:
+            attempts = 0
+            while len(student_ids) < count:
+                attempts += 1
+                if attempts > count * self.max_attempts:
+                    raise RuntimeError(f"Could not allocate {count} unique student IDs")
+                student_id = ''.join(random.choices(ID_CHARS, k=ID_LENGTH))
+                cursor = conn.execute("INSERT OR IGNORE INTO student_ids (id) VALUES (?)", (student_id,))
+                if cursor.rowcount:
+                    student_ids.append(student_id)
+        return student_ids
+
+    def reserve(self, student_id):
+        """
+        Record an ID chosen elsewhere (e.g. a returning student) so it is never issued.
+        """
+        with self.pool.transaction() as conn:
+            conn.execute("INSERT OR IGNORE INTO student_ids (id) VALUES (?)", (student_id,))
+        return student_id
+
+    def reserve_many(self, student_ids):
+        """
+        Record a batch of existing IDs in one transaction (used by bulk loads and migrations).
+        """
+        with self.pool.transaction() as conn:
+            conn.executemany(
+                "INSERT OR IGNORE INTO student_ids (id) VALUES (?)",
+                ((student_id,) for student_id in student_ids)
+            )
+
+    def close(self):
+        self.pool.close()
+
+
+_allocators = {}
+_allocators_lock = threading.Lock()
+
+
+def get_id_allocator(db_path="./student_data"):
+    """
+    Return the shared StudentIdAllocator for db_path, creating it on first use.
+    """
+    key = os.path.abspath(db_path)
+    with _allocators_lock:
+        allocator = _allocators.get(key)
+        if allocator is None:
+            allocator = StudentIdAllocator(db_path)
+            _allocators[key] = allocator
+    return allocator
@@ -0,0 +1,30 @@
+import re
+
+
+# The level categories the info gathering prompts save, and the CEFR levels they stand for
+CATEGORIES = ("beginner", "intermediate", "advanced")
+CEFR_LEVELS = {
+    "a1": "beginner", "a2": "beginner",
+    "b1": "intermediate", "b2": "intermediate",
+    "c1": "advanced", "c2": "advanced",
+}
+
+_SEPARATORS = re.compile(r"[\s,;/()\-]+")
+
+
+def parse_level(language_level):
+    """
+    Map a saved level to beginner, intermediate or advanced.
+
+    Accepts the category, the CEFR level or both ("Beginner A1", "B2",
+    " advanced ", "intermediate (B1)"), case and separators are ignored.
+    A category word wins over a CEFR level. Returns None for anything else.
+    """
+    words = _SEPARATORS.split(str(language_level or "").casefold())
+    for word in words:
+        if word in CATEGORIES:
+            return word
+    for word in words:
+        if word in CEFR_LEVELS:
+            return CEFR_LEVELS[word]
+    return None
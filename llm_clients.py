@@ -0,0 +1,130 @@
+"""
+Shared ChatAnthropic clients for every graph node.
+
+Building a ChatAnthropic per turn throws away its HTTP client, so every turn
+paid for a new TLS handshake. get_chat_model() keeps one instance per model
+configuration, and those instances keep their keep-alive connection pool
+between turns. pool_stats() shows whether connections are actually reused.
+
+With MOCK_LLM_URL set (e.g. http://127.0.0.1:8765), every model talks to the
+local mock_llm_server.py instead of the Anthropic API.
+"""
+import os
+import threading
+
+
+MOCK_LLM_URL = os.getenv("MOCK_LLM_URL")
+
+_models = {}
+_models_lock = threading.Lock()
+_stats_lock = threading.Lock()
+
+# id(httpx client) -> counters, filled by the response hooks below
+_http_stats = {}
+
+
+def _config_key(model, kwargs):
+    return (model, tuple(sorted((k, repr(v)) for k, v in kwargs.items())))
+
+
+def _pool_connections(http_client):
+    # httpx -> httpcore connection pool; private attributes, so read defensively
+    pool = getattr(getattr(http_client, "_transport", None), "_pool", None)
+    return list(getattr(pool, "connections", []) or [])
+
+
+def _track(http_client):
+    """Count requests and newly opened connections of one httpx client."""
+    key = id(http_client)
+    with _stats_lock:
+        if key in _http_stats:
+            return
+        stats = _http_stats[key] = {
+            "client": http_client,
+            "requests": 0,
+            "connections_opened": 0,
+            "_seen": set(),
+        }
+
+    def observe(response):
+        with _stats_lock:
+            stats["requests"] += 1
+            for connection in _pool_connections(http_client):
+                if id(connection) not in stats["_seen"]:
+                    stats["_seen"].add(id(connection))
+                    stats["connections_opened"] += 1
+
+    async def aobserve(response):
+        observe(response)
+
+    # Async httpx clients await their hooks; only they have aclose()
+    hook = aobserve if hasattr(http_client, "aclose") else observe
+    hooks = dict(http_client.event_hooks)
+    hooks["response"] = list(hooks.get("response", [])) + [hook]
+    http_client.event_hooks = hooks
+
+
+def _instrument(llm):
+    # ChatAnthropic builds its anthropic clients lazily; each wraps an httpx client
+    for attr in ("_client", "_async_client"):
+        try:
+            http_client = getattr(getattr(llm, attr), "_client")
+        except Exception:
+            continue
+        _track(http_client)
+
+
+def get_chat_model(model, **kwargs):
+    """
+    Return the shared ChatAnthropic for this model and configuration.
+
+    Parameters:
+    - model: Anthropic model name, e.g. "claude-3-5-haiku-20241022"
+    - kwargs: Any other ChatAnthropic argument (temperature, max_tokens, ...)
+
+    Returns:
+    - llm: The same ChatAnthropic instance for every call with the same arguments
+    """
+    key = _config_key(model, kwargs)
+    llm = _models.get(key)
+    if llm is None:
+        with _models_lock:
+            llm = _models.get(key)
+            if llm is None:
+                if MOCK_LLM_URL:
+                    # The mock does not check keys, but ChatAnthropic requires one
+                    kwargs = {"api_key": os.getenv("ANTHROPIC_API_KEY") or "mock", **kwargs, "base_url": MOCK_LLM_URL}
+                # Imported on first use: langchain_anthropic takes about 2s to import,
+                # which graph factories and the langgraph server should not pay up front
+                from langchain_anthropic import ChatAnthropic
+                llm = ChatAnthropic(model=model, **kwargs)
+                _instrument(llm)
+                _models[key] = llm
+    return llm
+
+
+def pool_stats():
+    """
+    Report the shared clients and how their HTTP connections are used.
+
+    Returns:
+    - stats: Dictionary with the number of model instances and, per HTTP client,
+      requests sent, connections opened, and open / idle connections right now.
+      requests much larger than connections_opened means keep-alive is working.
+    """
+    with _stats_lock:
+        clients = []
+        for stats in _http_stats.values():
+            connections = _pool_connections(stats["client"])
+            clients.append({
+                "client": type(stats["client"]).__name__,
+                "requests": stats["requests"],
+                "connections_opened": stats["connections_opened"],
+                "open_connections": len(connections),
+                "idle_connections": sum(1 for c in connections if getattr(c, "is_idle", lambda: False)()),
+            })
+    return {
+        "models": [key[0] for key in _models],
+        "instances": len(_models),
+        "http_clients": clients,
+    }
@@ -0,0 +1,150 @@
+"""
+Builds the message list sent to the model and records what the call cost.
+
+The system prompts never change within a session, so build_messages() puts
+one Anthropic cache breakpoint on the last static system message. The tools
+and system prompts before it form the cached prefix. System messages that
+change between turns (the running summary of history.with_summary) come
+after the breakpoint and are never marked, a breakpoint on them would pay a
+cache write on every compaction for a block that is never read back.
+
+Anthropic only caches a prefix of at least 1024 tokens (2048 for Haiku
+models), shorter prefixes are processed normally and the breakpoint
+costs nothing. The info taker prompt is about 700 tokens, so whether its
+prefix is cached depends on the tools bound with it: cache_report() shows
+the cache read and creation tokens actually billed per node.
+
+invoke_model() is what graph nodes call: it builds the messages, invokes
+the model and records cache hits/misses per node.
+"""
+import threading
+import time
+
+from langchain_core.messages import SystemMessage
+
+from model_router import record_latency
+from response_cache import acached_invoke, cached_invoke, model_info
+
+
+CACHE_CONTROL = {"type": "ephemeral"}
+
+# additional_kwargs flag of system messages that change between turns
+DYNAMIC_KEY = "dynamic_system"
+
+_usage = {}
+_usage_lock = threading.Lock()
+
+
+def _cached_blocks(content):
+    """Turn system content into content blocks with a breakpoint on the last block."""
+    if isinstance(content, str):
+        return [{"type": "text", "text": content, "cache_control": CACHE_CONTROL}]
+    blocks = [dict(b) if isinstance(b, dict) else {"type": "text", "text": b} for b in content]
+    if blocks:
+        blocks[-1]["cache_control"] = CACHE_CONTROL
+    return blocks
+
+
+def dynamic_system_message(content):
+    """Return a system message that changes between turns, build_messages never marks it for caching."""
+    return SystemMessage(content=content, additional_kwargs={DYNAMIC_KEY: True})
+
+
+def _is_static_system(message):
+    if isinstance(message, SystemMessage):
+        return not message.additional_kwargs.get(DYNAMIC_KEY)
+    return isinstance(message, dict) and message.get("role") == "system"
+
+
+def build_messages(messages):
+    """
+    Return the messages to send, with one cache breakpoint on the static system prompt.
+
+    The breakpoint goes on the last static system message of the leading
+    system messages, dynamic ones (see dynamic_system_message) stay unmarked.
+    The graph state is not modified: the marked system message is a copy.
+    """
+    built = list(messages)
+    marked = None
+    for i, message in enumerate(built):
+        if _is_static_system(message):
+            marked = i
+        elif not (isinstance(message, SystemMessage) or (isinstance(message, dict) and message.get("role") == "system")):
+            break
+
+    if marked is not None:
+        message = built[marked]
+        if isinstance(message, SystemMessage):
+            built[marked] = SystemMessage(content=_cached_blocks(message.content))
+        else:
+            built[marked] = {**message, "content": _cached_blocks(message["content"])}
+    return built
+
+
+def _cache_tokens(response):
+    """Return (input tokens, cache read tokens, cache creation tokens) of a response."""
+    usage = getattr(response, "usage_metadata", None) or {}
+    details = usage.get("input_token_details") or {}
+    if details:
+        return usage.get("input_tokens", 0), details.get("cache_read", 0) or 0, details.get("cache_creation", 0) or 0
+
+    # Older langchain-anthropic versions only expose the raw API usage
+    raw = (getattr(response, "response_metadata", None) or {}).get("usage") or {}
+    return (
+        raw.get("input_tokens", 0) or 0,
+        raw.get("cache_read_input_tokens", 0) or 0,
+        raw.get("cache_creation_input_tokens", 0) or 0,
+    )
+
+
+def record_cache_usage(node, response):
+    """Add the prompt cache usage of one model response to the totals of node."""
+    input_tokens, cache_read, cache_creation = _cache_tokens(response)
+    with _usage_lock:
+        stats = _usage.setdefault(node, {
+            "calls": 0, "hits": 0, "misses": 0,
+            "input_tokens": 0, "cache_read_tokens": 0, "cache_creation_tokens": 0,
+        })
+        stats["calls"] += 1
+        stats["hits" if cache_read else "misses"] += 1
+        stats["input_tokens"] += input_tokens
+        stats["cache_read_tokens"] += cache_read
+        stats["cache_creation_tokens"] += cache_creation
+
+
+def cache_report():
+    """Return a copy of the per-node prompt cache totals."""
+    with _usage_lock:
+        return {node: dict(stats) for node, stats in _usage.items()}
+
+
+def invoke_model(node, llm, messages):
+    """
+    Call the model for a graph node with cache breakpoints, and record the cache usage.
+
+    Parameters:
+    - node: Name of the calling node, used as the key of cache_report()
+    - llm: Chat model (or tool-bound runnable) to call
+    - messages: Messages of the graph state
+
+    Returns:
+    - response: The model's AIMessage
+    """
+    # Deterministic calls that were answered before come from the local response cache
+    start = time.perf_counter()
+    response = cached_invoke(llm, build_messages(messages))
+    if not response.response_metadata.get("local_cache_hit"):
+        # The router's p95 only counts calls that actually went to the model
+        record_latency(model_info(llm)[0], time.perf_counter() - start)
+        record_cache_usage(node, response)
+    return response
+
+
+async def ainvoke_model(node, llm, messages):
+    """Async version of invoke_model, for nodes of graphs run with ainvoke/astream."""
+    start = time.perf_counter()
+    response = await acached_invoke(llm, build_messages(messages))
+    if not response.response_metadata.get("local_cache_hit"):
+        record_latency(model_info(llm)[0], time.perf_counter() - start)
+        record_cache_usage(node, response)
+    return response
@@ -0,0 +1,344 @@
+"""
+Append-only message history for the graph state.
+
+With MessagesState every node returned the whole history plus its answer,
+and add_messages rebuilt and re-merged the full list on every step, so each
+step cost O(history). MessageLog is an immutable view (start, stop) over a
+backing list shared between states: appending at the end of the backing
+list pushes in place and returns a longer view, so older views (the state a
+node was given, a checkpoint being written) never change and nothing is
+copied. The append_messages reducer adds new messages in O(new messages);
+removing or replacing messages (RemoveMessage from history compaction, a
+message with an existing ID) falls back to add_messages.
+
+Checkpoints store the messages of the view as a plain list, so any
+checkpointer can store them (see MessageLogChannel.checkpoint), and graphs
+built with MessageLogGraph hand plain lists to their callers.
+
+Nodes return only what they add:
+
+    def agent_answers(state: MessageLogState):
+        return {"messages": [invoke_model("agent_answers", llm, state["messages"])]}
+
+    builder = MessageLogGraph(MessageLogState)
+"""
+import threading
+import uuid
+from collections.abc import Sequence
+from contextlib import closing
+from contextvars import ContextVar
+from itertools import islice
+from typing import Annotated
+
+from typing_extensions import TypedDict
+
+from langchain_core.messages import RemoveMessage
+from langchain_core.messages.utils import convert_to_messages
+from langgraph.channels.binop import BinaryOperatorAggregate
+from langgraph.graph import StateGraph
+from langgraph.graph.message import add_messages
+from langgraph.graph.state import CompiledStateGraph
+
+
+def _prepare(messages):
+    """Convert dicts, tuples and strings to messages and give every message an ID."""
+    if isinstance(messages, (str, dict)) or not isinstance(messages, Sequence):
+        messages = [messages]
+    messages = convert_to_messages(messages)
+    for message in messages:
+        if message.id is None:
+            message.id = str(uuid.uuid4())
+    return messages
+
+
+class _Backing:
+    """List shared by the MessageLog views of one history, and the position of every message ID in it."""
+
+    __slots__ = ("items", "positions", "lock")
+
+    def __init__(self, items):
+        self.items = items
+        self.positions = {message.id: i for i, message in enumerate(items)}
+        # Parallel nodes may extend views of the same history from worker threads
+        self.lock = threading.Lock()
+
+
+class MessageLog(Sequence):
+    """
+    Immutable sequence of messages with O(1) slicing and O(new messages) appends.
+
+    Parameters:
+    - messages: Initial messages (BaseMessage, or anything convert_to_messages accepts)
+    """
+
+    __slots__ = ("_backing", "_start", "_stop")
+
+    def __init__(self, messages=()):
+        items = _prepare(list(messages))
+        self._backing = _Backing(items)
+        self._start = 0
+        self._stop = len(items)
+
+    @classmethod
+    def _view(cls, backing, start, stop):
+        log = cls.__new__(cls)
+        log._backing = backing
+        log._start = start
+        log._stop = stop
+        return log
+
+    def __len__(self):
+        return self._stop - self._start
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                return [self[i] for i in range(start, stop, step)]
+            # Slices are views on the same backing list, no copy
+            return self._view(self._backing, self._start + start, self._start + max(start, stop))
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("MessageLog index out of range")
+        return self._backing.items[self._start + index]
+
+    def __iter__(self):
+        return islice(self._backing.items, self._start, self._stop)
+
+    def __eq__(self, other):
+        if isinstance(other, (MessageLog, list, tuple)):
+            return len(self) == len(other) and all(a == b for a, b in zip(self, other))
+        return NotImplemented
+
+    __hash__ = None
+
+    def __add__(self, other):
+        # One-off model inputs (history + an instruction) are plain lists and do not touch the log
+        return self.to_list() + list(other)
+
+    def __radd__(self, other):
+        return list(other) + self.to_list()
+
+    def __repr__(self):
+        return f"MessageLog({self.to_list()!r})"
+
+    def to_list(self):
+        """Return the messages as a new list."""
+        return self._backing.items[self._start:self._stop]
+
+    def index_of(self, message_id):
+        """Return the position of the message with message_id, or None."""
+        position = self._backing.positions.get(message_id)
+        if position is None or not self._start <= position < self._stop:
+            return None
+        return position - self._start
+
+    def extends(self, other):
+        """True if other is a prefix of this log and shares its backing list."""
+        return (
+            isinstance(other, MessageLog)
+            and other._backing is self._backing
+            and other._start == self._start
+            and other._stop <= self._stop
+        )
+
+    def append(self, message):
+        """Return a new log with message added at the end (this log is unchanged)."""
+        return self.extend([message])
+
+    def extend(self, messages):
+        """Return a new log with messages added at the end (this log is unchanged)."""
+        messages = _prepare(messages)
+        if not messages:
+            return self
+        backing = self._backing
+        with backing.lock:
+            items = backing.items
+            # Another view may have pushed the same messages already (a node extended
+            # its state and then returned the new messages), those are reused
+            reused = 0
+            while (reused < len(messages) and self._stop + reused < len(items)
+                   and items[self._stop + reused] is messages[reused]):
+                reused += 1
+            if self._stop + reused == len(items):
+                for position, message in enumerate(messages[reused:], len(items)):
+                    items.append(message)
+                    backing.positions[message.id] = position
+                return self._view(backing, self._start, self._stop + len(messages))
+        # Branching off an older state (e.g. replaying from a past checkpoint): copy once
+        return MessageLog(self.to_list() + messages)
+
+
+def append_messages(left, right):
+    """
+    Reducer for MessageLog channels: append new messages, merge like add_messages otherwise.
+
+    Parameters:
+    - left: Current history (MessageLog or list)
+    - right: Update, a message, a list of messages or a MessageLog extending left
+
+    Returns:
+    - log: The merged history as a MessageLog
+    """
+    log = left if isinstance(left, MessageLog) else MessageLog(left or [])
+    if isinstance(right, MessageLog):
+        if right.extends(log):
+            return right
+        right = right.to_list()
+    right = _prepare(right)
+
+    # Removals and replacements need the full merge
+    new_ids = set()
+    for message in right:
+        if isinstance(message, RemoveMessage) or message.id in new_ids or log.index_of(message.id) is not None:
+            return MessageLog(add_messages(log.to_list(), right))
+        new_ids.add(message.id)
+    return log.extend(right)
+
+
+class LogSnapshot(list):
+    """
+    Checkpointed messages of a MessageLog: a plain list that also remembers the view it was taken from.
+
+    Serializers store it like any list. BoundedSqliteSaver uses log to see in
+    O(1) whether a checkpoint only appends to its parent's messages.
+    """
+
+    __slots__ = ("log",)
+
+    def __init__(self, log):
+        super().__init__(log.to_list())
+        self.log = log
+
+
+class MessageLogChannel(BinaryOperatorAggregate):
+    """
+    State channel holding a MessageLog.
+
+    Checkpoints are the messages of the view as a LogSnapshot, a list holding
+    exactly the messages of that step, so every checkpointer can serialize
+    them and checkpoints written by MessagesState graphs still load.
+    BoundedSqliteSaver stores only the messages appended since the parent
+    checkpoint.
+    """
+
+    def __init__(self, typ=MessageLog, operator=append_messages):
+        super().__init__(typ, operator)
+
+    def _as_log(self):
+        if isinstance(self.value, LogSnapshot):
+            self.value = self.value.log
+        elif isinstance(self.value, list):
+            self.value = MessageLog(self.value)
+        return self
+
+    def from_checkpoint(self, checkpoint):
+        return super().from_checkpoint(checkpoint)._as_log()
+
+    def update(self, values):
+        # An Overwrite update sets the value directly
+        updated = super().update(values)
+        self._as_log()
+        return updated
+
+    def checkpoint(self):
+        if isinstance(self.value, MessageLog):
+            return LogSnapshot(self.value)
+        return super().checkpoint()
+
+
+def plain_output(value):
+    """Return value with every MessageLog in it (also inside dicts and tuples) replaced by a list."""
+    if isinstance(value, MessageLog):
+        return value.to_list()
+    if isinstance(value, dict):
+        return {key: plain_output(item) for key, item in value.items()}
+    if type(value) is tuple:
+        return tuple(plain_output(item) for item in value)
+    return value
+
+
+# Set while invoke() runs the graph through stream(), only its final output is converted
+_final_only = ContextVar("message_log_final_only", default=False)
+
+
+def _plain_chunks(chunks):
+    with closing(chunks):
+        for chunk in chunks:
+            yield plain_output(chunk)
+
+
+async def _aplain_chunks(chunks):
+    try:
+        async for chunk in chunks:
+            yield plain_output(chunk)
+    finally:
+        await chunks.aclose()
+
+
+class CompiledMessageLogGraph(CompiledStateGraph):
+    """
+    Compiled graph that returns plain lists instead of MessageLog.
+
+    Nodes keep working on MessageLog views. invoke(), stream(), get_state(),
+    get_state_history() and their async versions convert the histories they
+    hand out, so callers (and the langgraph server, which serializes them)
+    never see the custom type. invoke() converts its final output only.
+    """
+
+    def invoke(self, input, config=None, **kwargs):
+        token = _final_only.set(True)
+        try:
+            output = super().invoke(input, config, **kwargs)
+        finally:
+            _final_only.reset(token)
+        return plain_output(output)
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        token = _final_only.set(True)
+        try:
+            output = await super().ainvoke(input, config, **kwargs)
+        finally:
+            _final_only.reset(token)
+        return plain_output(output)
+
+    def stream(self, input, config=None, **kwargs):
+        chunks = super().stream(input, config, **kwargs)
+        return chunks if _final_only.get() else _plain_chunks(chunks)
+
+    def astream(self, input, config=None, **kwargs):
+        chunks = super().astream(input, config, **kwargs)
+        return chunks if _final_only.get() else _aplain_chunks(chunks)
+
+    def get_state(self, config, **kwargs):
+        snapshot = super().get_state(config, **kwargs)
+        return snapshot._replace(values=plain_output(snapshot.values))
+
+    async def aget_state(self, config, **kwargs):
+        snapshot = await super().aget_state(config, **kwargs)
+        return snapshot._replace(values=plain_output(snapshot.values))
+
+    def get_state_history(self, config, **kwargs):
+        for snapshot in super().get_state_history(config, **kwargs):
+            yield snapshot._replace(values=plain_output(snapshot.values))
+
+    async def aget_state_history(self, config, **kwargs):
+        async for snapshot in super().aget_state_history(config, **kwargs):
+            yield snapshot._replace(values=plain_output(snapshot.values))
+
+
+class MessageLogGraph(StateGraph):
+    """StateGraph for MessageLogState graphs, compile() returns a CompiledMessageLogGraph."""
+
+    def compile(self, *args, **kwargs):
+        compiled = super().compile(*args, **kwargs)
+        # StateGraph.compile always builds a CompiledStateGraph; rebuild it as the
+        # subclass from its attributes, the way Pregel.copy() copies a graph
+        attrs = {k: v for k, v in compiled.__dict__.items() if k != "__orig_class__"}
+        return CompiledMessageLogGraph(**attrs)
+
+
+class MessageLogState(TypedDict):
+    # Drop-in replacement for MessagesState
+    messages: Annotated[MessageLog, MessageLogChannel()]
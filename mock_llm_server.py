@@ -0,0 +1,343 @@
+"""
+Local stand-in for the Anthropic Messages API.
+
+Lets the graphs run without network access, so the LangGraph orchestration
+can be benchmarked on its own. The server replays responses recorded from
+the real API (tool_use blocks included) with a configurable time to first
+token and token rate, for both plain and streamed requests.
+
+Record once against the real API, then replay offline:
+
+    python mock_llm_server.py record --recordings recordings.jsonl
+    python mock_llm_server.py serve --recordings recordings.jsonl --latency-ms 400 --tokens-per-second 60
+
+and point the graphs at it with MOCK_LLM_URL=http://127.0.0.1:8765 (see
+llm_clients.get_chat_model). GET /stats reports requests, replay hits and the
+simulated model time, so wall time minus model_seconds is graph overhead.
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+
+UPSTREAM_URL = "https://api.anthropic.com"
+
+# Keys that change between runs without changing the answer
+_VOLATILE_KEYS = {"cache_control", "id", "tool_use_id"}
+
+
+def _strip(value):
+    if isinstance(value, dict):
+        return {k: _strip(v) for k, v in value.items() if k not in _VOLATILE_KEYS}
+    if isinstance(value, list):
+        return [_strip(v) for v in value]
+    if isinstance(value, str):
+        return " ".join(value.split())
+    return value
+
+
+def request_key(body):
+    """Hash of what determines the answer of a /v1/messages request."""
+    system = body.get("system", "")
+    if isinstance(system, str):
+        system = [{"type": "text", "text": system}] if system else []
+    payload = {
+        "model": body.get("model"),
+        "system": _strip(system),
+        "messages": _strip(body.get("messages", [])),
+        "tools": _strip(body.get("tools", [])),
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode()).hexdigest()
+
+
+def _output_tokens(message):
+    usage = message.get("usage") or {}
+    if usage.get("output_tokens"):
+        return usage["output_tokens"]
+    return max(1, len(json.dumps(message.get("content", []))) // 4)
+
+
+class Recordings:
+    """
+    Recorded responses keyed by request, stored as JSONL ({"key", "response"} per line).
+
+    Parameters:
+    - path: JSONL file to load from and append to (None for memory only)
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._responses = {}
+        self._lock = threading.Lock()
+        if path and os.path.exists(path):
+            with open(path, 'r') as f:
+                for line in f:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._responses[entry["key"]] = entry["response"]
+
+    def get(self, key):
+        return self._responses.get(key)
+
+    def add(self, key, response):
+        with self._lock:
+            self._responses[key] = response
+            if self.path:
+                with open(self.path, 'a') as f:
+                    f.write(json.dumps({"key": key, "response": response}, ensure_ascii=False) + "\n")
+
+    def __len__(self):
+        return len(self._responses)
+
+
+class MockAnthropic:
+    """
+    Answers /v1/messages requests from recordings.
+
+    Parameters:
+    - recordings: Recordings to replay (and add to when recording)
+    - latency_ms: Time to first token
+    - jitter_ms: Random extra latency, uniform between 0 and jitter_ms
+    - tokens_per_second: Output token rate, 0 for instant
+    - upstream: Real API URL; when set, misses are forwarded there and recorded
+    - on_miss: "text" answers misses with miss_text, "error" returns HTTP 404
+    """
+
+    def __init__(self, recordings, latency_ms=0, jitter_ms=0, tokens_per_second=0,
+                 upstream=None, on_miss="text", miss_text="Das ist eine Testantwort."):
+        self.recordings = recordings
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.tokens_per_second = tokens_per_second
+        self.upstream = upstream
+        self.on_miss = on_miss
+        self.miss_text = miss_text
+        self._http = httpx.Client(timeout=600) if upstream else None
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "hits": 0, "misses": 0, "recorded": 0, "model_seconds": 0.0}
+
+    def _count(self, name, amount=1):
+        with self._lock:
+            self.stats[name] += amount
+
+    def respond(self, body, headers):
+        """Return (status, response message or error JSON) for a request body."""
+        self._count("requests")
+        key = request_key(body)
+        response = self.recordings.get(key)
+        if response is not None:
+            self._count("hits")
+            return 200, response
+
+        self._count("misses")
+        if self.upstream:
+            upstream = self._http.post(
+                f"{self.upstream}/v1/messages",
+                json={**body, "stream": False},
+                headers={k: v for k, v in headers.items() if k.lower() in ("x-api-key", "anthropic-version", "anthropic-beta")},
+            )
+            if upstream.status_code == 200:
+                self.recordings.add(key, upstream.json())
+                self._count("recorded")
+            return upstream.status_code, upstream.json()
+
+        if self.on_miss == "error":
+            return 404, {"type": "error", "error": {"type": "not_found_error", "message": f"No recording for request {key}"}}
+        return 200, {
+            "type": "message",
+            "role": "assistant",
+            "model": body.get("model"),
+            "content": [{"type": "text", "text": self.miss_text}],
+            "stop_reason": "end_turn",
+            "stop_sequence": None,
+            "usage": {"input_tokens": 0, "output_tokens": max(1, len(self.miss_text) // 4)},
+        }
+
+    def first_token_delay(self):
+        return (self.latency_ms + random.uniform(0, self.jitter_ms)) / 1000
+
+    def token_delay(self):
+        return 1 / self.tokens_per_second if self.tokens_per_second else 0
+
+
+def _replayed(message):
+    """Copy of a recorded message with fresh message and tool_use IDs."""
+    message = json.loads(json.dumps(message))
+    message["id"] = f"msg_mock_{uuid.uuid4().hex[:20]}"
+    for block in message.get("content", []):
+        if block.get("type") == "tool_use":
+            block["id"] = f"toolu_{uuid.uuid4().hex[:24]}"
+    return message
+
+
+def _token_chunks(text):
+    # Roughly 4 characters per token
+    return [text[i:i + 4] for i in range(0, len(text), 4)] or [""]
+
+
+def stream_events(message):
+    """Yield the (event, data) pairs of the Anthropic SSE stream for a message, one per output token."""
+    usage = message.get("usage") or {}
+    start = {**message, "content": [], "stop_reason": None, "usage": {**usage, "output_tokens": 1}}
+    yield "message_start", {"type": "message_start", "message": start}
+
+    for index, block in enumerate(message.get("content", [])):
+        if block["type"] == "tool_use":
+            yield "content_block_start", {
+                "type": "content_block_start", "index": index,
+                "content_block": {**block, "input": {}},
+            }
+            for part in _token_chunks(json.dumps(block.get("input", {}))):
+                yield "content_block_delta", {
+                    "type": "content_block_delta", "index": index,
+                    "delta": {"type": "input_json_delta", "partial_json": part},
+                }
+        else:
+            yield "content_block_start", {
+                "type": "content_block_start", "index": index,
+                "content_block": {"type": "text", "text": ""},
+            }
+            for part in _token_chunks(block.get("text", "")):
+                yield "content_block_delta", {
+                    "type": "content_block_delta", "index": index,
+                    "delta": {"type": "text_delta", "text": part},
+                }
+        yield "content_block_stop", {"type": "content_block_stop", "index": index}
+
+    yield "message_delta", {
+        "type": "message_delta",
+        "delta": {"stop_reason": message.get("stop_reason"), "stop_sequence": message.get("stop_sequence")},
+        "usage": {"output_tokens": usage.get("output_tokens", 0)},
+    }
+    yield "message_stop", {"type": "message_stop"}
+
+
+def make_handler(mock):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send_json(self, status, payload):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/stats":
+                with mock._lock:
+                    self._send_json(200, {**mock.stats, "recordings": len(mock.recordings)})
+            else:
+                self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+
+        def do_POST(self):
+            if not self.path.split("?")[0].rstrip("/").endswith("/v1/messages"):
+                self._send_json(404, {"type": "error", "error": {"type": "not_found_error", "message": self.path}})
+                return
+
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            status, message = mock.respond(body, dict(self.headers))
+            if status != 200:
+                self._send_json(status, message)
+                return
+
+            message = _replayed(message)
+            start = time.perf_counter()
+            time.sleep(mock.first_token_delay())
+
+            if not body.get("stream"):
+                time.sleep(mock.token_delay() * _output_tokens(message))
+                self._send_json(200, message)
+            else:
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Cache-Control", "no-cache")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                for event, data in stream_events(message):
+                    if event == "content_block_delta":
+                        time.sleep(mock.token_delay())
+                    self.wfile.write(f"event: {event}\ndata: {json.dumps(data)}\n\n".encode())
+                    self.wfile.flush()
+                self.close_connection = True
+
+            mock._count("model_seconds", time.perf_counter() - start)
+
+    return Handler
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Benchmarks open hundreds of connections at once, the default backlog of 5 refuses them
+    request_queue_size = 1024
+
+
+def serve(mock, host="127.0.0.1", port=8765):
+    """Create the HTTP server for mock; call serve_forever() on the result."""
+    return MockServer((host, port), make_handler(mock))
+
+
+def start_in_thread(mock, host="127.0.0.1", port=0):
+    """
+    Run the mock server on a background thread, e.g. inside a benchmark.
+
+    Returns:
+    - server: The running server, its URL is f"http://{host}:{server.server_port}"
+    """
+    server = serve(mock, host, port)
+    threading.Thread(target=server.serve_forever, name="mock-llm-server", daemon=True).start()
+    return server
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local stand-in for the Anthropic Messages API")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    for name, help_text in (("serve", "Replay recorded responses"), ("record", "Forward misses to the real API and record them")):
+        command = subcommands.add_parser(name, help=help_text)
+        command.add_argument("--recordings", default="./recordings.jsonl", help="JSONL file of recorded responses")
+        command.add_argument("--host", default="127.0.0.1")
+        command.add_argument("--port", type=int, default=8765)
+        command.add_argument("--latency-ms", type=float, default=0, help="Time to first token")
+        command.add_argument("--jitter-ms", type=float, default=0, help="Random extra latency per request")
+        command.add_argument("--tokens-per-second", type=float, default=0, help="Output token rate (0 = instant)")
+        if name == "serve":
+            command.add_argument("--on-miss", choices=["text", "error"], default="text",
+                                 help="Answer unknown requests with a fixed text or an HTTP 404")
+        else:
+            command.add_argument("--upstream", default=UPSTREAM_URL)
+
+    args = parser.parse_args(argv)
+    mock = MockAnthropic(
+        Recordings(args.recordings),
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        tokens_per_second=args.tokens_per_second,
+        upstream=args.upstream if args.command == "record" else None,
+        on_miss=getattr(args, "on_miss", "text"),
+    )
+    server = serve(mock, args.host, args.port)
+    print(f"Mock Anthropic API on http://{args.host}:{args.port} ({len(mock.recordings)} recordings, {args.command} mode)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    print(json.dumps(mock.stats))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
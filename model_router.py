@@ -0,0 +1,194 @@
+"""
+Per-node model routing.
+
+Graph nodes no longer name a model. Each node has a route: the capability
+it needs and the latency it can afford. route_model() walks the models with
+that capability from cheapest to most expensive and returns the first one
+whose observed p95 latency fits the node's budget, so info gathering runs on
+the fast model, grammar work on a strong one, and a node moves to the next
+candidate while its usual model is slow.
+"""
+import os
+import threading
+import time
+from collections import deque
+from typing import NamedTuple, Optional
+
+from llm_clients import get_chat_model
+
+
+# Latencies older than this are forgotten, so a model that was skipped for
+# being slow gets tried again once its bad period has aged out
+MODEL_LATENCY_HORIZON_S = float(os.getenv("MODEL_LATENCY_HORIZON_S", "300"))
+MODEL_LATENCY_WINDOW = int(os.getenv("MODEL_LATENCY_WINDOW", "200"))
+MODEL_LATENCY_MIN_SAMPLES = int(os.getenv("MODEL_LATENCY_MIN_SAMPLES", "20"))
+
+# Relative price per token and what each model is good enough for
+MODELS = {
+    "claude-3-5-haiku-20241022": {
+        "cost": 1,
+        "capabilities": {"chat", "tools", "extraction", "summary"},
+    },
+    "claude-3-sonnet-20240229": {
+        "cost": 3,
+        "capabilities": {"chat", "tools", "extraction", "summary", "grammar"},
+    },
+    "claude-3-5-sonnet-20241022": {
+        "cost": 3,
+        "capabilities": {"chat", "tools", "extraction", "summary", "grammar"},
+    },
+}
+
+
+class NodeRoute(NamedTuple):
+    capability: str
+    latency_budget_ms: Optional[float] = None
+    max_cost: Optional[float] = None
+
+
+ROUTES = {
+    # Short questions and a tool call: the fast model is good enough
+    "gathering_agent": NodeRoute("extraction", latency_budget_ms=2000),
+    "listen_and_gathering_agent": NodeRoute("extraction", latency_budget_ms=1500),
+    "farewell_node": NodeRoute("chat", latency_budget_ms=2000),
+    "agent": NodeRoute("chat", latency_budget_ms=1500),
+    "agent_answers": NodeRoute("chat", latency_budget_ms=3000),
+    "compact_history": NodeRoute("summary", latency_budget_ms=3000),
+    # Spotting grammar mistakes needs a strong model
+    "conversation_agent": NodeRoute("grammar", latency_budget_ms=5000),
+    "batch_grading": NodeRoute("grammar"),
+}
+
+
+def register_route(node, capability, latency_budget_ms=None, max_cost=None):
+    """Add or replace the route of a graph node."""
+    ROUTES[node] = NodeRoute(capability, latency_budget_ms, max_cost)
+
+
+class LatencyTracker:
+    """Recent call latencies per model and their p95."""
+
+    def __init__(self, window=MODEL_LATENCY_WINDOW, horizon_s=MODEL_LATENCY_HORIZON_S, clock=time.monotonic):
+        self.window = window
+        self.horizon = horizon_s
+        self.clock = clock
+        self._samples = {}  # model -> deque of (timestamp, seconds)
+        self._lock = threading.Lock()
+
+    def record(self, model, seconds):
+        with self._lock:
+            samples = self._samples.setdefault(model, deque(maxlen=self.window))
+            samples.append((self.clock(), seconds))
+
+    def _recent(self, model):
+        cutoff = self.clock() - self.horizon
+        samples = self._samples.get(model, ())
+        while samples and samples[0][0] < cutoff:
+            samples.popleft()
+        return sorted(seconds for _, seconds in samples)
+
+    @staticmethod
+    def _p95(latencies):
+        return latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000
+
+    def p95_ms(self, model, min_samples=MODEL_LATENCY_MIN_SAMPLES):
+        """Return the p95 latency of model in ms, or None with fewer than min_samples recent calls."""
+        with self._lock:
+            latencies = self._recent(model)
+        if len(latencies) < max(min_samples, 1):
+            return None
+        return self._p95(latencies)
+
+    def report(self):
+        with self._lock:
+            recent = {model: self._recent(model) for model in self._samples}
+        return {
+            model: {"calls": len(latencies), "p95_ms": self._p95(latencies) if latencies else None}
+            for model, latencies in recent.items()
+        }
+
+
+latency_tracker = LatencyTracker()
+
+
+def record_latency(model, seconds):
+    """Record how long one call to model took."""
+    latency_tracker.record(model, seconds)
+
+
+def candidates(node):
+    """Return the models that can serve node, cheapest first."""
+    route = ROUTES.get(node)
+    if route is None:
+        raise KeyError(f"No model route for node '{node}', add one with register_route()")
+    models = [
+        name for name, info in MODELS.items()
+        if route.capability in info["capabilities"]
+        and (route.max_cost is None or info["cost"] <= route.max_cost)
+    ]
+    if not models:
+        raise ValueError(f"No model has capability '{route.capability}' within the cost budget of '{node}'")
+    # sorted() is stable, so equally priced models keep the order of MODELS
+    return sorted(models, key=lambda name: MODELS[name]["cost"])
+
+
+def select_model(node):
+    """
+    Pick the model for node: the cheapest candidate whose p95 fits the latency
+    budget. Models without enough recent calls count as fitting. If every
+    candidate is over budget, the one with the lowest p95 is used.
+    """
+    models = candidates(node)
+    route = ROUTES[node]
+    if route.latency_budget_ms is None:
+        return models[0]
+
+    observed = []
+    for model in models:
+        p95 = latency_tracker.p95_ms(model)
+        if p95 is None or p95 <= route.latency_budget_ms:
+            return model
+        observed.append((p95, model))
+    return min(observed)[1]
+
+
+_bound = {}
+_bound_lock = threading.Lock()
+
+
+def route_model(node, tools=None, **kwargs):
+    """
+    Return the chat model for a graph node, chosen by its route.
+
+    Parameters:
+    - node: Name of the graph node, a key of ROUTES
+    - tools: Tools to bind to the model (optional)
+    - kwargs: Any other ChatAnthropic argument (default temperature=0)
+
+    Returns:
+    - llm: Shared ChatAnthropic, or its bind_tools binding when tools are given
+    """
+    kwargs.setdefault("temperature", 0)
+    llm = get_chat_model(select_model(node), **kwargs)
+    if not tools:
+        return llm
+
+    # Converting the tool schemas is not free, so every node keeps one binding per model and tool set
+    key = (node, id(llm), tuple(id(tool) for tool in tools))
+    entry = _bound.get(key)
+    if entry is None:
+        with _bound_lock:
+            entry = _bound.get(key)
+            if entry is None:
+                # The tools are kept with the binding, so their IDs cannot be reused by other tools
+                entry = (tuple(tools), llm.bind_tools(tools))
+                _bound[key] = entry
+    return entry[1]
+
+
+def routing_report():
+    """Return the model each node would get right now and the observed latencies."""
+    return {
+        "routes": {node: select_model(node) for node in ROUTES},
+        "latencies": latency_tracker.report(),
+    }
@@ -0,0 +1,297 @@
+"""
+Benchmark of the student profile storage backends at growing population sizes.
+
+For every backend and size it generates a synthetic population, then measures
+insert throughput, lookup latency (p50/p99) and the size on disk, and writes
+a JSON report. Pass --compare with an older report to flag regressions.
+
+    python profile_benchmark.py --sizes 1000,100000,1000000 --out bench.json
+"""
+import argparse
+import csv
+import datetime
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import string
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from profile_index import ProfileIndex, StudentProfile
+from profile_repository import ProfileRepository
+from student_store import StudentStore
+
+
+NAMES = ["Luis", "Alejandro", "Anna", "Jonas", "Mia", "Leon", "Sofia", "Paul", "Emma", "Noah", "Lea", "Ben"]
+LEVELS = ["beginner", "intermediate", "advanced"]
+HOBBIES = [
+    "biking", "Cycling", "traveling", "Travelling", "techno music", "Techno", "cooking", "reading",
+    "reading books", "video games", "gaming", "chess", "yoga", "football", "soccer", "hiking",
+    "photography", "painting", "movies", "riding horses", "gardening", "swimming", "jogging", "dancing",
+]
+
+
+def generate_population(size, seed=42):
+    """Yield size synthetic StudentProfile records with unique IDs."""
+    rng = random.Random(seed)
+    chars = string.ascii_uppercase + string.digits
+    seen = set()
+    start = datetime.datetime(2025, 1, 1)
+    for i in range(size):
+        student_id = ''.join(rng.choices(chars, k=8))
+        while student_id in seen:
+            student_id = ''.join(rng.choices(chars, k=8))
+        seen.add(student_id)
+        yield StudentProfile(
+            id=student_id,
+            name=f"{rng.choice(NAMES)} {i}",
+            language_level=rng.choice(LEVELS),
+            registration_date=(start + datetime.timedelta(seconds=i)).strftime("%Y-%m-%d %H:%M:%S"),
+            hobbies=rng.sample(HOBBIES, 3),
+        )
+
+
+def directory_size(path):
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            total += os.path.getsize(os.path.join(root, name))
+    return total
+
+
+class SqliteRepositoryBackend:
+    """tools.save_initial_profile: students/hobbies tables through the group-commit writer."""
+    name = "sqlite_repository"
+
+    def __init__(self, workdir, concurrency):
+        self.repository = ProfileRepository(os.path.join(workdir, "student_data.db"))
+        self.concurrency = concurrency
+        self.ids = {}
+
+    def insert(self, profiles):
+        def save(profile):
+            return profile['id'], self.repository.add_student(
+                profile['name'], profile['language_level'], profile['hobbies']
+            )
+        with ThreadPoolExecutor(self.concurrency) as pool:
+            self.ids.update(pool.map(save, profiles))
+
+    def lookup(self, student_id):
+        return self.repository.get_student(self.ids[student_id])
+
+    def close(self):
+        self.repository.close()
+
+
+class StudentStoreBackend:
+    """Consolidated store through StudentStore.add (the CSV save_initial_profile variants)."""
+    name = "student_store"
+
+    def __init__(self, workdir, concurrency):
+        self.store = StudentStore(workdir)
+        self.concurrency = concurrency
+
+    def insert(self, profiles):
+        with ThreadPoolExecutor(self.concurrency) as pool:
+            for _ in pool.map(self.store.add, profiles):
+                pass
+
+    def lookup(self, student_id):
+        return self.store.get(student_id)
+
+    def close(self):
+        self.store.close()
+
+
+class StudentStoreBulkBackend(StudentStoreBackend):
+    """Consolidated store through StudentStore.add_many (bulk import / migration)."""
+    name = "student_store_bulk"
+
+    def insert(self, profiles, batch_size=5000):
+        batch = []
+        for profile in profiles:
+            batch.append(profile)
+            if len(batch) >= batch_size:
+                self.store.add_many(batch)
+                batch = []
+        if batch:
+            self.store.add_many(batch)
+
+
+class CsvDirectoryBackend:
+    """Legacy one-CSV-per-student layout, looked up through ProfileIndex (retrieve_student_profile)."""
+    name = "csv_directory"
+
+    def __init__(self, workdir, concurrency):
+        self.workdir = workdir
+        self.index = ProfileIndex(workdir)
+
+    def insert(self, profiles):
+        for profile in profiles:
+            date = profile['registration_date'][:10].replace('-', '')
+            file_path = os.path.join(self.workdir, f"{date}_{profile['name'].replace(' ', '_')}_{profile['id']}.csv")
+            with open(file_path, 'w', newline='') as csvfile:
+                writer = csv.writer(csvfile)
+                writer.writerow(['id', 'name', 'language_level', 'registration_date', 'hobbies'])
+                writer.writerow([
+                    profile['id'], profile['name'], profile['language_level'],
+                    profile['registration_date'], "|".join(profile['hobbies']),
+                ])
+
+    def lookup(self, student_id):
+        return self.index.get(student_id)
+
+    def close(self):
+        pass
+
+
+BACKENDS = {
+    backend.name: backend
+    for backend in (SqliteRepositoryBackend, StudentStoreBackend, StudentStoreBulkBackend, CsvDirectoryBackend)
+}
+
+
+def percentile(samples, fraction):
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+def run_backend(backend_cls, size, lookups, concurrency, workdir):
+    backend = backend_cls(workdir, concurrency)
+    try:
+        start = time.perf_counter()
+        backend.insert(generate_population(size))
+        insert_seconds = time.perf_counter() - start
+
+        # Same seed, so these IDs exist in the population just written
+        rng = random.Random(7)
+        sample = [p['id'] for p in generate_population(size)]
+        sample = [rng.choice(sample) for _ in range(lookups)]
+
+        # The first lookup pays for any lazy index build, report it on its own
+        start = time.perf_counter()
+        backend.lookup(sample[0])
+        first_lookup_ms = (time.perf_counter() - start) * 1000
+
+        latencies = []
+        for student_id in sample:
+            start = time.perf_counter()
+            found = backend.lookup(student_id)
+            latencies.append((time.perf_counter() - start) * 1000)
+            if found is None:
+                raise RuntimeError(f"{backend_cls.name}: student {student_id} not found")
+    finally:
+        backend.close()
+
+    return {
+        "backend": backend_cls.name,
+        "students": size,
+        "insert_seconds": insert_seconds,
+        "inserts_per_second": size / insert_seconds if insert_seconds else 0.0,
+        "first_lookup_ms": first_lookup_ms,
+        "lookup_p50_ms": percentile(latencies, 0.50),
+        "lookup_p99_ms": percentile(latencies, 0.99),
+        "lookup_mean_ms": statistics.fmean(latencies),
+        "size_bytes": directory_size(workdir),
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_reports(previous, current, tolerance=0.2):
+    """
+    Return human-readable regressions of current against previous (both report dicts).
+
+    A regression is a throughput drop or a latency / size increase larger than tolerance.
+    """
+    before = {(r["backend"], r["students"]): r for r in previous["results"]}
+    regressions = []
+    for result in current["results"]:
+        old = before.get((result["backend"], result["students"]))
+        if old is None:
+            continue
+        checks = [
+            ("inserts_per_second", old["inserts_per_second"] / max(result["inserts_per_second"], 1e-9)),
+            ("lookup_p50_ms", result["lookup_p50_ms"] / max(old["lookup_p50_ms"], 1e-9)),
+            ("lookup_p99_ms", result["lookup_p99_ms"] / max(old["lookup_p99_ms"], 1e-9)),
+            ("size_bytes", result["size_bytes"] / max(old["size_bytes"], 1)),
+        ]
+        for metric, ratio in checks:
+            if ratio > 1 + tolerance:
+                regressions.append(
+                    f"{result['backend']} @ {result['students']}: {metric} {old[metric]:.4g} -> {result[metric]:.4g}"
+                )
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the student profile storage backends")
+    parser.add_argument("--sizes", default="1000,100000,1000000", help="Comma-separated population sizes")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="Comma-separated backend names")
+    parser.add_argument("--lookups", type=int, default=1000, help="Lookups measured per run")
+    parser.add_argument("--concurrency", type=int, default=32, help="Concurrent writers for the per-call backends")
+    parser.add_argument("--workdir", help="Where to build the populations (default: a temp dir, removed afterwards)")
+    parser.add_argument("--out", default="profile_benchmark.json", help="Path of the JSON report")
+    parser.add_argument("--compare", help="Previous JSON report to check for regressions")
+    args = parser.parse_args(argv)
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    backend_names = args.backends.split(",")
+    unknown = [name for name in backend_names if name not in BACKENDS]
+    if unknown:
+        parser.error(f"unknown backends: {', '.join(unknown)} (choose from {', '.join(BACKENDS)})")
+
+    root = args.workdir or tempfile.mkdtemp(prefix="profile_benchmark_")
+    report = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "revision": _git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": [],
+    }
+    try:
+        for size in sizes:
+            for name in backend_names:
+                workdir = os.path.join(root, f"{name}_{size}")
+                os.makedirs(workdir, exist_ok=True)
+                result = run_backend(BACKENDS[name], size, args.lookups, args.concurrency, workdir)
+                report["results"].append(result)
+                print(
+                    f"{name:>20} {size:>9} students: {result['inserts_per_second']:>10.0f} inserts/s, "
+                    f"lookup p50 {result['lookup_p50_ms']:.3f} ms / p99 {result['lookup_p99_ms']:.3f} ms, "
+                    f"{result['size_bytes'] / 1e6:.1f} MB"
+                )
+                shutil.rmtree(workdir, ignore_errors=True)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(root, ignore_errors=True)
+
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.out}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare_reports(json.load(f), report)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
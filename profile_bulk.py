@@ -0,0 +1,245 @@
+import argparse
+import csv
+import datetime
+import itertools
+import json
+import os
+import sys
+import time
+
+from id_allocator import get_id_allocator
+from levels import parse_level
+from profile_index import StudentProfile
+from student_store import get_student_store
+
+
+FIELDS = ['id', 'name', 'language_level', 'registration_date', 'hobbies']
+
+MAX_HOBBIES = 3
+
+
+def _text(value):
+    """Return a scalar field as a stripped string ('' if empty), or None if it is not a scalar."""
+    if value is None:
+        return ''
+    # JSON numbers are fine (e.g. a numeric id), objects, lists and booleans are not
+    if isinstance(value, bool) or not isinstance(value, (str, int, float)):
+        return None
+    return str(value).strip()
+
+
+def _hobby_list(value):
+    """Return the hobbies of a record (a list or a pipe-separated string) without empty entries, or None if malformed."""
+    if value is None:
+        return []
+    if not isinstance(value, list):
+        value = _text(value)
+        if value is None:
+            return None
+        value = value.split('|')
+    hobbies = [_text(h) for h in value]
+    if any(h is None for h in hobbies):
+        return None
+    return [h for h in hobbies if h]
+
+
+def read_records(path):
+    """
+    Yield raw records (dicts) from a .csv or .jsonl file one line at a time.
+    A .jsonl line that is not valid JSON is yielded as the raw string.
+    """
+    with open(path, 'r', newline='', encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            for line in f:
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except json.JSONDecodeError:
+                        # Rejected by validate_batch like any other bad record
+                        yield line.rstrip("\n")
+        else:
+            yield from csv.DictReader(f)
+
+
+def batched(records, batch_size):
+    """Group an iterable into lists of batch_size items."""
+    iterator = iter(records)
+    while True:
+        batch = list(itertools.islice(iterator, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def validate_batch(records, min_hobbies=3):
+    """
+    Validate and normalize one batch of raw records.
+
+    Each rule runs as its own pass over the whole batch (levels, then hobbies,
+    then names, IDs and dates), so the per-record work is a handful of dict
+    lookups. A malformed record is rejected with a reason, it never aborts the batch.
+
+    Parameters:
+    - records: List of raw records, dicts with name, language_level, hobbies and optional id / registration_date
+    - min_hobbies: Minimum number of non-empty hobbies a student needs
+
+    Returns:
+    - valid: List of StudentProfile (id may be None when it still has to be allocated)
+    - errors: List of (record, reason) for rejected records
+    """
+    # Records that are not objects (e.g. a malformed JSONL line) are rejected as a whole
+    errors = [(r, "not a record") for r in records if not isinstance(r, dict)]
+    records = [r for r in records if isinstance(r, dict)]
+
+    # Level pass: "A1", " Beginner " and "Beginner A1" all map to "beginner"
+    levels = [parse_level(_text(r.get('language_level'))) for r in records]
+
+    # Hobby pass: accept lists or pipe-separated strings, strip and drop empty entries
+    hobbies = [_hobby_list(r.get('hobbies')) for r in records]
+
+    # Name, ID and date pass: numeric values are taken as text
+    names = [_text(r.get('name')) for r in records]
+    ids = [_text(r.get('id')) for r in records]
+    dates = [_text(r.get('registration_date')) for r in records]
+
+    now = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    valid = []
+    for record, name, level, hobby_list, student_id, date in zip(records, names, levels, hobbies, ids, dates):
+        if not name:
+            errors.append((record, "missing name"))
+        elif student_id is None:
+            errors.append((record, f"invalid id {record.get('id')!r}"))
+        elif date is None:
+            errors.append((record, f"invalid registration date {record.get('registration_date')!r}"))
+        elif level is None:
+            errors.append((record, f"unknown language level {record.get('language_level')!r}"))
+        elif hobby_list is None:
+            errors.append((record, f"invalid hobbies {record.get('hobbies')!r}"))
+        elif len(hobby_list) < min_hobbies:
+            errors.append((record, f"needs at least {min_hobbies} hobbies, got {len(hobby_list)}"))
+        else:
+            valid.append(StudentProfile(
+                id=student_id or None,
+                name=name,
+                language_level=level,
+                registration_date=date or now,
+                hobbies=hobby_list[:MAX_HOBBIES],
+            ))
+    return valid, errors
+
+
+def import_profiles(path, db_path="./student_data", batch_size=5000, replace=False, min_hobbies=3):
+    """
+    Stream a CSV/JSONL file of students into the consolidated store.
+
+    Parameters:
+    - path: .csv or .jsonl file with name, language_level, hobbies and optional id / registration_date
+    - db_path: Directory of the student store (default: "./student_data")
+    - batch_size: Number of records validated and written per transaction
+    - replace: Overwrite students whose ID already exists
+    - min_hobbies: Minimum number of hobbies a student needs
+
+    Returns:
+    - stats: Dictionary with read, imported, rejected, errors, seconds and records_per_second
+    """
+    store = get_student_store(db_path)
+    allocator = get_id_allocator(db_path)
+
+    start = time.perf_counter()
+    stats = {"read": 0, "imported": 0, "rejected": 0, "errors": []}
+
+    for batch in batched(read_records(path), batch_size):
+        stats["read"] += len(batch)
+        valid, errors = validate_batch(batch, min_hobbies=min_hobbies)
+
+        # Give every record without an ID a fresh one, and reserve the ones that came with an ID
+        allocator.reserve_many(p['id'] for p in valid if p['id'] is not None)
+        missing = [p for p in valid if p['id'] is None]
+        for profile, student_id in zip(missing, allocator.allocate_many(len(missing))):
+            profile['id'] = student_id
+
+        stats["imported"] += store.add_many(valid, replace=replace)
+        stats["rejected"] += len(errors)
+        # Keep a sample of the errors, a bad file should not fill the memory
+        stats["errors"].extend(errors[:max(0, 100 - len(stats["errors"]))])
+
+    stats["seconds"] = time.perf_counter() - start
+    stats["records_per_second"] = stats["read"] / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
+
+
+def export_profiles(path, db_path="./student_data", batch_size=5000):
+    """
+    Stream every stored student into a .csv or .jsonl file.
+
+    Returns:
+    - stats: Dictionary with exported, seconds and records_per_second
+    """
+    store = get_student_store(db_path)
+
+    start = time.perf_counter()
+    exported = 0
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        if path.endswith('.jsonl'):
+            for profile in store.iter_profiles(batch_size=batch_size):
+                f.write(json.dumps(profile, ensure_ascii=False) + "\n")
+                exported += 1
+        else:
+            writer = csv.writer(f)
+            writer.writerow(FIELDS)
+            for profile in store.iter_profiles(batch_size=batch_size):
+                writer.writerow([
+                    profile['id'], profile['name'], profile['language_level'],
+                    profile['registration_date'], "|".join(profile['hobbies']),
+                ])
+                exported += 1
+
+    seconds = time.perf_counter() - start
+    return {
+        "exported": exported,
+        "seconds": seconds,
+        "records_per_second": exported / seconds if seconds else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Bulk import/export of student profiles")
+    parser.add_argument("--db-path", default="./student_data", help="Directory of the student store")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    importer = subcommands.add_parser("import", help="Import students from a .csv or .jsonl file")
+    importer.add_argument("path")
+    importer.add_argument("--replace", action="store_true", help="Overwrite students with the same ID")
+    importer.add_argument("--min-hobbies", type=int, default=3)
+
+    exporter = subcommands.add_parser("export", help="Export every student to a .csv or .jsonl file")
+    exporter.add_argument("path")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "import":
+        if not os.path.exists(args.path):
+            print(f"File not found: {args.path}")
+            return 1
+        stats = import_profiles(
+            args.path, db_path=args.db_path, batch_size=args.batch_size,
+            replace=args.replace, min_hobbies=args.min_hobbies,
+        )
+        for record, reason in stats["errors"]:
+            print(f"Rejected {record.get('name') if isinstance(record, dict) else record!r}: {reason}")
+        print(
+            f"Read {stats['read']} records, imported {stats['imported']}, rejected {stats['rejected']} "
+            f"in {stats['seconds']:.2f}s ({stats['records_per_second']:.0f} records/s)"
+        )
+    else:
+        stats = export_profiles(args.path, db_path=args.db_path, batch_size=args.batch_size)
+        print(
+            f"Exported {stats['exported']} records to {args.path} "
+            f"in {stats['seconds']:.2f}s ({stats['records_per_second']:.0f} records/s)"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from profile_index import normalize_name
+
+
+class ProfileCache:
+    """
+    Read-through cache for student profiles with LRU eviction and a TTL.
+
+    Keys are tuples starting with the data directory, e.g.
+    (db_path, "id", "EWEXD8CN") or (db_path, "name", "luis").
+    Misses (None) are not cached, so a student who registers mid-lesson is
+    found on the next lookup.
+    """
+
+    def __init__(self, maxsize=1024, ttl=300.0, clock=time.monotonic):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._clock = clock
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= self._clock():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (self._clock() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def get_or_load(self, key, loader):
+        """
+        Return the cached value for key, or call loader() and cache its result.
+        """
+        value = self.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        self.misses += 1
+        value = loader()
+        if value is not None:
+            self.put(key, value)
+        return value
+
+    def invalidate(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def invalidate_prefix(self, *prefix):
+        """Drop every entry whose key starts with prefix, e.g. invalidate_prefix(db_path)."""
+        n = len(prefix)
+        with self._lock:
+            for key in [k for k in self._entries if k[:n] == prefix]:
+                del self._entries[key]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+profile_cache = ProfileCache(
+    maxsize=int(os.getenv("PROFILE_CACHE_SIZE", "1024")),
+    ttl=float(os.getenv("PROFILE_CACHE_TTL", "300")),
+)
+
+
+def invalidate_profiles(db_path, profiles):
+    """
+    Drop cached entries a write to db_path makes stale.
+
+    Parameters:
+    - db_path: Data directory that was written to
+    - profiles: The StudentProfile records that were saved
+    """
+    key = os.path.abspath(db_path)
+    # "latest" always changes on a write; big batches just drop the whole directory
+    profile_cache.invalidate((key, "latest"))
+    if len(profiles) > 100:
+        profile_cache.invalidate_prefix(key)
+        return
+    for profile in profiles:
+        profile_cache.invalidate((key, "id", profile['id']))
+        profile_cache.invalidate((key, "name", normalize_name(profile['name'])))
@@ -0,0 +1,190 @@
+import csv
+import os
+import threading
+from typing import List, Optional
+from typing_extensions import TypedDict
+
+
+class StudentProfile(TypedDict):
+    id: str
+    name: str
+    language_level: str
+    registration_date: str
+    hobbies: List[str]
+
+
+def normalize_name(name):
+    """Lowercase a name and collapse spaces/underscores so lookups ignore formatting."""
+    return " ".join(name.replace("_", " ").split()).casefold()
+
+
+def _read_profiles(file_path):
+    """Read every student row of one dateofcreation_name_ID.csv file."""
+    profiles = []
+    with open(file_path, 'r', newline='') as csvfile:
+        for row in csv.DictReader(csvfile):
+            profiles.append(StudentProfile(
+                id=row['id'],
+                name=row['name'],
+                language_level=row['language_level'],
+                registration_date=row['registration_date'],
+                # Hobbies are stored pipe-separated
+                hobbies=row['hobbies'].split('|') if row['hobbies'] else [],
+            ))
+    return profiles
+
+
+class ProfileIndex:
+    """
+    In-memory index of the CSV student files, keyed by ID and by normalized name.
+
+    The directory is scanned once. After that a lookup costs one stat of the
+    directory (to notice added or removed files) and one stat of each file
+    that holds the match (to notice it being rewritten). The same ID may
+    appear in several files, get returns the most recently registered one.
+    """
+
+    def __init__(self, db_path="./student_data"):
+        self.db_path = db_path
+        self._lock = threading.RLock()
+        self._dir_mtime = None
+        self._files = {}       # file path -> (mtime, [student ids])
+        self._by_id = {}       # student id -> {file path: profile}, an ID may appear in several files
+        self._by_name = {}     # normalized name -> {student id, ...}
+        self._latest_id = None
+
+    def _best(self, student_id):
+        """Return the most recently registered profile stored under student_id, or None."""
+        entries = self._by_id.get(student_id)
+        if not entries:
+            return None
+        return max(entries.values(), key=lambda p: p['registration_date'])
+
+    def _add_file(self, file_path, mtime):
+        try:
+            profiles = _read_profiles(file_path)
+        except (OSError, KeyError, csv.Error) as e:
+            print(f"Error reading file {os.path.basename(file_path)}: {e}")
+            profiles = []
+
+        self._files[file_path] = (mtime, [p['id'] for p in profiles])
+        for profile in profiles:
+            self._by_id.setdefault(profile['id'], {})[file_path] = profile
+            self._by_name.setdefault(normalize_name(profile['name']), set()).add(profile['id'])
+            latest = self._best(self._latest_id)
+            if latest is None or profile['registration_date'] >= latest['registration_date']:
+                self._latest_id = profile['id']
+
+    def _drop_file(self, file_path):
+        _, student_ids = self._files.pop(file_path, (None, []))
+        for student_id in student_ids:
+            entries = self._by_id.get(student_id)
+            profile = entries.pop(file_path, None) if entries else None
+            if profile is None:
+                continue
+            if not entries:
+                del self._by_id[student_id]
+            key = normalize_name(profile['name'])
+            # The ID keeps its name entry while another file still has it under that name
+            if not any(normalize_name(p['name']) == key for p in self._by_id.get(student_id, {}).values()):
+                names = self._by_name.get(key, set())
+                names.discard(student_id)
+                if not names:
+                    self._by_name.pop(key, None)
+            if student_id == self._latest_id:
+                self._latest_id = None
+
+        if self._latest_id is None and self._by_id:
+            self._latest_id = max(self._by_id, key=lambda i: self._best(i)['registration_date'])
+
+    def refresh(self):
+        """Re-scan the directory if it changed since the last scan."""
+        with self._lock:
+            try:
+                dir_mtime = os.stat(self.db_path).st_mtime_ns
+            except FileNotFoundError:
+                for file_path in list(self._files):
+                    self._drop_file(file_path)
+                self._dir_mtime = None
+                return
+
+            if dir_mtime == self._dir_mtime:
+                return
+
+            seen = set()
+            with os.scandir(self.db_path) as entries:
+                for entry in entries:
+                    if not entry.name.endswith('.csv') or not entry.is_file():
+                        continue
+                    seen.add(entry.path)
+                    mtime = entry.stat().st_mtime_ns
+                    known = self._files.get(entry.path)
+                    if known is None or known[0] != mtime:
+                        self._drop_file(entry.path)
+                        self._add_file(entry.path, mtime)
+
+            for file_path in set(self._files) - seen:
+                self._drop_file(file_path)
+
+            self._dir_mtime = dir_mtime
+
+    def _fresh(self, student_id):
+        """Return the profile for student_id, re-reading the files that hold it if they were rewritten."""
+        for file_path in list(self._by_id.get(student_id, ())):
+            try:
+                mtime = os.stat(file_path).st_mtime_ns
+            except FileNotFoundError:
+                self._drop_file(file_path)
+                continue
+            if mtime != self._files[file_path][0]:
+                self._drop_file(file_path)
+                self._add_file(file_path, mtime)
+        return self._best(student_id)
+
+    def get(self, student_id) -> Optional[StudentProfile]:
+        with self._lock:
+            self.refresh()
+            if student_id not in self._by_id:
+                return None
+            return self._fresh(student_id)
+
+    def find_by_name(self, name) -> List[StudentProfile]:
+        with self._lock:
+            self.refresh()
+            key = normalize_name(name)
+            profiles = []
+            for student_id in list(self._by_name.get(key, ())):
+                self._fresh(student_id)
+                matches = [p for p in self._by_id.get(student_id, {}).values() if normalize_name(p['name']) == key]
+                if matches:
+                    profiles.append(max(matches, key=lambda p: p['registration_date']))
+            return sorted(profiles, key=lambda p: p['registration_date'], reverse=True)
+
+    def latest(self) -> Optional[StudentProfile]:
+        with self._lock:
+            self.refresh()
+            if self._latest_id is None:
+                return None
+            return self._fresh(self._latest_id)
+
+    def __len__(self):
+        with self._lock:
+            self.refresh()
+            return len(self._by_id)
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_profile_index(db_path="./student_data"):
+    """
+    Return the shared ProfileIndex for db_path, creating it on first use.
+    """
+    key = os.path.abspath(db_path)
+    with _indexes_lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = ProfileIndex(db_path)
+            _indexes[key] = index
+    return index
@@ -0,0 +1,192 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from group_commit import GroupCommitWriter
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS students (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    language_level TEXT NOT NULL,
+    registration_date DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
+CREATE TABLE IF NOT EXISTS hobbies (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    student_id INTEGER NOT NULL,
+    hobby TEXT NOT NULL,
+    FOREIGN KEY (student_id) REFERENCES students(id)
+);
+
+CREATE INDEX IF NOT EXISTS hobbies_by_student ON hobbies (student_id);
+'''
+
+
+class ConnectionPool:
+    """
+    Small pool of long-lived SQLite connections in WAL mode.
+
+    WAL lets readers run while a writer commits, and a busy timeout makes
+    concurrent writers wait for the lock instead of failing straight away.
+    """
+
+    def __init__(self, db_path, size=4, busy_timeout_ms=5000):
+        self.db_path = db_path
+        self.size = size
+        self._busy_timeout_ms = busy_timeout_ms
+        self._idle = queue.LifoQueue(maxsize=size)
+        for _ in range(size):
+            self._idle.put(self._connect())
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=self._busy_timeout_ms / 1000,
+            check_same_thread=False,
+            isolation_level=None,  # We open transactions ourselves
+        )
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        conn.execute(f"PRAGMA busy_timeout={self._busy_timeout_ms}")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection from the pool, blocking until one is free."""
+        conn = self._idle.get()
+        try:
+            yield conn
+        finally:
+            self._idle.put(conn)
+
+    @contextmanager
+    def transaction(self, durable=False):
+        """
+        Borrow a connection and run the block inside one write transaction.
+
+        With durable=True the commit is fsynced (synchronous=FULL) before
+        returning, instead of only surviving an application crash.
+        """
+        with self.connection() as conn:
+            if durable:
+                conn.execute("PRAGMA synchronous=FULL")
+            try:
+                # BEGIN IMMEDIATE takes the write lock up front, so two writers
+                # never both read and then fail to upgrade their lock
+                conn.execute("BEGIN IMMEDIATE")
+                try:
+                    yield conn
+                except BaseException:
+                    conn.execute("ROLLBACK")
+                    raise
+                conn.execute("COMMIT")
+            finally:
+                if durable:
+                    conn.execute("PRAGMA synchronous=NORMAL")
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class ProfileRepository:
+    """
+    Long-lived access to the students / hobbies SQLite database.
+
+    The schema is created once when the repository is built, every call after
+    that only borrows a pooled connection and runs its inserts.
+    """
+
+    def __init__(self, db_path="./student_data.db", pool_size=4):
+        # Create directory if needed
+        os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
+
+        self.db_path = db_path
+        self.pool = ConnectionPool(db_path, size=pool_size)
+
+        with self.pool.connection() as conn:
+            conn.executescript(SCHEMA)
+
+        self.writer = GroupCommitWriter(self._write_students, name=f"group-commit:{db_path}")
+
+    def add_student(self, name, language_level, hobbies):
+        """
+        Insert a student and their hobbies.
+
+        Concurrent calls are grouped by the writer and committed together in
+        one durable transaction; this returns once that commit is on disk.
+
+        Parameters:
+        - name: Student's name (string)
+        - language_level: Student's language level (string, e.g., "Beginner A1")
+        - hobbies: List of up to 3 hobbies (list of strings)
+
+        Returns:
+        - student_id: ID of the newly inserted student
+        """
+        return self.writer.write((name, language_level, hobbies))
+
+    def _write_students(self, students):
+        """Insert a batch of (name, language_level, hobbies) in one durable transaction."""
+        student_ids = []
+        with self.pool.transaction(durable=True) as conn:
+            for name, language_level, hobbies in students:
+                cursor = conn.execute(
+                    'INSERT INTO students (name, language_level) VALUES (?, ?)',
+                    (name, language_level)
+                )
+                student_id = cursor.lastrowid
+
+                conn.executemany(
+                    'INSERT INTO hobbies (student_id, hobby) VALUES (?, ?)',
+                    [(student_id, hobby) for hobby in hobbies[:3] if hobby.strip()]
+                )
+                student_ids.append(student_id)
+
+        return student_ids
+
+    def get_student(self, student_id):
+        """
+        Return (name, language_level, registration_date, [hobbies]) for a student, or None.
+        """
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                'SELECT name, language_level, registration_date FROM students WHERE id = ?',
+                (student_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            hobbies = [h for (h,) in conn.execute(
+                'SELECT hobby FROM hobbies WHERE student_id = ? ORDER BY id', (student_id,)
+            )]
+        return (*row, hobbies)
+
+    def close(self):
+        self.pool.close()
+
+
+_repositories = {}
+_repositories_lock = threading.Lock()
+
+
+def get_profile_repository(db_path="./student_data.db"):
+    """
+    Return the shared ProfileRepository for db_path, creating it on first use.
+    """
+    key = os.path.abspath(db_path)
+    repository = _repositories.get(key)
+    if repository is None:
+        with _repositories_lock:
+            repository = _repositories.get(key)
+            if repository is None:
+                repository = ProfileRepository(db_path)
+                _repositories[key] = repository
+    return repository
@@ -0,0 +1,291 @@
+"""
+Local cache of deterministic (temperature=0) model responses.
+
+Every ChatAnthropic in this project runs at temperature=0, so the same
+model, messages and tools give the same answer. cached_invoke() serves
+those calls from an in-memory LRU, backed by an SQLite file that survives
+restarts, and only calls the model on a miss.
+
+Slots make near-identical calls share one entry: the farewell prompts only
+differ by student ID, so the ID is replaced by {{student_id}} before hashing,
+and the cached answer gets the current student's ID filled back in. Slot
+values are only replaced where they stand as a whole word, so a short value
+(a level "A1", a two-letter name) never matches inside another word.
+"""
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from langchain_core.messages import HumanMessage, message_to_dict, messages_from_dict
+
+
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE", "1") == "1"
+RESPONSE_CACHE_PATH = os.getenv("RESPONSE_CACHE_PATH", "./.response_cache/responses.db")
+
+# Content block keys that change between runs without changing the answer (as in mock_llm_server.py)
+_VOLATILE_KEYS = {"cache_control", "id", "tool_use_id"}
+
+
+def _normalize_text(text):
+    # Indentation and trailing spaces of the prompt strings do not change the answer
+    return "\n".join(" ".join(line.split()) for line in text.strip().splitlines())
+
+
+def _normalize_content(content):
+    if isinstance(content, str):
+        return _normalize_text(content)
+    blocks = []
+    for block in content:
+        if isinstance(block, dict):
+            # cache_control only changes billing, tool_use IDs are new on every call
+            block = {k: v for k, v in block.items() if k not in _VOLATILE_KEYS}
+            if isinstance(block.get("text"), str):
+                block["text"] = _normalize_text(block["text"])
+        elif isinstance(block, str):
+            block = _normalize_text(block)
+        blocks.append(block)
+    return blocks
+
+
+def normalize_messages(messages):
+    """Reduce messages to what determines the answer: role, content and tool calls (no IDs)."""
+    if isinstance(messages, str):
+        messages = [HumanMessage(content=messages)]
+    normalized = []
+    for message in messages:
+        if isinstance(message, dict):
+            normalized.append({"role": message.get("role"), "content": _normalize_content(message.get("content", ""))})
+            continue
+        entry = {"role": message.type, "content": _normalize_content(message.content)}
+        tool_calls = getattr(message, "tool_calls", None)
+        if tool_calls:
+            entry["tool_calls"] = [{"name": c["name"], "args": c["args"]} for c in tool_calls]
+        normalized.append(entry)
+    return normalized
+
+
+def _walk(value, replace):
+    """Apply replace to every string inside a JSON-like value."""
+    if isinstance(value, str):
+        return replace(value)
+    if isinstance(value, dict):
+        return {k: _walk(v, replace) for k, v in value.items()}
+    if isinstance(value, list):
+        return [_walk(v, replace) for v in value]
+    return value
+
+
+def _template(value, slots):
+    """Replace every slot value standing as a whole word by its {{name}} placeholder."""
+    patterns = [
+        (re.compile(r"(?<!\w)" + re.escape(str(v)) + r"(?!\w)"), "{{" + name + "}}")
+        for name, v in slots.items() if str(v)
+    ]
+    if not patterns:
+        return value
+
+    def replace(text):
+        for pattern, placeholder in patterns:
+            text = pattern.sub(lambda _: placeholder, text)
+        return text
+
+    return _walk(value, replace)
+
+
+def _fill(value, slots):
+    """Put the slot values back in place of their placeholders."""
+    if not slots:
+        return value
+
+    def replace(text):
+        for name, v in slots.items():
+            text = text.replace("{{" + name + "}}", str(v))
+        return text
+
+    return _walk(value, replace)
+
+
+def model_info(llm):
+    """Return (model name, temperature, tools) of a chat model or a bind_tools binding."""
+    model = getattr(llm, "bound", llm)
+    kwargs = getattr(llm, "kwargs", {}) or {}
+    name = getattr(model, "model", None) or getattr(model, "model_name", None) or type(model).__name__
+    return name, getattr(model, "temperature", None), kwargs.get("tools")
+
+
+class ResponseCache:
+    """
+    Two-tier LRU cache of model responses: memory in front of an SQLite file.
+
+    Parameters:
+    - maxsize: Entries kept in memory
+    - disk_path: SQLite file of the disk tier (None for memory only)
+    - disk_maxsize: Entries kept on disk, the least recently used are deleted beyond that
+    """
+
+    def __init__(self, maxsize=1024, disk_path=RESPONSE_CACHE_PATH, disk_maxsize=100000):
+        self.maxsize = maxsize
+        self.disk_maxsize = disk_maxsize
+        self._memory = OrderedDict()  # key -> templated response JSON
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+        self._disk = None
+        if disk_path:
+            os.makedirs(os.path.dirname(os.path.abspath(disk_path)), exist_ok=True)
+            self._disk = sqlite3.connect(disk_path, check_same_thread=False, isolation_level=None)
+            self._disk.execute("PRAGMA journal_mode=WAL")
+            self._disk.execute(
+                "CREATE TABLE IF NOT EXISTS responses (key TEXT PRIMARY KEY, response TEXT NOT NULL, last_used REAL NOT NULL)"
+            )
+            self._disk.execute("CREATE INDEX IF NOT EXISTS responses_by_use ON responses (last_used)")
+
+    @staticmethod
+    def make_key(model, messages, tools=None, slots=None):
+        payload = {"model": model, "messages": normalize_messages(messages), "tools": tools}
+        if slots:
+            # Round trip first, so the slots are also templated out of tool schemas and other objects
+            payload = _template(json.loads(json.dumps(payload, default=str)), slots)
+        payload = json.dumps(payload, sort_keys=True, default=str, ensure_ascii=False)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def get(self, key):
+        """Return the templated response JSON for key, or None."""
+        with self._lock:
+            response = self._memory.get(key)
+            if response is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return response
+
+            if self._disk is not None:
+                row = self._disk.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    self._disk.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+                    self._remember(key, row[0])
+                    self.disk_hits += 1
+                    return row[0]
+
+            self.misses += 1
+            return None
+
+    def put(self, key, response):
+        with self._lock:
+            self._remember(key, response)
+            if self._disk is not None:
+                self._disk.execute(
+                    "INSERT OR REPLACE INTO responses (key, response, last_used) VALUES (?, ?, ?)",
+                    (key, response, time.time())
+                )
+                # Trim the disk tier now and then instead of on every write
+                if self.misses % 100 == 0:
+                    self._disk.execute(
+                        "DELETE FROM responses WHERE key IN "
+                        "(SELECT key FROM responses ORDER BY last_used DESC LIMIT -1 OFFSET ?)",
+                        (self.disk_maxsize,)
+                    )
+
+    def _remember(self, key, response):
+        self._memory[key] = response
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._memory.clear()
+            if self._disk is not None:
+                self._disk.execute("DELETE FROM responses")
+
+
+_default_cache = None
+_default_cache_lock = threading.Lock()
+
+
+def get_response_cache():
+    """Return the process-wide ResponseCache, creating it on first use."""
+    global _default_cache
+    if _default_cache is None:
+        with _default_cache_lock:
+            if _default_cache is None:
+                _default_cache = ResponseCache()
+    return _default_cache
+
+
+def cached_invoke(llm, messages, slots=None, cache=None):
+    """
+    Invoke llm, answering from the response cache when the call is deterministic.
+
+    Parameters:
+    - llm: Chat model or bind_tools binding
+    - messages: Messages (or a prompt string) to send
+    - slots: Dictionary of values that vary between otherwise identical calls,
+      e.g. {"student_id": "KGCRGL3Y"}; they are templated out of the key and
+      filled back into the cached answer
+    - cache: ResponseCache to use (default: the process-wide one)
+
+    Returns:
+    - response: The model's AIMessage, from the cache or from the model
+    """
+    model, temperature, tools = model_info(llm)
+    if not RESPONSE_CACHE_ENABLED or temperature != 0:
+        return llm.invoke(messages)
+
+    cache = cache or get_response_cache()
+    slots = slots or {}
+    key = cache.make_key(model, messages, tools, slots)
+
+    cached = cache.get(key)
+    if cached is not None:
+        return _from_cache(_fill(json.loads(cached), slots))
+
+    response = llm.invoke(messages)
+    _store(cache, key, response, slots)
+    return response
+
+
+async def acached_invoke(llm, messages, slots=None, cache=None):
+    """Async version of cached_invoke, awaits llm.ainvoke on a miss."""
+    model, temperature, tools = model_info(llm)
+    if not RESPONSE_CACHE_ENABLED or temperature != 0:
+        return await llm.ainvoke(messages)
+
+    cache = cache or get_response_cache()
+    slots = slots or {}
+    key = cache.make_key(model, messages, tools, slots)
+
+    # Cache lookups are local and sub-millisecond, only the model call is awaited
+    cached = cache.get(key)
+    if cached is not None:
+        return _from_cache(_fill(json.loads(cached), slots))
+
+    response = await llm.ainvoke(messages)
+    _store(cache, key, response, slots)
+    return response
+
+
+def _store(cache, key, response, slots):
+    stored = message_to_dict(response)
+    stored["data"]["id"] = None
+    cache.put(key, json.dumps(_template(stored, slots), ensure_ascii=False))
+
+
+def _from_cache(stored):
+    """Rebuild a cached AIMessage (as stored by _store) with fresh tool call IDs and a local-hit marker."""
+    text = json.dumps(stored, ensure_ascii=False)
+    # A thread must never see the same tool_use ID twice, so hand out new ones
+    for tool_call in stored["data"].get("tool_calls") or []:
+        if tool_call.get("id"):
+            text = text.replace(tool_call["id"], f"toolu_{uuid.uuid4().hex[:24]}")
+
+    response = messages_from_dict([json.loads(text)])[0]
+    response.response_metadata["local_cache_hit"] = True
+    return response
@@ -0,0 +1,261 @@
+"""
+One conversation thread per student, with a bounded number of resident sessions.
+
+The graphs used to run every conversation on a hardcoded thread ID, so every
+run continued the same conversation. SessionManager derives the thread from
+the student ID ("<graph name>:<student ID>"), so each student has their own
+conversation, and it survives restarts through the persistent checkpointer.
+
+Only max_active sessions are resident. Opening one more evicts the least
+recently used idle session, and sessions idle for idle_ttl_s are evicted as
+well. Eviction loses nothing, because every turn is already checkpointed; it
+drops the session and the checkpointer's cached messages of the thread.
+The next turn of that student rehydrates the thread from the checkpointer.
+Memory therefore depends on max_active, not on the number of enrolled
+students.
+
+    sessions = SessionManager(build_graph(), "conversation")
+    answer = sessions.invoke("ABC12", {"messages": [HumanMessage(content="Hallo!")]})
+"""
+import asyncio
+import os
+import threading
+import time
+import uuid
+import weakref
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from checkpointer import get_checkpointer
+
+
+SESSION_MAX_ACTIVE = int(os.getenv("SESSION_MAX_ACTIVE", "256"))
+SESSION_IDLE_TTL_S = float(os.getenv("SESSION_IDLE_TTL_S", "900"))
+
+
+class SessionLimitError(RuntimeError):
+    """Raised when max_active sessions are all in a turn and another one is opened."""
+
+
+class Session:
+    """
+    A student's resident session.
+
+    Parameters:
+    - student_id: Student (or guest) the session belongs to
+    - thread_id: Checkpointer thread holding the conversation
+    """
+
+    __slots__ = ("student_id", "thread_id", "config", "last_used", "turns", "busy", "lock", "_alocks")
+
+    def __init__(self, student_id, thread_id, now):
+        self.student_id = student_id
+        self.thread_id = thread_id
+        # student_id is also read by nodes, e.g. the conversation greeting looks the student up with it
+        self.config = {"configurable": {"thread_id": thread_id, "student_id": student_id}}
+        self.last_used = now
+        self.turns = 0
+        self.busy = 0
+        # One turn at a time per student, parallel turns would fork the thread. A single
+        # threading.Lock covers invoke and ainvoke, so a sync and an async turn exclude each other
+        self.lock = threading.Lock()
+        # event loop -> asyncio.Lock queueing the async turns of that loop before they take self.lock
+        self._alocks = weakref.WeakKeyDictionary()
+
+    def alock(self):
+        """Return the asyncio.Lock of this session for the running event loop."""
+        loop = asyncio.get_running_loop()
+        alock = self._alocks.get(loop)
+        if alock is None:
+            alock = self._alocks.setdefault(loop, asyncio.Lock())
+        return alock
+
+
+# Async turns wait for a session lock held by a sync turn here, not in the default executor:
+# the checkpointer's async methods run there, and the turn holding the lock needs them to finish
+_lock_waiters = ThreadPoolExecutor(max_workers=SESSION_MAX_ACTIVE, thread_name_prefix="session-lock")
+
+
+async def _acquire(lock):
+    """Acquire a threading.Lock without blocking the event loop."""
+    if lock.acquire(blocking=False):
+        return
+    acquired = asyncio.get_running_loop().run_in_executor(_lock_waiters, lock.acquire)
+    try:
+        await asyncio.shield(acquired)
+    except asyncio.CancelledError:
+        # The executor thread still gets the lock, hand it back as soon as it does
+        acquired.add_done_callback(lambda _: lock.release())
+        raise
+
+
+class SessionManager:
+    """
+    Runs a compiled graph with one thread per student and an LRU of resident sessions.
+
+    Parameters:
+    - graph: Compiled graph; graphs compiled without a checkpointer get checkpointer
+    - name: Name of the graph, the prefix of its thread IDs
+    - checkpointer: Persistent checkpointer (default: the shared BoundedSqliteSaver)
+    - max_active: Maximum resident sessions
+    - idle_ttl_s: Sessions without a turn for this long are evicted
+    - clock: Function returning the current time in seconds (for tests)
+    """
+
+    def __init__(self, graph, name, checkpointer=None, max_active=SESSION_MAX_ACTIVE,
+                 idle_ttl_s=SESSION_IDLE_TTL_S, clock=time.monotonic):
+        if graph.checkpointer is None or checkpointer is not None:
+            graph = graph.copy(update={"checkpointer": checkpointer or get_checkpointer()})
+        self.graph = graph
+        self.checkpointer = graph.checkpointer
+        self.name = name
+        self.max_active = max_active
+        self.idle_ttl_s = idle_ttl_s
+        self.clock = clock
+        self._sessions = OrderedDict()  # student_id -> Session, least recently used first
+        self._lock = threading.Lock()
+        self.stats = {"opened": 0, "rehydrated": 0, "evicted": 0, "turns": 0}
+
+    def thread_id(self, student_id):
+        """Return the thread of a student's conversation with this graph."""
+        return f"{self.name}:{student_id}"
+
+    def _evict(self, session):
+        # Called with self._lock held
+        del self._sessions[session.student_id]
+        self.stats["evicted"] += 1
+        release = getattr(self.checkpointer, "release", None)
+        if release is not None:
+            release(session.thread_id)
+
+    def _evict_idle(self, now):
+        # Sessions are ordered by last use, so the idle ones are at the front
+        evicted = 0
+        for session in list(self._sessions.values()):
+            if now - session.last_used < self.idle_ttl_s:
+                break
+            if not session.busy:
+                self._evict(session)
+                evicted += 1
+        return evicted
+
+    def open(self, student_id=None):
+        """
+        Return the student's session, rehydrating it if it is not resident.
+
+        Parameters:
+        - student_id: Student ID, or None for a new guest (e.g. before the profile exists)
+
+        Returns:
+        - session: The resident Session
+        """
+        return self._open(student_id, checkout=False)
+
+    def _open(self, student_id, checkout):
+        if student_id is None:
+            student_id = f"guest-{uuid.uuid4().hex[:12]}"
+        now = self.clock()
+        with self._lock:
+            self._evict_idle(now)
+            session = self._sessions.get(student_id)
+            if session is not None:
+                self._sessions.move_to_end(student_id)
+                session.last_used = now
+                # Marked busy under the same lock, so it cannot be evicted before the turn starts
+                session.busy += checkout
+                return session
+
+            # Make room by evicting the least recently used idle sessions
+            if len(self._sessions) >= self.max_active:
+                for candidate in list(self._sessions.values()):
+                    if len(self._sessions) < self.max_active:
+                        break
+                    if not candidate.busy:
+                        self._evict(candidate)
+            if len(self._sessions) >= self.max_active:
+                raise SessionLimitError(f"All {self.max_active} sessions are in a turn, try again later")
+
+            session = Session(student_id, self.thread_id(student_id), now)
+            session.busy += checkout
+            self._sessions[student_id] = session
+            self.stats["opened"] += 1
+
+        has_thread = getattr(self.checkpointer, "has_thread", None)
+        if has_thread is not None and has_thread(session.thread_id):
+            with self._lock:
+                self.stats["rehydrated"] += 1
+        return session
+
+    def _checkin(self, session):
+        with self._lock:
+            session.busy -= 1
+            session.turns += 1
+            session.last_used = self.clock()
+            self.stats["turns"] += 1
+            if self._sessions.get(session.student_id) is session:
+                self._sessions.move_to_end(session.student_id)
+
+    def invoke(self, student_id, input, **kwargs):
+        """
+        Run one turn of the graph in the student's thread.
+
+        Parameters:
+        - student_id: Student ID (see open)
+        - input: Graph input, e.g. {"messages": [HumanMessage(...)]}
+        - kwargs: Any other graph.invoke argument
+
+        Returns:
+        - output: The graph output
+        """
+        session = self._open(student_id, checkout=True)
+        try:
+            with session.lock:
+                return self.graph.invoke(input, session.config, **kwargs)
+        finally:
+            self._checkin(session)
+
+    async def ainvoke(self, student_id, input, **kwargs):
+        """Async version of invoke, for many concurrent students in one event loop."""
+        session = self._open(student_id, checkout=True)
+        try:
+            # Async turns of the student queue on the event loop, only the first one waits
+            # on a thread (for a sync turn holding session.lock)
+            async with session.alock():
+                await _acquire(session.lock)
+                try:
+                    return await self.graph.ainvoke(input, session.config, **kwargs)
+                finally:
+                    session.lock.release()
+        finally:
+            self._checkin(session)
+
+    def get_state(self, student_id):
+        """Return the graph state snapshot of the student's thread (rehydrating the session)."""
+        return self.graph.get_state(self.open(student_id).config)
+
+    def evict(self, student_id):
+        """Evict a student's session if it is resident and idle. Returns True if it was evicted."""
+        with self._lock:
+            session = self._sessions.get(student_id)
+            if session is None or session.busy:
+                return False
+            self._evict(session)
+            return True
+
+    def evict_idle(self, now=None):
+        """Evict every session idle for idle_ttl_s. Returns the number of evicted sessions."""
+        with self._lock:
+            return self._evict_idle(self.clock() if now is None else now)
+
+    def active_count(self):
+        with self._lock:
+            return len(self._sessions)
+
+    def report(self):
+        """Return the resident and busy session counts and the lifetime counters."""
+        with self._lock:
+            return {
+                "active": len(self._sessions),
+                "busy": sum(1 for session in self._sessions.values() if session.busy),
+                **self.stats,
+            }
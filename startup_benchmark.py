@@ -0,0 +1,117 @@
+"""
+Cold-start benchmark of the graphs served by `langgraph dev`.
+
+For every graph in langgraph.json it starts a fresh interpreter, imports the
+graph module and calls its factory, and reports the median import and build
+times next to the framework baseline (importing langgraph and langchain-core
+alone). It also flags side effects: heavy modules loaded by the import, and
+files or SQLite databases opened in the project directory by the import or
+the factory (the server attaches its own checkpointer, a factory must not).
+
+    python startup_benchmark.py --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# What the langgraph server itself imports before loading any graph
+BASELINE_MODULES = ["langgraph.graph", "langgraph.prebuilt", "langchain_core.messages", "langchain_core.runnables"]
+
+# Modules a graph module should only load when a graph actually runs
+HEAVY_MODULES = ["langchain_anthropic", "anthropic", "numpy", "sounddevice", "soundfile"]
+
+
+def _child(graph_id):
+    """Measure one cold start in this (fresh) interpreter and print it as JSON."""
+    opened = []
+
+    def audit(event, args):
+        # Source files are read by every import, only data files count as side effects
+        if event not in ("open", "sqlite3.connect") or not isinstance(args[0], str):
+            return
+        path = os.path.abspath(args[0])
+        if path.startswith(PROJECT_DIR) and not path.endswith((".py", ".pyc")):
+            opened.append(os.path.relpath(path, PROJECT_DIR))
+
+    start = time.perf_counter()
+    for module in BASELINE_MODULES:
+        __import__(module)
+    baseline_s = time.perf_counter() - start
+    result = {"baseline_s": baseline_s}
+
+    if graph_id is not None:
+        from graph_factories import graph_specs, load_module
+
+        spec = graph_specs()[graph_id]
+        sys.addaudithook(audit)
+        start = time.perf_counter()
+        _, factory = load_module(spec)
+        result["import_s"] = time.perf_counter() - start
+        result["heavy_modules"] = [m for m in HEAVY_MODULES if m in sys.modules]
+
+        start = time.perf_counter()
+        factory()
+        result["build_s"] = time.perf_counter() - start
+        result["opened"] = sorted(set(opened))
+
+    print(json.dumps(result))
+
+
+def measure(graph_id=None, repeat=3):
+    """
+    Run repeat cold starts of a graph (None for the baseline only).
+
+    Returns:
+    - runs: One dict per run with baseline_s, import_s, build_s, heavy_modules and opened
+    """
+    runs = []
+    for _ in range(repeat):
+        command = [sys.executable, os.path.abspath(__file__), "--child"] + ([graph_id] if graph_id else [])
+        output = subprocess.run(command, cwd=PROJECT_DIR, capture_output=True, text=True, check=True).stdout
+        runs.append(json.loads(output.strip().splitlines()[-1]))
+    return runs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold-start time of the langgraph.json graphs")
+    parser.add_argument("--repeat", type=int, default=3, help="Cold starts per graph (the median is reported)")
+    parser.add_argument("--json", help="Also write the report to this file")
+    parser.add_argument("--child", nargs="?", const="", default=None, help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.child is not None:
+        _child(args.child or None)
+        return 0
+
+    from graph_factories import graph_specs
+
+    report = {"baseline_s": statistics.median(run["baseline_s"] for run in measure(repeat=args.repeat)), "graphs": {}}
+    print(f"{'graph':<24} {'import (s)':>10} {'build (s)':>10}  side effects")
+    print(f"{'framework baseline':<24} {report['baseline_s']:>10.3f} {'':>10}")
+    for graph_id in graph_specs():
+        runs = measure(graph_id, args.repeat)
+        entry = {
+            "import_s": statistics.median(run["import_s"] for run in runs),
+            "build_s": statistics.median(run["build_s"] for run in runs),
+            "heavy_modules": runs[0]["heavy_modules"],
+            "opened": runs[0]["opened"],
+        }
+        report["graphs"][graph_id] = entry
+        effects = ", ".join(entry["heavy_modules"] + entry["opened"]) or "none"
+        print(f"{graph_id:<24} {entry['import_s']:>10.3f} {entry['build_s']:>10.3f}  {effects}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,235 @@
+"""
+Token streaming from the agent nodes to pluggable consumers.
+
+stream_model() is the streaming counterpart of message_builder.invoke_model()
+(astream_model() of ainvoke_model()): it sends every text token to the
+consumers as soon as it arrives (console, TTS, websocket, ...) and still
+returns the complete AIMessage, tool calls included, for the graph state.
+"""
+import asyncio
+import json
+import queue
+import re
+import sys
+import threading
+import time
+
+from langchain_core.messages import message_chunk_to_message
+
+from message_builder import build_messages, record_cache_usage
+from model_router import record_latency
+from response_cache import model_info
+
+
+class TokenConsumer:
+    """Receives the text of a streamed model response. Override what you need."""
+
+    def on_start(self, node):
+        pass
+
+    def on_token(self, text):
+        pass
+
+    def on_end(self, message):
+        pass
+
+    def on_error(self, error):
+        """Called instead of on_end when the stream fails or is cancelled."""
+        pass
+
+
+class ConsoleConsumer(TokenConsumer):
+    """Prints tokens as they arrive."""
+
+    def __init__(self, prefix="\nAI:\n", stream=None):
+        self.prefix = prefix
+        self.stream = stream or sys.stdout
+
+    def on_start(self, node):
+        self.stream.write(self.prefix)
+        self.stream.flush()
+
+    def on_token(self, text):
+        self.stream.write(text)
+        self.stream.flush()
+
+    def on_end(self, message):
+        self.stream.write("\n")
+        self.stream.flush()
+
+    def on_error(self, error):
+        self.on_end(None)
+
+
+class TTSConsumer(TokenConsumer):
+    """
+    Speaks the response sentence by sentence while the rest is still streaming.
+
+    Sentences are spoken on a background thread so playback never holds up
+    the stream; on_end waits until everything has been said.
+    """
+
+    SENTENCE_END = re.compile(r"(?<=[.!?…:])\s+")
+
+    def __init__(self, tts):
+        self.tts = tts
+        self._buffer = ""
+        self._sentences = queue.Queue()
+        self._worker = threading.Thread(target=self._speak_loop, daemon=True)
+        self._worker.start()
+
+    def _speak_loop(self):
+        while True:
+            sentence = self._sentences.get()
+            try:
+                if sentence.strip():
+                    self.tts.speak(sentence)
+            finally:
+                self._sentences.task_done()
+
+    def on_token(self, text):
+        self._buffer += text
+        *sentences, self._buffer = self.SENTENCE_END.split(self._buffer)
+        for sentence in sentences:
+            self._sentences.put(sentence)
+
+    def on_end(self, message):
+        if self._buffer.strip():
+            self._sentences.put(self._buffer)
+        self._buffer = ""
+        self._sentences.join()
+
+    def on_error(self, error):
+        # Drop the unfinished sentence and whatever was not spoken yet, the next turn starts clean
+        self._buffer = ""
+        while True:
+            try:
+                self._sentences.get_nowait()
+            except queue.Empty:
+                break
+            self._sentences.task_done()
+
+
+class WebSocketConsumer(TokenConsumer):
+    """
+    Forwards tokens as JSON events to a websocket-like send function.
+
+    send can be a plain function or a coroutine function; coroutines are
+    scheduled on loop (the event loop that owns the socket).
+    """
+
+    def __init__(self, send, loop=None):
+        self.send = send
+        self.loop = loop
+        self.node = None
+
+    def _emit(self, event):
+        payload = json.dumps(event)
+        if asyncio.iscoroutinefunction(self.send):
+            asyncio.run_coroutine_threadsafe(self.send(payload), self.loop)
+        else:
+            self.send(payload)
+
+    def on_start(self, node):
+        self.node = node
+        self._emit({"type": "start", "node": node})
+
+    def on_token(self, text):
+        self._emit({"type": "token", "node": self.node, "text": text})
+
+    def on_end(self, message):
+        self._emit({"type": "end", "node": self.node, "content": message_text(message)})
+
+    def on_error(self, error):
+        self._emit({"type": "error", "node": self.node, "error": str(error)})
+
+
+def message_text(message):
+    """Return only the text of a message or chunk (content may be a string or content blocks)."""
+    content = message.content
+    if isinstance(content, str):
+        return content
+    return "".join(
+        block.get("text", "") for block in content
+        if isinstance(block, dict) and block.get("type") in ("text", "text_delta")
+    )
+
+
+def _finish(node, llm, full, start):
+    """Assemble the streamed chunks into the response and record its latency and cache usage."""
+    if full is None:
+        raise RuntimeError(f"The model stream of node {node!r} ended without a response")
+    response = message_chunk_to_message(full)
+    record_latency(model_info(llm)[0], time.perf_counter() - start)
+    record_cache_usage(node, response)
+    return response
+
+
+def stream_model(node, llm, messages, consumers=()):
+    """
+    Stream a model call for a graph node to the consumers and return the full message.
+
+    Parameters:
+    - node: Name of the calling node (passed to the consumers and the cache report)
+    - llm: Chat model (or tool-bound runnable) to call
+    - messages: Messages of the graph state
+    - consumers: TokenConsumer instances that receive the text as it arrives
+
+    Returns:
+    - response: The assembled AIMessage, including any tool calls
+
+    Raises RuntimeError if the stream ends without any chunk. If the stream fails
+    or is cancelled, every consumer gets on_error instead of on_end.
+    """
+    for consumer in consumers:
+        consumer.on_start(node)
+
+    start = time.perf_counter()
+    full = None
+    try:
+        for chunk in llm.stream(build_messages(messages)):
+            # Adding chunks merges text, usage and the partial tool call JSON
+            full = chunk if full is None else full + chunk
+            text = message_text(chunk)
+            if text:
+                for consumer in consumers:
+                    consumer.on_token(text)
+        response = _finish(node, llm, full, start)
+    except BaseException as error:
+        # Consumers are always closed, e.g. a TTS consumer must not keep the half sentence queued
+        for consumer in consumers:
+            consumer.on_error(error)
+        raise
+
+    for consumer in consumers:
+        consumer.on_end(response)
+    return response
+
+
+async def astream_model(node, llm, messages, consumers=()):
+    """
+    Async version of stream_model: tokens arrive through llm.astream, so the
+    event loop serves other sessions while this one waits on the model.
+    """
+    for consumer in consumers:
+        consumer.on_start(node)
+
+    start = time.perf_counter()
+    full = None
+    try:
+        async for chunk in llm.astream(build_messages(messages)):
+            full = chunk if full is None else full + chunk
+            text = message_text(chunk)
+            if text:
+                for consumer in consumers:
+                    consumer.on_token(text)
+        response = _finish(node, llm, full, start)
+    except BaseException as error:
+        for consumer in consumers:
+            consumer.on_error(error)
+        raise
+
+    # on_end may block (TTSConsumer waits for playback), keep it off the event loop
+    for consumer in consumers:
+        await asyncio.to_thread(consumer.on_end, response)
+    return response
@@ -0,0 +1,431 @@
+import argparse
+import csv
+import os
+import sys
+import threading
+import time
+
+from group_commit import GroupCommitWriter
+from hobbies import normalize_hobby, normalize_hobbies
+from id_allocator import get_id_allocator
+from profile_cache import invalidate_profiles
+from profile_index import StudentProfile, normalize_name
+from profile_repository import ConnectionPool
+
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS students (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    name_key TEXT NOT NULL,
+    language_level TEXT NOT NULL,
+    registration_date TEXT NOT NULL,
+    hobbies TEXT NOT NULL DEFAULT ''
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS students_by_name ON students (name_key, registration_date);
+CREATE INDEX IF NOT EXISTS students_by_date ON students (registration_date);
+
+-- Interned, normalized hobbies and the inverted index hobby -> students
+CREATE TABLE IF NOT EXISTS hobby_dictionary (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE,
+    student_count INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS student_hobbies (
+    hobby_id INTEGER NOT NULL REFERENCES hobby_dictionary(id),
+    student_id TEXT NOT NULL,
+    PRIMARY KEY (hobby_id, student_id)
+) WITHOUT ROWID;
+
+CREATE INDEX IF NOT EXISTS student_hobbies_by_student ON student_hobbies (student_id, hobby_id);
+CREATE INDEX IF NOT EXISTS hobbies_by_popularity ON hobby_dictionary (student_count);
+
+-- Keep the per-hobby counters exact so popularity queries never scan the index
+CREATE TRIGGER IF NOT EXISTS student_hobbies_count_insert AFTER INSERT ON student_hobbies BEGIN
+    UPDATE hobby_dictionary SET student_count = student_count + 1 WHERE id = NEW.hobby_id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS student_hobbies_count_delete AFTER DELETE ON student_hobbies BEGIN
+    UPDATE hobby_dictionary SET student_count = student_count - 1 WHERE id = OLD.hobby_id;
+END;
+'''
+
+COLUMNS = "id, name, language_level, registration_date, hobbies"
+
+
+def _to_profile(row):
+    student_id, name, language_level, registration_date, hobbies = row
+    return StudentProfile(
+        id=student_id,
+        name=name,
+        language_level=language_level,
+        registration_date=registration_date,
+        hobbies=hobbies.split('|') if hobbies else [],
+    )
+
+
+def _to_row(profile):
+    return (
+        profile['id'],
+        profile['name'],
+        normalize_name(profile['name']),
+        profile['language_level'],
+        profile['registration_date'],
+        "|".join(profile['hobbies']),
+    )
+
+
+class StudentStore:
+    """
+    Single SQLite file holding every student profile.
+
+    Replaces the one-CSV-per-student layout: lookups by ID or name go through
+    indexes, and backups copy one file instead of walking a huge directory.
+    """
+
+    def __init__(self, db_path="./student_data", store_name="students.db", pool_size=4):
+        # Create directory if needed
+        os.makedirs(db_path, exist_ok=True)
+
+        self.db_path = db_path
+        self.store_path = os.path.join(db_path, store_name)
+        self.pool = ConnectionPool(self.store_path, size=pool_size)
+
+        with self.pool.connection() as conn:
+            has_hobby_index = conn.execute(
+                "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'student_hobbies'"
+            ).fetchone()
+            conn.executescript(SCHEMA)
+
+        # Stores created before the hobby index existed get it built once
+        if not has_hobby_index:
+            self.rebuild_hobby_index()
+
+        self.writer = GroupCommitWriter(self._write_durable, name=f"group-commit:{self.store_path}")
+
+    def add(self, profile, replace=False):
+        """
+        Insert one student profile and wait until it is durable.
+
+        Concurrent calls are grouped by the writer into one durable transaction.
+
+        Parameters:
+        - profile: StudentProfile with id, name, language_level, registration_date and hobbies
+        - replace: Overwrite the student if the ID already exists instead of keeping the stored one
+
+        Returns:
+        - inserted: 1 if the student was written, 0 if the ID already existed (and replace is False)
+        """
+        return self.writer.write((profile, replace))
+
+    def _write_durable(self, items):
+        profiles = [profile for profile, _ in items]
+        with self.pool.transaction(durable=True) as conn:
+            written = self._insert_profiles(conn, profiles, replace=[replace for _, replace in items])
+
+        invalidate_profiles(self.db_path, profiles)
+        return [int(w) for w in written]
+
+    def add_many(self, profiles, replace=False):
+        """
+        Insert a batch of student profiles in one transaction.
+
+        Parameters:
+        - profiles: Iterable of StudentProfile
+        - replace: Overwrite students whose ID already exists instead of keeping the stored one
+
+        Returns:
+        - inserted: Number of rows written
+        """
+        profiles = list(profiles)
+        with self.pool.transaction() as conn:
+            written = self._insert_profiles(conn, profiles, replace=replace)
+
+        # Cached lookups for these students (or for "latest") are stale now
+        invalidate_profiles(self.db_path, profiles)
+        return sum(written)
+
+    def _insert_profiles(self, conn, profiles, replace=False):
+        """
+        Write profiles and their hobby index entries, return which ones were written.
+
+        replace is one flag for every profile, or a list with one flag per profile.
+        """
+        if not isinstance(replace, list):
+            replace = [replace] * len(profiles)
+        replaced = [(p['id'],) for p, r in zip(profiles, replace) if r]
+        if replaced:
+            conn.executemany("DELETE FROM student_hobbies WHERE student_id = ?", replaced)
+
+        written = []
+        for profile, r in zip(profiles, replace):
+            verb = "INSERT OR REPLACE" if r else "INSERT OR IGNORE"
+            cursor = conn.execute(
+                f"{verb} INTO students (id, name, name_key, language_level, registration_date, hobbies) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                _to_row(profile)
+            )
+            written.append(cursor.rowcount > 0)
+
+        self._index_hobbies(conn, [p for p, w in zip(profiles, written) if w])
+        return written
+
+    def _index_hobbies(self, conn, profiles):
+        """Intern the normalized hobbies of profiles and link them to the students."""
+        links = [(hobby, p['id']) for p in profiles for hobby in normalize_hobbies(p['hobbies'])]
+        if not links:
+            return
+
+        names = {hobby for hobby, _ in links}
+        conn.executemany(
+            "INSERT OR IGNORE INTO hobby_dictionary (name) VALUES (?)",
+            [(name,) for name in names]
+        )
+        hobby_ids = {
+            name: conn.execute("SELECT id FROM hobby_dictionary WHERE name = ?", (name,)).fetchone()[0]
+            for name in names
+        }
+        conn.executemany(
+            "INSERT OR IGNORE INTO student_hobbies (hobby_id, student_id) VALUES (?, ?)",
+            [(hobby_ids[hobby], student_id) for hobby, student_id in links]
+        )
+
+    def rebuild_hobby_index(self, batch_size=10000):
+        """Rebuild the hobby dictionary and inverted index from the stored profiles."""
+        with self.pool.transaction() as conn:
+            conn.execute("DELETE FROM student_hobbies")
+            conn.execute("DELETE FROM hobby_dictionary")
+        batch = []
+        for profile in self.iter_profiles(batch_size=batch_size):
+            batch.append(profile)
+            if len(batch) >= batch_size:
+                with self.pool.transaction() as conn:
+                    self._index_hobbies(conn, batch)
+                batch = []
+        if batch:
+            with self.pool.transaction() as conn:
+                self._index_hobbies(conn, batch)
+
+    def students_by_hobby(self, hobby, limit=None):
+        """
+        Return the IDs of every student with this hobby (synonyms and spelling are normalized).
+        """
+        query = (
+            "SELECT student_id FROM student_hobbies "
+            "WHERE hobby_id = (SELECT id FROM hobby_dictionary WHERE name = ?)"
+        )
+        params = (normalize_hobby(hobby),)
+        if limit is not None:
+            query += " LIMIT ?"
+            params += (limit,)
+        with self.pool.connection() as conn:
+            return [row[0] for row in conn.execute(query, params)]
+
+    def hobby_counts(self, limit=20):
+        """Return the most popular hobbies as (hobby, number of students), most popular first."""
+        with self.pool.connection() as conn:
+            return conn.execute(
+                "SELECT name, student_count FROM hobby_dictionary "
+                "WHERE student_count > 0 ORDER BY student_count DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+
+    def group_by_hobby(self, student_ids, min_size=2):
+        """
+        Group a set of students (e.g. one class) by the hobbies they share.
+
+        Returns:
+        - groups: Dictionary hobby -> [student ids], only hobbies shared by at least min_size students
+        """
+        student_ids = list(student_ids)
+        groups = {}
+        with self.pool.connection() as conn:
+            # Chunked to stay below SQLite's host parameter limit
+            for start in range(0, len(student_ids), 500):
+                chunk = student_ids[start:start + 500]
+                rows = conn.execute(
+                    "SELECT d.name, sh.student_id FROM student_hobbies sh "
+                    "JOIN hobby_dictionary d ON d.id = sh.hobby_id "
+                    f"WHERE sh.student_id IN ({','.join('?' * len(chunk))})",
+                    chunk
+                )
+                for name, student_id in rows:
+                    groups.setdefault(name, []).append(student_id)
+        return {name: ids for name, ids in groups.items() if len(ids) >= min_size}
+
+    def get(self, student_id):
+        with self.pool.connection() as conn:
+            row = conn.execute(f"SELECT {COLUMNS} FROM students WHERE id = ?", (student_id,)).fetchone()
+        return _to_profile(row) if row else None
+
+    def find_by_name(self, name):
+        """Return every student with this name, most recently registered first."""
+        with self.pool.connection() as conn:
+            rows = conn.execute(
+                f"SELECT {COLUMNS} FROM students WHERE name_key = ? ORDER BY registration_date DESC",
+                (normalize_name(name),)
+            ).fetchall()
+        return [_to_profile(row) for row in rows]
+
+    def latest(self):
+        with self.pool.connection() as conn:
+            row = conn.execute(
+                f"SELECT {COLUMNS} FROM students ORDER BY registration_date DESC LIMIT 1"
+            ).fetchone()
+        return _to_profile(row) if row else None
+
+    def iter_profiles(self, batch_size=1000):
+        """Yield every stored profile in ID order, fetching batch_size rows at a time."""
+        last_id = ""
+        while True:
+            with self.pool.connection() as conn:
+                rows = conn.execute(
+                    f"SELECT {COLUMNS} FROM students WHERE id > ? ORDER BY id LIMIT ?",
+                    (last_id, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for row in rows:
+                yield _to_profile(row)
+            last_id = rows[-1][0]
+
+    def __len__(self):
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT COUNT(*) FROM students").fetchone()[0]
+
+    def close(self):
+        self.pool.close()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def get_student_store(db_path="./student_data"):
+    """
+    Return the shared StudentStore for db_path, creating it on first use.
+    """
+    key = os.path.abspath(db_path)
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = StudentStore(db_path)
+            _stores[key] = store
+    return store
+
+
+def iter_csv_files(src_dir):
+    """
+    Yield (file path, [StudentProfile, ...]) for every CSV file in src_dir.
+
+    os.scandir streams the directory, so memory stays flat however many files there are.
+    """
+    with os.scandir(src_dir) as entries:
+        for entry in entries:
+            if not entry.name.endswith('.csv') or not entry.is_file():
+                continue
+            try:
+                with open(entry.path, 'r', newline='') as csvfile:
+                    profiles = [
+                        StudentProfile(
+                            id=row['id'],
+                            name=row['name'],
+                            language_level=row['language_level'],
+                            registration_date=row['registration_date'],
+                            hobbies=row['hobbies'].split('|') if row['hobbies'] else [],
+                        )
+                        for row in csv.DictReader(csvfile)
+                    ]
+            except (OSError, KeyError, csv.Error) as e:
+                print(f"Error reading file {entry.name}: {e}")
+                continue
+            yield entry.path, profiles
+
+
+def migrate_csv_directory(src_dir, store, batch_size=1000, remove_files=False, report_every=10000):
+    """
+    Move the one-CSV-per-student files of src_dir into a StudentStore.
+
+    Parameters:
+    - src_dir: Directory holding dateofcreation_name_ID.csv files
+    - store: StudentStore to write into
+    - batch_size: Number of students written per transaction
+    - remove_files: Delete each CSV file once its batch is committed
+    - report_every: Print progress after this many students
+
+    Returns:
+    - stats: Dictionary with students, inserted, seconds and students_per_second
+    """
+    # The allocator learns about migrated IDs, so they stay reserved once the CSVs are removed
+    allocator = get_id_allocator(store.db_path)
+
+    start = time.perf_counter()
+    students = 0
+    inserted = 0
+    batch = []
+    batch_files = []
+    next_report = report_every
+
+    def flush():
+        nonlocal inserted
+        inserted += store.add_many(batch)
+        allocator.reserve_many(p['id'] for p in batch)
+        if remove_files:
+            for file_path in batch_files:
+                os.remove(file_path)
+        batch.clear()
+        batch_files.clear()
+
+    for file_path, profiles in iter_csv_files(src_dir):
+        batch.extend(profiles)
+        batch_files.append(file_path)
+        students += len(profiles)
+
+        if len(batch) >= batch_size:
+            flush()
+        if students >= next_report:
+            elapsed = time.perf_counter() - start
+            print(f"Migrated {students} students ({students / elapsed:.0f} students/s)")
+            next_report += report_every
+
+    if batch:
+        flush()
+
+    seconds = time.perf_counter() - start
+    return {
+        "students": students,
+        "inserted": inserted,
+        "seconds": seconds,
+        "students_per_second": students / seconds if seconds else 0.0,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Manage the consolidated student store")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    migrate = subcommands.add_parser("migrate", help="Move one-CSV-per-student files into the store")
+    migrate.add_argument("src_dir", help="Directory with dateofcreation_name_ID.csv files")
+    migrate.add_argument("--store-dir", help="Directory of the store (default: src_dir)")
+    migrate.add_argument("--batch-size", type=int, default=1000)
+    migrate.add_argument("--remove", action="store_true", help="Delete CSV files after they are migrated")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "migrate":
+        if not os.path.isdir(args.src_dir):
+            print(f"Directory not found: {args.src_dir}")
+            return 1
+        store = get_student_store(args.store_dir or args.src_dir)
+        stats = migrate_csv_directory(args.src_dir, store, batch_size=args.batch_size, remove_files=args.remove)
+        print(
+            f"Migrated {stats['students']} students ({stats['inserted']} new) into {store.store_path} "
+            f"in {stats['seconds']:.2f}s ({stats['students_per_second']:.0f} students/s)"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
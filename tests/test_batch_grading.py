@@ -0,0 +1,47 @@
+import threading
+
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage, HumanMessage
+
+from batch_grading import GradingQueue, LocalBatchBackend
+from system_prompts import (
+    conversation_class_agent_base_prompt,
+    conversation_class_agent_sys_prompt_V1,
+    conversation_class_agent_sys_prompt_V1_batch_grading,
+)
+
+
+class BlockingModel(FakeListChatModel):
+    """Fake model whose batch waits until the test releases it."""
+    release: threading.Event
+
+    def batch(self, inputs, *args, **kwargs):
+        self.release.wait(5)
+        return super().batch(inputs, *args, **kwargs)
+
+
+def test_conversation_prompts_share_the_lesson():
+    for prompt in (conversation_class_agent_sys_prompt_V1, conversation_class_agent_sys_prompt_V1_batch_grading):
+        assert prompt.startswith(conversation_class_agent_base_prompt)
+    assert "finish_lesson" in conversation_class_agent_sys_prompt_V1_batch_grading
+    assert "finish_lesson" not in conversation_class_agent_sys_prompt_V1
+
+
+def test_local_backend_reports_running_batches_as_none(tmp_path):
+    release = threading.Event()
+    backend = LocalBatchBackend(BlockingModel(responses=["1. der -> die"], release=release))
+    queue = GradingQueue(str(tmp_path))
+    queue.enqueue("A1B2C", [AIMessage(content="Wie geht's?"), HumanMessage(content="Ich bin gut.")])
+
+    queue.submit_pending(backend)
+    batch_id = next(iter(backend._batches))
+    assert backend.results(batch_id) is None
+    assert queue.collect(backend) == 0
+    assert queue.count("submitted") == 1
+
+    release.set()
+    backend._batches[batch_id].result(5)
+    assert queue.collect(backend) == 1
+    assert queue.gradings_for("A1B2C")[0]["grading"] == "1. der -> die"
+    # An unknown batch has ended without results
+    assert backend.results("local_unknown") == {}
@@ -0,0 +1,103 @@
+import uuid
+
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage
+from langgraph.graph import END, START
+
+from checkpointer import BoundedSqliteSaver, CompressedSerializer
+from message_log import MessageLogGraph, MessageLogState
+
+
+class CountingSerializer(CompressedSerializer):
+    def __init__(self):
+        super().__init__()
+        self.written = 0
+
+    def dumps_typed(self, obj):
+        type_, data = super().dumps_typed(obj)
+        self.written += len(data)
+        return type_, data
+
+
+class RecordingSaver(BoundedSqliteSaver):
+    """Records (bytes serialized, chain depth) of every put."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, serde=CountingSerializer(), **kwargs)
+        self.puts = []
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        before = self.serde.written
+        result = super().put(config, checkpoint, metadata, new_versions)
+        with self.cursor(transaction=False) as cur:
+            depth = cur.execute(
+                "SELECT depth FROM checkpoint_chain WHERE checkpoint_id = ?", (checkpoint["id"],)
+            ).fetchone()[0]
+        self.puts.append((self.serde.written - before, depth))
+        return result
+
+
+def build_graph(checkpointer):
+    def answer(state: MessageLogState):
+        # Random text, so compression cannot hide a growing history
+        return {"messages": [AIMessage(content=uuid.uuid4().hex * 8)]}
+
+    builder = MessageLogGraph(MessageLogState)
+    builder.add_node("answer", answer)
+    builder.add_edge(START, "answer")
+    builder.add_edge("answer", END)
+    return builder.compile(checkpointer=checkpointer)
+
+
+def checkpoint_rows(saver, thread_id):
+    with saver.cursor(transaction=False) as cur:
+        return cur.execute("SELECT COUNT(*) FROM checkpoints WHERE thread_id = ?", (thread_id,)).fetchone()[0]
+
+
+def test_turns_write_deltas_and_trim_without_rewriting(tmp_path):
+    keep_last, snapshot_every, turns = 10, 20, 60
+    saver = RecordingSaver(str(tmp_path / "checkpoints.db"), keep_last=keep_last, snapshot_every=snapshot_every)
+    graph = build_graph(saver)
+    config = {"configurable": {"thread_id": "t1"}}
+
+    for turn in range(turns):
+        graph.invoke({"messages": [HumanMessage(content=uuid.uuid4().hex * 8)]}, config)
+        rows = checkpoint_rows(saver, "t1")
+        assert rows <= keep_last + snapshot_every - 1
+        if len(saver.puts) >= keep_last:
+            assert rows >= keep_last
+
+    # Every put serializes exactly one checkpoint: deltas stay small however long the history
+    # gets, and only every snapshot_every-th put writes the full history
+    deltas = [size for size, depth in saver.puts if depth]
+    snapshots = [size for size, depth in saver.puts if not depth]
+    assert len(snapshots) <= len(saver.puts) // snapshot_every + 1
+    history_bytes = turns * 2 * 256
+    assert max(deltas) < history_bytes / 10
+    assert max(deltas[-10:]) <= 1.5 * max(deltas[:10])
+
+    # Every kept checkpoint rebuilds its full message list
+    state = graph.get_state(config)
+    assert len(state.values["messages"]) == 2 * turns
+    for snapshot in graph.get_state_history(config):
+        messages = snapshot.values.get("messages", [])
+        assert list(messages) == list(state.values["messages"])[:len(messages)]
+
+
+def test_round_trip_after_restart_and_removal(tmp_path):
+    path = str(tmp_path / "checkpoints.db")
+    graph = build_graph(BoundedSqliteSaver(path, keep_last=5, snapshot_every=3))
+    config = {"configurable": {"thread_id": "t2"}}
+    for _ in range(7):
+        graph.invoke({"messages": [HumanMessage(content="Hallo")]}, config)
+    expected = list(graph.get_state(config).values["messages"])
+
+    # A new saver on the same file rebuilds the thread from the delta chain
+    restarted = build_graph(BoundedSqliteSaver(path, keep_last=5, snapshot_every=3))
+    assert list(restarted.get_state(config).values["messages"]) == expected
+
+    # Removing messages starts a new chain, and the thread continues from it
+    restarted.update_state(config, {"messages": [RemoveMessage(id=m.id) for m in expected[:4]]})
+    restarted.invoke({"messages": [HumanMessage(content="Noch einmal")]}, config)
+    messages = list(restarted.get_state(config).values["messages"])
+    assert messages[:len(expected) - 4] == expected[4:]
+    assert len(messages) == len(expected) - 4 + 2
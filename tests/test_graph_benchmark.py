@@ -0,0 +1,31 @@
+import pytest
+
+from graph_benchmark import bench_checkpoints, bench_concurrency, bench_reducer, bench_sessions
+
+
+def test_delta_checkpoints_are_smaller_than_full_ones(tmp_path):
+    results = bench_checkpoints(str(tmp_path), turns=30)
+    assert results["delta"]["bytes_per_turn"] < results["full"]["bytes_per_turn"] / 2
+    assert results["delta"]["last_turn_bytes"] < results["full"]["last_turn_bytes"] / 4
+
+
+def test_sessions_stay_bounded_and_evicted_students_continue(tmp_path):
+    results = bench_sessions(str(tmp_path), students=120, max_active=10, revisits=20)
+    assert results["active"] <= 10
+    assert results["cached_heads"] <= 10
+    assert results["revisits_correct"] == results["revisits"] == 20
+
+
+@pytest.mark.benchmark
+def test_reducer_cost_does_not_grow_with_the_history():
+    results = bench_reducer(sizes=(100, 5000), steps=50)
+    assert results[5000]["append_messages_us"] < 5 * results[100]["append_messages_us"] + 50
+    assert results[5000]["append_messages_us"] < results[5000]["add_messages_us"] / 10
+
+
+@pytest.mark.benchmark
+def test_concurrent_async_turns_against_the_mock_server():
+    results = bench_concurrency(count=20, latency_ms=200)
+    assert results["answered"] == results["model_requests"] == 20
+    # The turns wait on the model together, not one after the other
+    assert results["seconds"] < 20 * 0.2 / 2
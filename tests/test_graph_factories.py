@@ -0,0 +1,12 @@
+import pytest
+
+from graph_factories import graph_specs
+from startup_benchmark import measure
+
+
+@pytest.mark.parametrize("graph_id", sorted(graph_specs()))
+def test_building_a_graph_has_no_side_effects(graph_id):
+    # The langgraph server imports every module and calls its factory at startup
+    run, = measure(graph_id, repeat=1)
+    assert run["opened"] == []
+    assert run["heavy_modules"] == []
@@ -0,0 +1,45 @@
+from langchain_core.language_models.fake_chat_models import FakeListChatModel
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from history import make_compaction_node
+
+
+def conversation(turns):
+    messages = [SystemMessage(content="Du bist ein Deutschlehrer.", id="system")]
+    for i in range(turns):
+        messages += [HumanMessage(content=f"Frage {i}", id=f"h{i}"), AIMessage(content=f"Antwort {i}", id=f"a{i}")]
+    return messages
+
+
+def run_turns(node, turns):
+    """Add one turn at a time and apply the node like the graph does, return the state."""
+    state = {"messages": [SystemMessage(content="Du bist ein Deutschlehrer.", id="system")], "summary": ""}
+    for i in range(turns):
+        state["messages"] = state["messages"] + [HumanMessage(content=f"Frage {i}", id=f"h{i}")]
+        update = node.invoke(state)
+        if update:
+            removed = {m.id for m in update["messages"]}
+            state = {"messages": [m for m in state["messages"] if m.id not in removed], "summary": update["summary"]}
+        state["messages"] = state["messages"] + [AIMessage(content=f"Antwort {i}", id=f"a{i}")]
+    return state
+
+
+def test_compaction_folds_several_turns_per_summary_call():
+    llm = FakeListChatModel(responses=["Zusammenfassung"] * 100)
+    node = make_compaction_node(llm=llm, keep_turns=6, token_budget=100000, compact_every=4)
+    state = run_turns(node, 30)
+
+    # 30 turns: compactions at turns 10, 14, ... each fold 4 turns, not one per turn from turn 7 on
+    assert llm.i == 6
+    turns = sum(isinstance(m, HumanMessage) for m in state["messages"])
+    assert 6 <= turns < 6 + 4
+    assert state["summary"] == "Zusammenfassung"
+
+
+def test_token_budget_compacts_below_the_budget():
+    llm = FakeListChatModel(responses=["Zusammenfassung"] * 100)
+    node = make_compaction_node(llm=llm, keep_turns=6, token_budget=1, compact_every=4)
+    update = node.invoke({"messages": conversation(3), "summary": ""})
+    # Over budget: everything but the newest turn is folded
+    assert [m.id for m in update["messages"]] == ["h0", "a0", "h1", "a1"]
+    assert llm.i == 1
@@ -0,0 +1,29 @@
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from history import with_summary
+from message_builder import CACHE_CONTROL, build_messages
+
+
+def breakpoints(messages):
+    return [
+        i for i, m in enumerate(messages)
+        if isinstance(m.content, list) and any(b.get("cache_control") == CACHE_CONTROL for b in m.content)
+    ]
+
+
+def test_single_breakpoint_on_the_static_prompt():
+    state = [SystemMessage(content="static prompt"), HumanMessage(content="Hallo"), AIMessage(content="Hi")]
+    messages = with_summary(state, "The student is called Anna.")
+    built = build_messages(messages)
+
+    assert breakpoints(built) == [0]
+    # The running summary follows the breakpoint unmarked
+    assert built[1].content == "Summary of the earlier conversation:\nThe student is called Anna."
+    # The graph state is not modified
+    assert state[0].content == "static prompt"
+
+
+def test_breakpoint_on_the_last_leading_system_message():
+    messages = [SystemMessage(content="a"), SystemMessage(content="b"), HumanMessage(content="x"), SystemMessage(content="late")]
+    assert breakpoints(build_messages(messages)) == [1]
+    assert breakpoints(build_messages([HumanMessage(content="x")])) == []
@@ -0,0 +1,95 @@
+import asyncio
+
+from langchain_core.messages import AIMessage, HumanMessage, RemoveMessage
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import END, START
+
+from message_log import (
+    LogSnapshot, MessageLog, MessageLogChannel, MessageLogGraph, MessageLogState, append_messages,
+)
+
+
+def build_graph(checkpointer=None):
+    def answer(state: MessageLogState):
+        return {"messages": [AIMessage(content=f"Antwort {len(state['messages'])}")]}
+
+    builder = MessageLogGraph(MessageLogState)
+    builder.add_node("answer", answer)
+    builder.add_edge(START, "answer")
+    builder.add_edge("answer", END)
+    return builder.compile(checkpointer=checkpointer)
+
+
+def test_reducer_appends_without_touching_older_views():
+    log = append_messages([], [HumanMessage(content="Hallo")])
+    longer = append_messages(log, [AIMessage(content="Hi")])
+
+    assert len(log) == 1 and len(longer) == 2
+    assert longer._backing is log._backing
+    assert longer.extends(log)
+
+    # A removal falls back to the full merge and starts a new history
+    removed = append_messages(longer, [RemoveMessage(id=log[0].id)])
+    assert [m.content for m in removed] == ["Hi"]
+    assert [m.content for m in longer] == ["Hallo", "Hi"]
+
+
+def test_channel_checkpoint_holds_only_its_messages():
+    channel = MessageLogChannel()
+    channel.update([[HumanMessage(content="Hallo")]])
+    first = channel.checkpoint()
+    channel.update([[AIMessage(content="Hi")]])
+    second = channel.checkpoint()
+
+    # Later appends do not show up in older checkpoints, which still know their history
+    assert isinstance(first, list) and [m.content for m in first] == ["Hallo"]
+    assert [m.content for m in second] == ["Hallo", "Hi"]
+    assert isinstance(second, LogSnapshot) and second.log.extends(first.log)
+
+    restored = MessageLogChannel().from_checkpoint(first)
+    assert isinstance(restored.get(), MessageLog)
+    assert [m.content for m in restored.get()] == ["Hallo"]
+
+    # Checkpoints of MessagesState graphs are plain lists
+    legacy = MessageLogChannel().from_checkpoint([HumanMessage(content="Alt")])
+    assert [m.content for m in legacy.get()] == ["Alt"]
+
+
+def test_graph_outputs_are_plain_lists():
+    graph = build_graph(InMemorySaver())
+    config = {"configurable": {"thread_id": "t1"}}
+
+    output = graph.invoke({"messages": [HumanMessage(content="Hallo")]}, config)
+    assert type(output["messages"]) is list
+    output = graph.invoke({"messages": [HumanMessage(content="Noch einmal")]}, config)
+    assert [m.content for m in output["messages"]] == ["Hallo", "Antwort 1", "Noch einmal", "Antwort 3"]
+
+    assert type(graph.get_state(config).values["messages"]) is list
+    for chunk in graph.stream({"messages": [HumanMessage(content="Und?")]}, config, stream_mode="values"):
+        assert type(chunk["messages"]) is list
+
+    async def run():
+        output = await graph.ainvoke({"messages": [HumanMessage(content="Tschüss")]}, config)
+        state = await graph.aget_state(config)
+        return output, state
+
+    output, state = asyncio.run(run())
+    assert type(output["messages"]) is list
+    assert output["messages"] == state.values["messages"]
+    assert len(output["messages"]) == 8
+
+
+def test_generic_checkpointer_stores_each_step():
+    saver = InMemorySaver()
+    graph = build_graph(saver)
+    config = {"configurable": {"thread_id": "t1"}}
+    graph.invoke({"messages": [HumanMessage(content="Hallo")]}, config)
+    graph.invoke({"messages": [HumanMessage(content="Noch einmal")]}, config)
+
+    # Every checkpoint is read back with the messages of its step
+    sizes = [len(state.values.get("messages", [])) for state in graph.get_state_history(config)]
+    assert sizes == [4, 3, 2, 2, 1, 0]
+    # Each stored blob holds the messages of its step, not the whole shared history
+    stored = [saver.serde.loads_typed(blob) for (_, _, channel, _), blob in saver.blobs.items() if channel == "messages"]
+    assert all(type(messages) is list for messages in stored)
+    assert sorted(len(messages) for messages in stored) == [1, 2, 3, 4]
@@ -0,0 +1,25 @@
+from langchain_core.tools import tool
+
+from model_router import route_model
+
+
+@tool
+def first_tool(name: str) -> str:
+    """Return the name."""
+    return name
+
+
+@tool
+def second_tool(level: str) -> str:
+    """Return the level."""
+    return level
+
+
+def test_bindings_are_per_tool_set(monkeypatch):
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test")
+    first = route_model("gathering_agent", tools=[first_tool])
+    second = route_model("gathering_agent", tools=[second_tool])
+
+    assert first is route_model("gathering_agent", tools=[first_tool])
+    assert second is not first
+    assert [t["name"] for t in second.kwargs["tools"]] == ["second_tool"]
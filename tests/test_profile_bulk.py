@@ -0,0 +1,58 @@
+import json
+
+from levels import parse_level
+from greetings import level_category
+from profile_bulk import export_profiles, import_profiles, validate_batch
+from student_store import get_student_store
+
+
+def test_parse_level_is_shared_with_the_greetings():
+    for level, category in [("Beginner A1", "beginner"), ("B2", "intermediate"), (" advanced ", "advanced"),
+                            ("intermediate (B1)", "intermediate"), ("c1", "advanced")]:
+        assert parse_level(level) == category
+        assert level_category(level) == category
+    assert parse_level("fluent") is None
+    assert level_category("fluent") == "beginner"
+
+
+def test_validate_batch_rejects_bad_records_without_failing():
+    records = [
+        {"id": 12345, "name": "Anna", "language_level": "Beginner A1", "hobbies": ["Chess", "Tennis", "Music"]},
+        {"name": "Ben", "language_level": "B2", "hobbies": "chess|  |tennis|films"},
+        {"name": "Cleo", "language_level": "C1", "hobbies": ["Chess", 3, "Music"]},
+        {"name": "Dan", "language_level": "A2", "hobbies": ["Chess", {"x": 1}, "Music"]},
+        {"name": "Eva", "language_level": "fluent", "hobbies": ["a", "b", "c"]},
+        {"id": ["X"], "name": "Finn", "language_level": "A1", "hobbies": ["a", "b", "c"]},
+        {"name": "", "language_level": "A1", "hobbies": ["a", "b", "c"]},
+        {"name": "Gus", "language_level": "A1", "hobbies": 7},
+        "not json",
+    ]
+    valid, errors = validate_batch(records)
+
+    assert [(p['id'], p['name'], p['language_level']) for p in valid] == [
+        ("12345", "Anna", "beginner"), (None, "Ben", "intermediate"), (None, "Cleo", "advanced"),
+    ]
+    assert valid[1]['hobbies'] == ["chess", "tennis", "films"]
+    assert valid[2]['hobbies'] == ["Chess", "3", "Music"]
+    assert len(errors) == 6
+    assert errors[0] == ("not json", "not a record")
+
+
+def test_import_export_round_trip(tmp_path):
+    source = tmp_path / "students.jsonl"
+    with open(source, "w") as f:
+        f.write(json.dumps({"id": 1, "name": "Anna", "language_level": "Beginner A1", "hobbies": ["a", "b", "c"]}) + "\n")
+        f.write("{broken\n")
+        f.write(json.dumps({"name": "Ben", "language_level": "B1", "hobbies": "x|y|z"}) + "\n")
+    db_path = str(tmp_path / "store")
+
+    stats = import_profiles(str(source), db_path=db_path)
+    assert (stats["read"], stats["imported"], stats["rejected"]) == (3, 2, 1)
+    store = get_student_store(db_path)
+    assert store.get("1")['language_level'] == "beginner"
+    assert store.find_by_name("Ben")[0]['hobbies'] == ["x", "y", "z"]
+
+    export = tmp_path / "export.csv"
+    assert export_profiles(str(export), db_path=db_path)["exported"] == 2
+    stats = import_profiles(str(export), db_path=str(tmp_path / "copy"))
+    assert (stats["imported"], stats["rejected"]) == (2, 0)
@@ -0,0 +1,53 @@
+import csv
+import os
+
+from profile_index import ProfileIndex
+
+FIELDS = ['id', 'name', 'language_level', 'registration_date', 'hobbies']
+
+
+def write_profile(directory, file_name, **row):
+    path = os.path.join(directory, file_name)
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerow({'hobbies': '', 'language_level': 'Beginner A1', **row})
+    return path
+
+
+def test_lookup_by_id_name_and_latest(tmp_path):
+    write_profile(tmp_path, '20250101_Anna_A1.csv', id='A1', name='Anna', registration_date='2025-01-01', hobbies='Chess|Tennis')
+    write_profile(tmp_path, '20250201_Ben_B2.csv', id='B2', name='Ben', registration_date='2025-02-01')
+    index = ProfileIndex(str(tmp_path))
+
+    assert index.get('A1')['hobbies'] == ['Chess', 'Tennis']
+    assert [p['id'] for p in index.find_by_name('  anna ')] == ['A1']
+    assert index.latest()['id'] == 'B2'
+    assert index.get('missing') is None
+    assert len(index) == 2
+
+
+def test_duplicate_id_across_files(tmp_path):
+    old = write_profile(tmp_path, '20250101_Anna_X1.csv', id='X1', name='Anna', registration_date='2025-01-01')
+    new = write_profile(tmp_path, '20250301_Anna_X1.csv', id='X1', name='Anna', registration_date='2025-03-01',
+                        language_level='Intermediate B1')
+    index = ProfileIndex(str(tmp_path))
+
+    assert index.get('X1')['language_level'] == 'Intermediate B1'
+    assert len(index.find_by_name('Anna')) == 1
+
+    # Removing one of the files keeps the student that the other one still holds
+    os.remove(new)
+    assert index.get('X1')['registration_date'] == '2025-01-01'
+    assert index.find_by_name('anna')[0]['id'] == 'X1'
+    assert index.latest()['id'] == 'X1'
+
+    # Rewriting the remaining file is picked up, removing it drops the student without errors
+    write_profile(tmp_path, os.path.basename(old), id='X1', name='Anna', registration_date='2025-01-01',
+                  language_level='Advanced C1')
+    os.utime(old, ns=(1, 1))
+    assert index.get('X1')['language_level'] == 'Advanced C1'
+    os.remove(old)
+    assert index.get('X1') is None
+    assert index.find_by_name('Anna') == []
+    assert index.latest() is None
@@ -0,0 +1,36 @@
+from langchain_core.language_models.fake_chat_models import GenericFakeChatModel
+from langchain_core.messages import AIMessage, HumanMessage, ToolMessage
+
+from response_cache import ResponseCache, cached_invoke
+
+
+class FakeModel(GenericFakeChatModel):
+    temperature: float = 0
+    model: str = "fake"
+
+
+def model(*answers):
+    return FakeModel(messages=iter([AIMessage(content=a) for a in answers]))
+
+
+def test_slots_only_replace_whole_words():
+    cache = ResponseCache(disk_path=None)
+    first = cached_invoke(model("Also, student Al is saved as Al. Alles gut!"), "Farewell Al", slots={"name": "Al"}, cache=cache)
+    assert first.content == "Also, student Al is saved as Al. Alles gut!"
+
+    # Same prompt for another student: served from the cache, only the whole-word slot changes
+    second = cached_invoke(model("never called"), "Farewell Bo", slots={"name": "Bo"}, cache=cache)
+    assert second.response_metadata["local_cache_hit"]
+    assert second.content == "Also, student Bo is saved as Bo. Alles gut!"
+
+
+def test_tool_call_ids_do_not_change_the_key():
+    def turn(tool_call_id):
+        return [
+            HumanMessage(content="Save me"),
+            AIMessage(content="", tool_calls=[{"name": "save", "args": {"name": "Anna"}, "id": tool_call_id}]),
+            ToolMessage(content="saved", tool_call_id=tool_call_id),
+        ]
+
+    assert ResponseCache.make_key("m", turn("toolu_1")) == ResponseCache.make_key("m", turn("toolu_2"))
+    assert ResponseCache.make_key("m", turn("toolu_1")) != ResponseCache.make_key("m", turn("toolu_1")[:1])
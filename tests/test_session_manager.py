@@ -0,0 +1,115 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.runnables import RunnableLambda
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import END, START
+
+from checkpointer import BoundedSqliteSaver
+from message_log import MessageLogGraph, MessageLogState
+from session_manager import SessionManager, _acquire
+
+
+class TurnCounter:
+    """Counts the turns running at once."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.running = 0
+        self.most = 0
+
+    def enter(self):
+        with self.lock:
+            self.running += 1
+            self.most = max(self.most, self.running)
+
+    def leave(self):
+        with self.lock:
+            self.running -= 1
+
+
+def build_graph(counter):
+    def answer(state: MessageLogState):
+        counter.enter()
+        time.sleep(0.02)
+        counter.leave()
+        return {"messages": [AIMessage(content="Hallo")]}
+
+    async def aanswer(state: MessageLogState):
+        counter.enter()
+        await asyncio.sleep(0.02)
+        counter.leave()
+        return {"messages": [AIMessage(content="Hallo")]}
+
+    builder = MessageLogGraph(MessageLogState)
+    builder.add_node("answer", RunnableLambda(answer, afunc=aanswer))
+    builder.add_edge(START, "answer")
+    builder.add_edge("answer", END)
+    return builder.compile()
+
+
+def test_guest_session_is_resolved_once():
+    sessions = SessionManager(build_graph(TurnCounter()), "test", checkpointer=InMemorySaver())
+    session = sessions.open(None)
+    assert not sessions.get_state(session.student_id).values
+    sessions.invoke(session.student_id, {"messages": [HumanMessage(content="Hi")]})
+    assert len(sessions.get_state(session.student_id).values["messages"]) == 2
+    assert sessions.active_count() == 1
+
+
+def test_sync_and_async_turns_of_a_student_never_overlap():
+    counter = TurnCounter()
+    sessions = SessionManager(build_graph(counter), "test", checkpointer=InMemorySaver())
+
+    def sync_turns():
+        for _ in range(3):
+            sessions.invoke("s1", {"messages": [HumanMessage(content="Hi")]})
+
+    async def async_turns():
+        await asyncio.gather(*(sessions.ainvoke("s1", {"messages": [HumanMessage(content="Hi")]}) for _ in range(3)))
+
+    worker = threading.Thread(target=sync_turns)
+    worker.start()
+    asyncio.run(async_turns())
+    worker.join()
+
+    assert counter.most == 1
+    assert len(sessions.get_state("s1").values["messages"]) == 12
+    assert sessions.report()["busy"] == 0
+
+
+def test_cancelled_wait_does_not_leak_the_lock():
+    lock = threading.Lock()
+    lock.acquire()
+
+    async def cancel_waiter():
+        waiter = asyncio.ensure_future(_acquire(lock))
+        await asyncio.sleep(0.02)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        lock.release()
+        # The executor thread takes the lock and hands it back
+        await asyncio.sleep(0.05)
+
+    asyncio.run(cancel_waiter())
+    assert lock.acquire(timeout=1)
+
+
+def test_more_async_waiters_than_executor_threads_do_not_deadlock(tmp_path):
+    # BoundedSqliteSaver's async methods run on the default executor, the waiters must not fill it
+    counter = TurnCounter()
+    saver = BoundedSqliteSaver(str(tmp_path / "checkpoints.db"))
+    sessions = SessionManager(build_graph(counter), "test", checkpointer=saver)
+
+    async def turns():
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=2))
+        await asyncio.wait_for(asyncio.gather(*(
+            sessions.ainvoke("s1", {"messages": [HumanMessage(content="Hi")]}) for _ in range(6)
+        )), timeout=10)
+
+    asyncio.run(turns())
+    assert counter.most == 1
+    assert len(sessions.get_state("s1").values["messages"]) == 12
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+from langchain_core.messages import AIMessageChunk, HumanMessage
+
+from streaming import TokenConsumer, TTSConsumer, astream_model, stream_model
+
+
+class FakeStreamingModel:
+    """Streams the given chunks, then raises error if one is given."""
+
+    def __init__(self, chunks, error=None):
+        self.chunks = chunks
+        self.error = error
+
+    def stream(self, messages):
+        yield from self.chunks
+        if self.error:
+            raise self.error
+
+    async def astream(self, messages):
+        for chunk in self.chunks:
+            yield chunk
+        if self.error:
+            raise self.error
+
+
+class RecordingConsumer(TokenConsumer):
+    def __init__(self):
+        self.events = []
+
+    def on_start(self, node):
+        self.events.append("start")
+
+    def on_token(self, text):
+        self.events.append(text)
+
+    def on_end(self, message):
+        self.events.append(("end", message.content))
+
+    def on_error(self, error):
+        self.events.append(("error", type(error).__name__))
+
+
+class SilentTTS:
+    def __init__(self):
+        self.spoken = []
+
+    def speak(self, sentence):
+        self.spoken.append(sentence)
+
+
+MESSAGES = [HumanMessage(content="Hallo")]
+
+
+def test_stream_assembles_the_response():
+    consumer = RecordingConsumer()
+    llm = FakeStreamingModel([AIMessageChunk(content="Hallo "), AIMessageChunk(content="Anna!")])
+    response = stream_model("node", llm, MESSAGES, [consumer])
+    assert response.content == "Hallo Anna!"
+    assert consumer.events == ["start", "Hallo ", "Anna!", ("end", "Hallo Anna!")]
+
+
+def test_empty_stream_raises_and_closes_the_consumers():
+    consumer = RecordingConsumer()
+    with pytest.raises(RuntimeError, match="without a response"):
+        stream_model("node", FakeStreamingModel([]), MESSAGES, [consumer])
+    assert consumer.events == ["start", ("error", "RuntimeError")]
+
+    consumer = RecordingConsumer()
+    with pytest.raises(RuntimeError, match="without a response"):
+        asyncio.run(astream_model("node", FakeStreamingModel([]), MESSAGES, [consumer]))
+    assert consumer.events == ["start", ("error", "RuntimeError")]
+
+
+def test_failed_stream_leaves_no_sentence_queued():
+    tts = TTSConsumer(SilentTTS())
+    llm = FakeStreamingModel([AIMessageChunk(content="Ein halber Satz")], error=ConnectionError("lost"))
+    with pytest.raises(ConnectionError):
+        asyncio.run(astream_model("node", llm, MESSAGES, [tts]))
+
+    # The next turn speaks only its own text
+    stream_model("node", FakeStreamingModel([AIMessageChunk(content="Neu.")]), MESSAGES, [tts])
+    assert tts.tts.spoken == ["Neu."]
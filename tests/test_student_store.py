@@ -0,0 +1,54 @@
+import importlib
+import time
+
+from profile_index import StudentProfile
+from student_store import StudentStore
+
+
+def profile(student_id, name='Anna', level='Beginner A1', date='2025-01-01 10:00:00', hobbies=('Chess',)):
+    return StudentProfile(id=student_id, name=name, language_level=level, registration_date=date, hobbies=list(hobbies))
+
+
+def test_add_get_and_lookups(tmp_path):
+    store = StudentStore(str(tmp_path))
+    assert store.add(profile('A1', hobbies=['Chess', 'Tennis'])) == 1
+    assert store.add_many([profile('B2', name='Ben', date='2025-02-01 10:00:00', hobbies=['tennis'])]) == 1
+
+    assert store.get('A1')['hobbies'] == ['Chess', 'Tennis']
+    assert [p['id'] for p in store.find_by_name(' anna ')] == ['A1']
+    assert store.latest()['id'] == 'B2'
+    assert sorted(store.students_by_hobby('Tennis')) == ['A1', 'B2']
+    assert len(store) == 2
+    store.close()
+
+
+def test_add_keeps_or_replaces_existing_id(tmp_path):
+    store = StudentStore(str(tmp_path))
+    store.add(profile('A1', hobbies=['Chess']))
+
+    assert store.add(profile('A1', level='Intermediate B1')) == 0
+    assert store.get('A1')['language_level'] == 'Beginner A1'
+
+    assert store.add(profile('A1', level='Intermediate B1', hobbies=['Tennis']), replace=True) == 1
+    assert store.get('A1')['language_level'] == 'Intermediate B1'
+    assert store.students_by_hobby('Chess') == []
+    assert store.students_by_hobby('Tennis') == ['A1']
+    assert dict(store.hobby_counts()) == {'tennis': 1}
+    store.close()
+
+
+def test_save_tool_updates_a_returning_student(tmp_path):
+    tool_module = importlib.import_module('03_withTools')
+    db_path = str(tmp_path)
+
+    student_id, status = tool_module.save_initial_profile('Anna', 'Beginner A1', ['Chess', 'Tennis', 'Music'], db_path=db_path)
+    assert status == 'created'
+    registered = tool_module.get_student_store(db_path).get(student_id)['registration_date']
+    time.sleep(1.1)
+    assert tool_module.save_initial_profile('Anna', 'Intermediate B1', ['Cooking'], student_id=student_id, db_path=db_path) \
+        == (student_id, 'updated')
+
+    saved = tool_module.get_student_store(db_path).get(student_id)
+    assert saved['language_level'] == 'Intermediate B1'
+    assert saved['hobbies'] == ['Cooking']
+    assert saved['registration_date'] == registered
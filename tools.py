@@ -1,63 +1,124 @@
-import sqlite3
+import asyncio
+import functools
 import os
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+from typing import Annotated
+
+from langchain_core.tools import StructuredTool
+from langgraph.prebuilt import InjectedState
+
+from batch_grading import get_grading_queue
+from profile_repository import get_profile_repository
+from profile_cache import profile_cache
+from profile_index import get_profile_index, normalize_name
+from student_store import get_student_store
+
+# Bounded pool for the blocking file / SQLite work of the async tools, so a
+# burst of sessions queues up here instead of stalling the event loop
+PROFILE_IO_WORKERS = int(os.getenv("PROFILE_IO_WORKERS", "8"))
+_io_executor = ThreadPoolExecutor(max_workers=PROFILE_IO_WORKERS, thread_name_prefix="profile-io")
+
+
+async def run_blocking(func, *args, **kwargs):
+    """Run a blocking function on the profile I/O pool and await its result."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_io_executor, functools.partial(func, *args, **kwargs))
+
+
+def profile_tool(func):
+    """
+    Wrap a blocking profile function as a tool with both a sync and an async
+    implementation. ToolNode calls the async one when the graph runs with
+    ainvoke/astream and the sync one otherwise.
+    """
+    async def coroutine(*args, **kwargs):
+        return await run_blocking(func, *args, **kwargs)
+
+    return StructuredTool.from_function(func=func, coroutine=coroutine)
+
 
 def save_initial_profile(name, language_level, hobbies, db_path="./student_data.db"):
     """
     Save a student profile to a SQLite database.
-    
+
     Parameters:
     - name: Student's name (string)
     - language_level: Student's language level (string, e.g., "Beginner A1")
     - hobbies: List of up to 3 hobbies (list of strings)
     - db_path: Path where to save the SQLite database (default: "./student_data.db")
-    
+
     Returns:
     - student_id: ID of the newly inserted student
     """
-    # Create directory if needed
-    os.makedirs(os.path.dirname(os.path.abspath(db_path)), exist_ok=True)
-    
-    # Connect to database
-    conn = sqlite3.connect(db_path)
-    cursor = conn.cursor()
-    
-    # Create tables if they don't exist
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS students (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        name TEXT NOT NULL,
-        language_level TEXT NOT NULL,
-        registration_date DATETIME DEFAULT CURRENT_TIMESTAMP
-    )
-    ''')
-    
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS hobbies (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        student_id INTEGER NOT NULL,
-        hobby TEXT NOT NULL,
-        FOREIGN KEY (student_id) REFERENCES students(id)
-    )
-    ''')
-    
-    # Insert student
-    cursor.execute(
-        'INSERT INTO students (name, language_level) VALUES (?, ?)',
-        (name, language_level)
-    )
-    student_id = cursor.lastrowid
-    
-    # Insert hobbies
-    for hobby in hobbies[:3]:
-        if hobby.strip():
-            cursor.execute(
-                'INSERT INTO hobbies (student_id, hobby) VALUES (?, ?)',
-                (student_id, hobby)
-            )
-    
-    # Save and close
-    conn.commit()
-    conn.close()
-    
-    return student_id
\ No newline at end of file
+    # The repository keeps the schema and a pool of WAL connections alive
+    # between calls, so each save is only the inserts and one commit
+    repository = get_profile_repository(db_path)
+    return repository.add_student(name, language_level, hobbies)
+
+
+def retrieve_student_profile(student_id=None, name=None, db_path="./student_data"):
+    """
+    Look up a student profile saved by the info gathering agent.
+
+    Parameters:
+    - student_id: ID of the student (string, optional)
+    - name: Name of the student, case and spacing are ignored (string, optional)
+    - db_path: Directory holding the student store and any CSV files (default: "./student_data")
+
+    Returns:
+    - profile: The student's id, name, language_level, registration_date and hobbies,
+      or None if no student matches. Without student_id or name, the most recently
+      registered student is returned.
+    """
+    # Repeated lookups within a lesson are answered from memory, the cache is
+    # invalidated by StudentStore whenever a profile is saved
+    key = os.path.abspath(db_path)
+    if student_id is not None:
+        return profile_cache.get_or_load(
+            (key, "id", student_id), lambda: _load_profile(db_path, student_id=student_id)
+        )
+    if name is not None:
+        return profile_cache.get_or_load(
+            (key, "name", normalize_name(name)), lambda: _load_profile(db_path, name=name)
+        )
+    return profile_cache.get_or_load((key, "latest"), lambda: _load_profile(db_path))
+
+
+def _load_profile(db_path, student_id=None, name=None):
+    # New profiles live in the consolidated store, CSV files that were not
+    # migrated yet are still served from the in-memory index
+    store = get_student_store(db_path)
+    index = get_profile_index(db_path)
+
+    if student_id is not None:
+        return store.get(student_id) or index.get(student_id)
+    if name is not None:
+        matches = store.find_by_name(name) or index.find_by_name(name)
+        return matches[0] if matches else None
+
+    candidates = [p for p in (store.latest(), index.latest()) if p is not None]
+    return max(candidates, key=lambda p: p['registration_date']) if candidates else None
+
+
+def finish_lesson(student_id: str, state: Annotated[dict, InjectedState], db_path: str = "./student_data"):
+    """
+    Hand a finished lesson over for grading. The 3 most important mistakes are
+    picked offline by batch_grading.py and added to the student's profile.
+
+    Parameters:
+    - student_id: ID of the student who took the lesson (string)
+    - db_path: Directory of the student store (default: "./student_data")
+
+    Returns:
+    - message: Confirmation that the lesson is queued for grading
+    """
+    # The transcript comes from the graph state, the model only passes the ID
+    transcript_id = get_grading_queue(db_path).enqueue(student_id, state["messages"])
+    return f"Lesson {transcript_id} of student {student_id} is queued for grading."
+
+
+# Tools to hand to bind_tools / ToolNode, they keep the signatures above
+save_initial_profile_tool = profile_tool(save_initial_profile)
+retrieve_student_profile_tool = profile_tool(retrieve_student_profile)
+finish_lesson_tool = profile_tool(finish_lesson)